@@ -1,13 +1,38 @@
+import io
+import csv
 import time 
+import json
+import base64
 import sqlite3
 import logging
-from datetime import datetime, time as dt_time
-from typing import Optional, Tuple
+from datetime import datetime, timedelta, time as dt_time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 import threading
 
-from flask import Flask, render_template, request, jsonify
-from flask_socketio import SocketIO
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
+from flask_socketio import SocketIO, join_room
 from zk import connect_reader, start_inventory, stop_inventory, RFIDTag
+from attendance_state import TodayAttendanceState
+from attendance_board import AttendanceBoard
+from scan_pipeline import ScanPipeline
+from response_cache import DataVersions, ResponseCache
+from emit_coalescer import EmitCoalescer
+from config_store import ConfigSnapshot, ConfigStore, ScanRules, init_config_version
+from scan_retention import ScanLogRetention, init_retention_tables
+from scan_stats import init_scan_stats, query_scan_stats
+from bulk_import import ImportFormatError, import_employees, import_tags, normalize_epc, read_rows
+from tag_enrollment import TagEnrollment
+from attendance_summary import (AttendanceSummary, department_report, employee_report,
+                                init_summary_tables, weekday_hours)
+import attendance_analytics
+from shift_schedule import Shift, ShiftSchedule, TimeWindow, init_shift_tables
+from tag_filter import EnrolledTagFilter
+from scan_trace import ScanTracer
+import metrics
+from metrics import REGISTRY
+from sync_changes import SYNC_DEFAULT_LIMIT, SYNC_MAX_LIMIT, changes_since, current_version, init_sync_tables
+from edge_ingest import (IngestError, decode_body, ingest_batch, init_edge_tables, issue_token, parse_batch,
+                         prune_ingest_log, transaction_chunks, authenticate as authenticate_reader, list_readers as list_edge_readers)
 from flask_cors import CORS
 
 # ----- Logging Configuration -----
@@ -19,7 +44,7 @@ logger = logging.getLogger(__name__)
 
 # ----- Flask & Socket.IO Setup -----
 app = Flask(__name__)
-CORS(app, supports_credentials=True)
+CORS(app, supports_credentials=True, expose_headers=['X-Next-Cursor', 'ETag'])
 app.config['SECRET_KEY'] = 'rfid-checkin-secret-key'
 socketio = SocketIO(
     app,
@@ -28,6 +53,9 @@ socketio = SocketIO(
     logger=True,
     engineio_logger=True
 )
+# Scan-driven events are batched per client (see EmitCoalescer); replies to a
+# single client still use socketio.emit directly
+emit_coalescer = EmitCoalescer(socketio, window=0.15, max_messages_per_second=4.0)
 
 # ----- RFID Reader Connection -----
 logger.info("Attempting to connect to RFID reader on /dev/cu.usbserial-10...")
@@ -38,44 +66,30 @@ else:
     logger.error("Failed to connect to RFID reader!")
 
 # ----- Configuration -----
+# Loaded once and swapped atomically; see ConfigStore
+config_store = ConfigStore('checkins.db')
+# Time windows, cooldown and reader ID, replaced as a whole on config change
+scan_rules = ScanRules.defaults()
+
+def apply_scan_rules(config: ConfigSnapshot):
+    """Config subscriber: recompute the values the scan decision reads"""
+    global scan_rules
+    scan_rules = ScanRules.from_config(config)
+
+config_store.subscribe(apply_scan_rules)
+
+def current_scan_rules() -> ScanRules:
+    """Scan rules, after picking up any config change made in the database"""
+    config_store.current()
+    return scan_rules
+
 def get_system_config():
-    """Get system configuration from database"""
-    conn = sqlite3.connect('checkins.db')
-    configs = conn.execute('SELECT config_key, config_value FROM system_config').fetchall()
-    conn.close()
-    
-    config_dict = {}
-    for key, value in configs:
-        config_dict[key] = value
-    
-    return config_dict
+    """Get system configuration (from the in-memory config store)"""
+    return config_store.current().as_dict()
 
 def load_config_from_db():
-    """Load configuration from database and update global variables"""
-    global CHECKIN_START, CHECKIN_END, CHECKOUT_START, CHECKOUT_END, SCAN_COOLDOWN_SECONDS, READER_ID
-    
-    config = get_system_config()
-    
-    # Parse time strings to time objects
-    try:
-        CHECKIN_START = datetime.strptime(config.get('checkin_start', '08:45'), '%H:%M').time()
-        CHECKIN_END = datetime.strptime(config.get('checkin_end', '09:15'), '%H:%M').time()
-        CHECKOUT_START = datetime.strptime(config.get('checkout_start', '17:45'), '%H:%M').time()
-        CHECKOUT_END = datetime.strptime(config.get('checkout_end', '18:15'), '%H:%M').time()
-        SCAN_COOLDOWN_SECONDS = int(config.get('scan_cooldown', '10'))
-        READER_ID = config.get('reader_id', 'MAIN_ENTRANCE')
-    except Exception as e:
-        logger.error(f"Error loading config from database: {e}")
-        # Use defaults if error
-        CHECKIN_START = dt_time(8, 45)
-        CHECKIN_END = dt_time(9, 15)
-        CHECKOUT_START = dt_time(17, 45)
-        CHECKOUT_END = dt_time(18, 15)
-        SCAN_COOLDOWN_SECONDS = 10
-        READER_ID = "MAIN_ENTRANCE"
-
-# Load config from database
-load_config_from_db()
+    """Reload configuration from database and notify subscribers"""
+    config_store.reload()
 
 # ----- Employee Data -----
 EMPLOYEE_MAP = {}  # Will be populated from database
@@ -98,6 +112,81 @@ logger.info(f"Employee map loaded: {EMPLOYEE_MAP}")
 # Load employee map from database
 load_employee_map()
 
+# ----- Today's Attendance State -----
+# Loaded lazily on first scan/read and reloaded at midnight rollover
+attendance_state = TodayAttendanceState('checkins.db')
+# Today's board (employee, tags, check-in/out) served by index and the attendance APIs
+attendance_board = AttendanceBoard(attendance_state, 'checkins.db')
+
+# ----- Response Cache -----
+# Write paths bump the tables they touch; read endpoints are cached per version
+data_versions = DataVersions()
+response_cache = ResponseCache(data_versions)
+config_store.subscribe(lambda config: data_versions.bump('system_config'), notify_now=False)
+
+# Scan logs older than log_retention_days move to archive/scan_logs_YYYY_MM.db
+scan_retention = ScanLogRetention(
+    'checkins.db', archive_dir='archive',
+    on_archived=lambda moved: data_versions.bump('rfid_scan_logs')
+)
+
+def apply_retention_config(config: ConfigSnapshot):
+    """Config subscriber: pick up a new retention horizon"""
+    try:
+        scan_retention.retention_days = max(1, int(config.get('log_retention_days', '90')))
+    except ValueError:
+        logger.error(f"Invalid log_retention_days: {config.get('log_retention_days')}")
+
+config_store.subscribe(apply_retention_config)
+
+# Per-scan stage traces; scans slower than slow_scan_ms are kept for /api/trace/slow
+scan_tracer = ScanTracer(threshold_ms=1000)
+
+def apply_trace_config(config: ConfigSnapshot):
+    """Config subscriber: slow scan threshold (0 disables tracing)"""
+    try:
+        threshold = float(config.get('slow_scan_ms', '1000'))
+    except ValueError:
+        logger.error(f"Invalid slow_scan_ms: {config.get('slow_scan_ms')}")
+        return
+    scan_tracer.enabled = threshold > 0
+    scan_tracer.threshold_ms = threshold
+
+config_store.subscribe(apply_trace_config)
+
+# Expected working hours used to compute late/early minutes of closed days
+work_hours = weekday_hours(dt_time(9, 0), dt_time(18, 0))
+# Shifts assigned per employee/department, compiled into interval lookups.
+# Employees without a shift use the default one built from the config.
+shift_schedule = ShiftSchedule('checkins.db')
+
+def apply_work_hours(config: ConfigSnapshot):
+    """Config subscriber: recompute the expected working hours and the default shift"""
+    global work_hours
+    start, end = dt_time(9, 0), dt_time(18, 0)
+    try:
+        start = datetime.strptime(config.get('work_start', '09:00'), '%H:%M').time()
+        end = datetime.strptime(config.get('work_end', '18:00'), '%H:%M').time()
+        work_hours = weekday_hours(start, end)
+    except ValueError:
+        logger.error(f"Invalid work hours: {config.get('work_start')}-{config.get('work_end')}")
+    # Runs after apply_scan_rules, so scan_rules already holds the new windows
+    shift_schedule.set_default(Shift(None, 'Default', start, end, scan_rules.checkin_start, scan_rules.checkin_end,
+                                     scan_rules.checkout_start, scan_rules.checkout_end))
+
+config_store.subscribe(apply_work_hours)
+
+attendance_summary = AttendanceSummary(
+    'checkins.db',
+    expected_hours=shift_schedule.expected_hours(
+        lambda employee_id, department, day: work_hours(employee_id, department, day)),
+    on_closed=lambda days: data_versions.bump('attendance_daily_summary'),
+    close_delay=shift_schedule.spill_over
+)
+
+def today_key() -> str:
+    return datetime.now().strftime('%Y-%m-%d')
+
 # ----- Database Initialization -----
 def init_db():
     conn = sqlite3.connect('checkins.db')
@@ -159,6 +248,28 @@ def init_db():
         )
     ''')
     
+    # Latest-scan lookup for the anti-noise check inside the scan transaction
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_scan_logs_uid_ts ON rfid_scan_logs (rfid_uid, timestamp)')
+    # Keyset pagination of /api/logs on (timestamp, id) and one index per filter
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_scan_logs_ts ON rfid_scan_logs (timestamp, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_scan_logs_employee_ts ON rfid_scan_logs (employee_id, timestamp, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_scan_logs_reader_ts ON rfid_scan_logs (reader_id, timestamp, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_scan_logs_status_ts ON rfid_scan_logs (status, timestamp, id)')
+    # Per-employee tag lookups (board refresh, roster join)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_employee_tags_employee ON employee_tags (employee_id)')
+    # Date-range attendance exports
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_attendances_date ON attendances (date)')
+    # Daily rollups and registry of archived scan logs
+    init_retention_tables(conn)
+    # Per-day/reader/status scan counters maintained by triggers
+    init_scan_stats(conn)
+    # Closed-day attendance rollup for period reports
+    init_summary_tables(conn)
+    init_shift_tables(conn)
+    init_edge_tables(conn)
+    # Row versions and tombstones for /api/sync
+    init_sync_tables(conn)
+    
     # System configuration table
     conn.execute('''
         CREATE TABLE IF NOT EXISTS system_config (
@@ -169,6 +280,8 @@ def init_db():
             updated_at TEXT DEFAULT CURRENT_TIMESTAMP
         )
     ''')
+    # Change counter for ConfigStore
+    init_config_version(conn)
     
     # Insert default employees if not exists
     default_employees = [
@@ -206,7 +319,11 @@ def init_db():
         ('checkout_start', '17:45', 'Giờ bắt đầu check-out (HH:MM)'),
         ('checkout_end', '18:15', 'Giờ kết thúc check-out (HH:MM)'),
         ('scan_cooldown', '10', 'Thời gian chờ giữa các lần quét (giây)'),
-        ('reader_id', 'MAIN_ENTRANCE', 'ID của RFID reader')
+        ('reader_id', 'MAIN_ENTRANCE', 'ID của RFID reader'),
+        ('log_retention_days', '90', 'Số ngày giữ log quét trong database chính'),
+        ('work_start', '09:00', 'Giờ bắt đầu làm việc, tính đi muộn (HH:MM)'),
+        ('work_end', '18:00', 'Giờ kết thúc làm việc, tính về sớm (HH:MM)'),
+        ('slow_scan_ms', '1000', 'Lượt quét chậm hơn ngưỡng này (ms) được lưu lại để chẩn đoán, 0 = tắt')
     ]
     
     for key, value, desc in default_configs:
@@ -220,39 +337,53 @@ def init_db():
     logger.info("Database initialized successfully")
 
 # ----- Helper Functions -----
-def get_employee_id(rfid_uid: str) -> Optional[int]:
-    """Get employee ID from RFID UID"""
-    conn = sqlite3.connect('checkins.db')
+def get_employee_by_tag(rfid_uid: str, conn: Optional[sqlite3.Connection] = None) -> Optional[Tuple[int, str, Optional[str]]]:
+    """Get (employee ID, name, department) from RFID UID"""
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect('checkins.db')
     result = conn.execute('''
-        SELECT e.id FROM employees e 
+        SELECT e.id, e.name, e.department FROM employees e 
         JOIN employee_tags et ON e.id = et.employee_id 
         WHERE et.rfid_uid = ? AND e.is_active = 1 AND et.is_active = 1
     ''', (rfid_uid,)).fetchone()
-    conn.close()
-    return result[0] if result else None
+    if own_conn:
+        conn.close()
+    return (result[0], result[1], result[2]) if result else None
+
+def get_employee_id(rfid_uid: str, conn: Optional[sqlite3.Connection] = None) -> Optional[int]:
+    """Get employee ID from RFID UID"""
+    employee = get_employee_by_tag(rfid_uid, conn)
+    return employee[0] if employee else None
 
-def get_current_time_window() -> Tuple[str, bool]:
+def resolve_time_window(employee_id: Optional[int] = None, department: Optional[str] = None,
+                        now: Optional[datetime] = None) -> Optional[TimeWindow]:
+    """Window of the employee's shifts (or the default shift) that `now` falls in"""
+    current_scan_rules()  # picks up config changes to the default shift
+    return shift_schedule.resolve(employee_id, department, now)
+
+def get_current_time_window(employee_id: Optional[int] = None,
+                            department: Optional[str] = None) -> Tuple[str, bool]:
     """Determine current time window and if it's valid for scanning"""
-    now = datetime.now()
-    current_time = now.time()
-    
-    if CHECKIN_START <= current_time <= CHECKIN_END:
-        return "checkin", True
-    elif CHECKOUT_START <= current_time <= CHECKOUT_END:
-        return "checkout", True
-    else:
+    window = resolve_time_window(employee_id, department)
+    if window is None:
         return "outside", False
+    return window.window, True
 
-def get_today_attendance(employee_id: int) -> Optional[dict]:
-    """Get today's attendance record for employee"""
-    today = datetime.now().strftime('%Y-%m-%d')
-    conn = sqlite3.connect('checkins.db')
+def get_today_attendance(employee_id: int, conn: Optional[sqlite3.Connection] = None,
+                         day: Optional[str] = None) -> Optional[dict]:
+    """Get today's (or `day`'s) attendance record for employee"""
+    today = day or datetime.now().strftime('%Y-%m-%d')
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect('checkins.db')
     result = conn.execute('''
         SELECT check_in_time, check_out_time 
         FROM attendances 
         WHERE employee_id = ? AND date = ?
     ''', (employee_id, today)).fetchone()
-    conn.close()
+    if own_conn:
+        conn.close()
     
     if result:
         return {
@@ -261,121 +392,156 @@ def get_today_attendance(employee_id: int) -> Optional[dict]:
         }
     return None
 
-def is_recent_scan(rfid_uid: str) -> bool:
+def is_recent_scan(rfid_uid: str, conn: Optional[sqlite3.Connection] = None,
+                   now: Optional[datetime] = None) -> bool:
     """Check if this RFID was scanned recently (anti-noise)"""
-    conn = sqlite3.connect('checkins.db')
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect('checkins.db')
     result = conn.execute('''
         SELECT timestamp FROM rfid_scan_logs 
         WHERE rfid_uid = ? 
         ORDER BY timestamp DESC 
         LIMIT 1
     ''', (rfid_uid,)).fetchone()
-    conn.close()
+    if own_conn:
+        conn.close()
     
     if not result:
         return False
     
     last_scan = datetime.fromisoformat(result[0])
-    time_diff = (datetime.now() - last_scan).total_seconds()
-    return time_diff < SCAN_COOLDOWN_SECONDS
+    # abs(): scans uploaded late by an edge reader may be older than the last one logged
+    time_diff = abs(((now or datetime.now()) - last_scan).total_seconds())
+    return time_diff < current_scan_rules().scan_cooldown_seconds
 
-def log_scan(rfid_uid: str, employee_id: Optional[int], status: str, note: str = ""):
-    """Log RFID scan to database"""
-    timestamp = datetime.now().isoformat()
-    conn = sqlite3.connect('checkins.db')
+def log_scan(rfid_uid: str, employee_id: Optional[int], status: str, note: str = "",
+             conn: Optional[sqlite3.Connection] = None, timestamp: Optional[str] = None,
+             reader_id: Optional[str] = None):
+    """Log RFID scan to database (commits only when it opened its own connection)"""
+    timestamp = timestamp or datetime.now().isoformat()
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect('checkins.db')
     conn.execute('''
         INSERT INTO rfid_scan_logs 
         (employee_id, rfid_uid, timestamp, reader_id, status, note)
         VALUES (?, ?, ?, ?, ?, ?)
-    ''', (employee_id, rfid_uid, timestamp, READER_ID, status, note))
-    conn.commit()
-    conn.close()
+    ''', (employee_id, rfid_uid, timestamp, reader_id or current_scan_rules().reader_id, status, note))
+    if own_conn:
+        conn.commit()
+        conn.close()
 
-def record_attendance(employee_id: int, check_type: str) -> bool:
-    """Record check-in or check-out for employee"""
-    today = datetime.now().strftime('%Y-%m-%d')
-    timestamp = datetime.now().isoformat()
-    
-    conn = sqlite3.connect('checkins.db')
-    
-    # Check if attendance record exists for today
-    existing = conn.execute('''
-        SELECT id FROM attendances 
-        WHERE employee_id = ? AND date = ?
-    ''', (employee_id, today)).fetchone()
-    
-    if existing:
-        # Update existing record
-        if check_type == 'checkin':
-            conn.execute('''
-                UPDATE attendances 
-                SET check_in_time = ? 
-                WHERE employee_id = ? AND date = ?
-            ''', (timestamp, employee_id, today))
-        else:  # checkout
-            conn.execute('''
-                UPDATE attendances 
-                SET check_out_time = ? 
-                WHERE employee_id = ? AND date = ?
-            ''', (timestamp, employee_id, today))
-    else:
-        # Create new record
-        if check_type == 'checkin':
-            conn.execute('''
-                INSERT INTO attendances (employee_id, date, check_in_time)
-                VALUES (?, ?, ?)
-            ''', (employee_id, today, timestamp))
-        else:  # checkout
-            conn.execute('''
-                INSERT INTO attendances (employee_id, date, check_out_time)
-                VALUES (?, ?, ?)
-            ''', (employee_id, today, timestamp))
+def record_attendance(employee_id: int, check_type: str, conn: Optional[sqlite3.Connection] = None,
+                      timestamp: Optional[str] = None, work_date: Optional[str] = None) -> bool:
+    """Record check-in or check-out for employee.
+
+    Uses a single UPSERT against UNIQUE(employee_id, date), so there is no
+    SELECT-then-write race between concurrent scans of the same employee.
+    `work_date` defaults to the timestamp's date; a night shift check-out
+    after midnight passes the date the shift started.
+    """
+    if timestamp is None:
+        timestamp = datetime.now().isoformat()
+    today = work_date or timestamp[:10]
+    column = 'check_in_time' if check_type == 'checkin' else 'check_out_time'
     
-    conn.commit()
-    conn.close()
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect('checkins.db')
+    conn.execute(f'''
+        INSERT INTO attendances (employee_id, date, {column})
+        VALUES (?, ?, ?)
+        ON CONFLICT(employee_id, date) DO UPDATE SET {column} = excluded.{column}
+    ''', (employee_id, today, timestamp))
+    if own_conn:
+        conn.commit()
+        conn.close()
     return True
 
-def process_rfid_scan(rfid_uid: str) -> dict:
-    """Main logic to process RFID scan"""
-    timestamp = datetime.now()
-    
+def save_attendance(employee_id: int, check_type: str, conn: sqlite3.Connection, work_date: str,
+                    timestamp: Optional[str] = None) -> None:
+    """Write an accepted scan and mirror it into today's state.
+
+    The state is updated at once, so later scans of the same batch see it;
+    the board publishes to clients and is patched only after COMMIT
+    (``run_scan_transaction``).
+    """
+    timestamp = timestamp or datetime.now().isoformat()
+    record_attendance(employee_id, check_type, conn, timestamp, work_date)
+    if work_date == timestamp[:10]:
+        attendance_state.apply(employee_id, check_type, timestamp)
+
+def _process_scan_in_transaction(conn: sqlite3.Connection, rfid_uid: str, scanned_at: Optional[datetime] = None,
+                                 reader_id: Optional[str] = None) -> dict:
+    """Decide and persist one scan using an already-open transaction.
+
+    Live scans use the current time and the configured reader; scans pushed
+    by edge readers pass the device time and their own reader ID.
+    """
+    now = scanned_at or datetime.now()
+    timestamp = now.isoformat()
+    reader = reader_id or current_scan_rules().reader_id
     # Get employee info
-    employee_id = get_employee_id(rfid_uid)
-    if not employee_id:
-        log_scan(rfid_uid, None, "unknown_employee", "Unknown RFID UID")
+    employee = get_employee_by_tag(rfid_uid, conn)
+    if not employee:
+        log_scan(rfid_uid, None, "unknown_employee", "Unknown RFID UID", conn=conn, timestamp=timestamp, reader_id=reader)
         return {
             'status': 'ignored',
             'reason': 'unknown_employee',
             'message': f'Unknown RFID: {rfid_uid}'
         }
+    employee_id, employee_name, department = employee
     
     # Check for recent scan (anti-noise)
-    if is_recent_scan(rfid_uid):
-        log_scan(rfid_uid, employee_id, "ignored", "Recent scan detected")
+    if is_recent_scan(rfid_uid, conn, now):
+        log_scan(rfid_uid, employee_id, "ignored", "Recent scan detected", conn=conn, timestamp=timestamp, reader_id=reader)
         return {
             'status': 'ignored',
             'reason': 'recent_scan',
             'message': 'Recent scan detected, ignoring'
         }
     
-    # Get current time window
-    time_window, is_valid_time = get_current_time_window()
+    # Get the window of the employee's shift (binary search, no query)
+    window = resolve_time_window(employee_id, department, now)
     
-    if not is_valid_time:
-        log_scan(rfid_uid, employee_id, "outside_hours", f"Scan outside valid hours: {time_window}")
+    if window is None:
+        outside = shift_schedule.outside_reason(employee_id, department, now)
+        log_scan(rfid_uid, employee_id, "outside_hours", f"Scan outside valid hours: {outside}", conn=conn, timestamp=timestamp, reader_id=reader)
         return {
             'status': 'ignored',
             'reason': 'outside_hours',
-            'message': f'Scan outside valid hours ({time_window})'
+            'message': f'Scan outside valid hours ({outside})'
         }
+    time_window = window.window
+    work_date = window.work_date.isoformat()
     
-    # Get today's attendance
-    today_attendance = get_today_attendance(employee_id)
+    # Get the attendance of the shift's work date (in-memory for today)
+    if work_date == today_key():
+        today_attendance = attendance_state.get(employee_id, conn)
+    else:
+        today_attendance = get_today_attendance(employee_id, conn, work_date)
     
     # Determine action based on time window and current status
     if time_window == "checkin":
-        if today_attendance and today_attendance['check_in_time']:
-            log_scan(rfid_uid, employee_id, "ignored", "Already checked in today")
+        if today_attendance and today_attendance['check_in_time'] and today_attendance['check_in_time'] > timestamp:
+            # An earlier check-in uploaded late by an edge reader replaces the later one
+            save_attendance(employee_id, 'checkin', conn, work_date, timestamp)
+            log_scan(rfid_uid, employee_id, "checkin", "Earlier check-in recorded", conn=conn, timestamp=timestamp, reader_id=reader)
+            return {
+                'status': 'success',
+                'action': 'checkin',
+                'employee_id': employee_id,
+                'employee_name': employee_name,
+                'department': department,
+                'reader_id': reader,
+                'scanned_at': timestamp,
+                'shift': window.shift_name,
+                'work_date': work_date,
+                'message': 'Check-in time updated to earlier scan'
+            }
+        elif today_attendance and today_attendance['check_in_time']:
+            log_scan(rfid_uid, employee_id, "ignored", "Already checked in today", conn=conn, timestamp=timestamp, reader_id=reader)
             return {
                 'status': 'ignored',
                 'reason': 'already_checked_in',
@@ -383,78 +549,246 @@ def process_rfid_scan(rfid_uid: str) -> dict:
             }
         else:
             # Record check-in
-            record_attendance(employee_id, 'checkin')
-            log_scan(rfid_uid, employee_id, "checkin", "Successful check-in")
+            save_attendance(employee_id, 'checkin', conn, work_date, timestamp)
+            log_scan(rfid_uid, employee_id, "checkin", "Successful check-in", conn=conn, timestamp=timestamp, reader_id=reader)
             return {
                 'status': 'success',
                 'action': 'checkin',
+                'employee_id': employee_id,
+                'employee_name': employee_name,
+                'department': department,
+                'reader_id': reader,
+                'scanned_at': timestamp,
+                'shift': window.shift_name,
+                'work_date': work_date,
                 'message': 'Check-in recorded successfully'
             }
     
     elif time_window == "checkout":
         if not today_attendance or not today_attendance['check_in_time']:
-            log_scan(rfid_uid, employee_id, "ignored", "No check-in found for today")
+            log_scan(rfid_uid, employee_id, "ignored", "No check-in found for today", conn=conn, timestamp=timestamp, reader_id=reader)
             return {
                 'status': 'ignored',
                 'reason': 'no_checkin',
                 'message': 'No check-in found for today'
             }
+        elif today_attendance['check_out_time'] and today_attendance['check_out_time'] >= timestamp:
+            # A later check-out is already recorded (scan uploaded late by an edge reader)
+            log_scan(rfid_uid, employee_id, "ignored", "Later check-out already recorded", conn=conn,
+                     timestamp=timestamp, reader_id=reader)
+            return {
+                'status': 'ignored',
+                'reason': 'already_checked_out',
+                'message': 'Later check-out already recorded'
+            }
         elif today_attendance['check_out_time']:
             # Update checkout time to latest scan (employee might be leaving now)
-            record_attendance(employee_id, 'checkout')
-            log_scan(rfid_uid, employee_id, "checkout", "Check-out time updated")
+            save_attendance(employee_id, 'checkout', conn, work_date, timestamp)
+            log_scan(rfid_uid, employee_id, "checkout", "Check-out time updated", conn=conn, timestamp=timestamp, reader_id=reader)
             return {
                 'status': 'success',
                 'action': 'checkout',
+                'employee_id': employee_id,
+                'employee_name': employee_name,
+                'department': department,
+                'reader_id': reader,
+                'scanned_at': timestamp,
+                'shift': window.shift_name,
+                'work_date': work_date,
                 'message': 'Check-out time updated to latest scan'
             }
         else:
             # Record check-out
-            record_attendance(employee_id, 'checkout')
-            log_scan(rfid_uid, employee_id, "checkout", "Successful check-out")
+            save_attendance(employee_id, 'checkout', conn, work_date, timestamp)
+            log_scan(rfid_uid, employee_id, "checkout", "Successful check-out", conn=conn, timestamp=timestamp, reader_id=reader)
             return {
                 'status': 'success',
                 'action': 'checkout',
+                'employee_id': employee_id,
+                'employee_name': employee_name,
+                'department': department,
+                'reader_id': reader,
+                'scanned_at': timestamp,
+                'shift': window.shift_name,
+                'work_date': work_date,
                 'message': 'Check-out recorded successfully'
             }
 
+# Scan outcomes and write transaction phases (exposed at /metrics)
+SCAN_RESULTS = REGISTRY.counter('scan_results_total', 'Scan decisions by status and reason/action', ['status', 'reason'])
+# labels() children per (status, reason/action), bound on first use
+SCAN_RESULT_COUNTERS: Dict[Tuple[str, str], Any] = {}
+SCAN_DB_SECONDS = REGISTRY.histogram('scan_db_seconds', 'Scan write transaction phases', ['phase'])
+SCAN_DB_LOCK = SCAN_DB_SECONDS.labels('lock')
+SCAN_DB_WORK = SCAN_DB_SECONDS.labels('work')
+SCAN_DB_COMMIT = SCAN_DB_SECONDS.labels('commit')
+SCAN_DB_ROLLBACKS = REGISTRY.counter('scan_db_rollbacks_total', 'Scan transactions rolled back')
+
+def _after_scan_commit(results: List[dict]) -> None:
+    """Cache versions, result counters and board patches for a committed batch"""
+    data_versions.bump('rfid_scan_logs')
+    if any(result['status'] == 'success' for result in results):
+        data_versions.bump('attendances')
+    for result in results:
+        if not result.get('duplicate'):
+            key = (result['status'], result.get('reason') or result.get('action') or '')
+            counter = SCAN_RESULT_COUNTERS.get(key)
+            if counter is None:
+                counter = SCAN_RESULT_COUNTERS[key] = SCAN_RESULTS.labels(*key)
+            counter.inc()
+    # Only committed check-ins/check-outs reach the board's clients and replay ring
+    try:
+        for result in results:
+            if result['status'] == 'success' and not result.get('duplicate') \
+                    and result['work_date'] == result['scanned_at'][:10]:
+                attendance_board.apply_attendance(result['employee_id'], result['action'], result['scanned_at'])
+    except Exception:
+        # Patches may be missing: have clients take a new snapshot
+        attendance_board.invalidate_attendance()
+        raise
+
+def run_scan_transaction(work: Callable[[sqlite3.Connection], List[dict]], traces: Sequence = ()) -> List[dict]:
+    """Run `work` (returning scan results) in one write transaction.
+
+    BEGIN IMMEDIATE takes the write lock before the first read, so the
+    decision and the writes for every scan in the batch see a consistent
+    view and cost a single commit. Lock and commit are marked on the
+    scans' traces, and every statement on the trace active at the time.
+    """
+    conn = sqlite3.connect('checkins.db', isolation_level=None)
+    traced = any(trace is not None for trace in traces)
+    try:
+        started = time.perf_counter()
+        conn.execute('BEGIN IMMEDIATE')
+        locked = time.perf_counter()
+        SCAN_DB_LOCK.observe(locked - started)
+        if traced:
+            scan_tracer.mark_all(traces, 'lock_acquired')
+            conn.set_trace_callback(scan_tracer.sql)
+        try:
+            results = work(conn)
+            worked = time.perf_counter()
+            SCAN_DB_WORK.observe(worked - locked)
+            if traced:
+                conn.set_trace_callback(None)
+                scan_tracer.mark_all(traces, 'commit')
+            conn.execute('COMMIT')
+            SCAN_DB_COMMIT.observe(time.perf_counter() - worked)
+            if traced:
+                scan_tracer.mark_all(traces, 'committed')
+        except Exception:
+            SCAN_DB_ROLLBACKS.inc()
+            conn.execute('ROLLBACK')
+            # State may hold writes from the rolled-back batch (and the board may have reloaded from it)
+            attendance_state.invalidate()
+            attendance_board.invalidate_attendance()
+            raise
+    finally:
+        conn.close()
+    # The batch is committed: a failing side effect must not make the caller retry (and re-log) it
+    try:
+        _after_scan_commit(results)
+    except Exception as e:
+        logger.error(f"Error after committing {len(results)} scan(s): {e}")
+    return results
+
+def process_rfid_scans(rfid_uids: List[str], traces: Optional[List] = None,
+                       read_times: Optional[List[float]] = None) -> List[dict]:
+    """Process a batch of RFID scans in one transaction, each at its read time (epoch seconds)"""
+    traces = traces or [None] * len(rfid_uids)
+    read_times = read_times or [None] * len(rfid_uids)
+
+    def work(conn: sqlite3.Connection) -> List[dict]:
+        results = []
+        for rfid_uid, trace, read_at in zip(rfid_uids, traces, read_times):
+            scanned_at = datetime.fromtimestamp(read_at) if read_at is not None else None
+            # Statements run while the trace is active are marked on it
+            with scan_tracer.activate(trace):
+                results.append(_process_scan_in_transaction(conn, rfid_uid, scanned_at))
+        return results
+    results = run_scan_transaction(work, traces)
+    # Tags written by other processes never bump data_versions in this one
+    enrolled_filter.check()
+    return results
+
+def process_rfid_scan(rfid_uid: str) -> dict:
+    """Main logic to process RFID scan"""
+    return process_rfid_scans([rfid_uid])[0]
+
+# ----- Subscription Rooms -----
+def reader_room(reader_id: str) -> str:
+    return f"reader:{reader_id}"
+
+def department_room(department: str) -> str:
+    return f"department:{department}"
+
 # ----- RFID Reader Loop as Background Task -----
 reader_running = False
 reader_thread_obj = None
 reader_thread_lock = threading.Lock()
 
+def scan_rooms(result: dict) -> List[str]:
+    """Subscription rooms a scan result is routed to"""
+    rooms = [reader_room(result.get('reader_id') or scan_rules.reader_id)]
+    if result.get('department'):
+        rooms.append(department_room(result['department']))
+    return rooms
+
+def notify_scan_result(epc: str, result: dict):
+    """Notification stage: push accepted scans to connected clients"""
+    if result['status'] == 'success':
+        name = result['employee_name']
+        data = {
+            'name': name,
+            'department': result.get('department'),
+            'reader_id': result.get('reader_id'),
+            'action': result['action'],
+            'time': datetime.fromisoformat(result.get('scanned_at') or datetime.now().isoformat()).strftime('%H:%M:%S'),
+            'message': result['message']
+        }
+        # Only the latest status of an employee within a batch is delivered,
+        # and only to screens watching this reader or the employee's department
+        emit_coalescer.emit('employee_status_update', data, key=result['employee_id'],
+                            rooms=scan_rooms(result))
+        logger.info(f"{result['action'].title()}: {name}")
+    else:
+        logger.info(f"Scan ignored: {result['reason']} - {result['message']}")
+
+# Serial decode -> bounded queue -> decision/persistence -> notification
+scan_pipeline = ScanPipeline(process_rfid_scans, notify_scan_result, trace_done=scan_tracer.finish)
+
+# Drops reads of foreign tags inside the serial loop; follows tag writes incrementally
+enrolled_filter = EnrolledTagFilter('checkins.db')
+data_versions.subscribe(lambda tables: enrolled_filter.sync() if 'employee_tags' in tables else None)
+
+def admit_tag(epc: str) -> bool:
+    # An open enrollment session needs the unknown tags
+    return tag_enrollment.active or enrolled_filter.admit(epc)
+
 def reader_thread_func():
     if reader is None:
         logger.error("Cannot start reader thread - no reader connection")
         return
 
     def on_tag(tag: RFIDTag):
+        # Runs inside the serial read loop: only enqueue, never touch the DB
         logger.info(f"Tag detected: {tag}")
-        epc = tag.epc
-        # Process the scan
-        result = process_rfid_scan(epc)
-        if result['status'] == 'success':
-            employee_id = get_employee_id(epc)
-            if employee_id:
-                conn = sqlite3.connect('checkins.db')
-                name = conn.execute(
-                    "SELECT name FROM employees WHERE id = ?", 
-                    (employee_id,)
-                ).fetchone()[0]
-                conn.close()
-                data = {
-                    'name': name,
-                    'action': result['action'],
-                    'time': datetime.now().strftime('%H:%M:%S'),
-                    'message': result['message']
-                }
-                socketio.emit('employee_status_update', data)
-                logger.info(f"{result['action'].title()}: {name}")
-        else:
-            logger.info(f"Scan ignored: {result['reason']} - {result['message']}")
+        # Unknown tags go to an open enrollment session instead of the scan log
+        if tag_enrollment.observe(tag.epc):
+            return
+        # Wall-clock time the bytes arrived (received_at is perf_counter)
+        read_at = time.time() - (time.perf_counter() - tag.received_at) if tag.received_at is not None else None
+        scan_pipeline.submit(tag.epc, scan_tracer.start(tag.epc, tag.received_at, tag.decoded_at), read_at)
 
-    logger.info("Starting inventory process...")
-    start_inventory(reader, address=0x00, tag_callback=on_tag)
+    enrolled_filter.rebuild()
+    scan_pipeline.start()
+    try:
+        logger.info("Starting inventory process...")
+        start_inventory(reader, address=0x00, tag_callback=on_tag,
+                        stop_flag=lambda: not reader_running, tag_filter=admit_tag)
+    finally:
+        # Graceful drain: everything already read is still processed
+        scan_pipeline.stop()
 
 @app.route('/start_reader', methods=['POST'])
 def start_reader():
@@ -487,70 +821,440 @@ def stop_reader():
 def reader_status():
     return jsonify({'running': reader_running})
 
+@app.route('/api/cache/stats')
+def api_cache_stats():
+    """Response cache hit/miss counters and current data versions"""
+    return jsonify({**response_cache.stats(), 'versions': data_versions.snapshot()})
+
+@app.route('/api/emit/stats')
+def api_emit_stats():
+    """Socket.IO batching metrics: batch sizes, superseded and rate-limited counts"""
+    return jsonify(emit_coalescer.stats())
+
+@app.route('/api/config/stats')
+def api_config_stats():
+    """Config store reload and version check counters"""
+    return jsonify(config_store.stats())
+
+@app.route('/api/stats')
+@response_cache.cached('rfid_scan_logs')
+def api_stats():
+    """Scan counts by day, reader and status (?from=&to= YYYY-MM-DD, ?reader_id=)"""
+    conn = sqlite3.connect('checkins.db')
+    try:
+        stats = query_scan_stats(conn, request.args.get('from'), request.args.get('to'),
+                                 request.args.get('reader_id'))
+    finally:
+        conn.close()
+    return jsonify(stats)
+
+# ----- Period Reports (read only from attendance_daily_summary) -----
+@app.route('/api/reports/attendance')
+@response_cache.cached('attendance_daily_summary')
+def api_report_employee():
+    """One employee over a date range: ?employee_id=&from=&to= (YYYY-MM-DD)"""
+    employee_id = request.args.get('employee_id', type=int)
+    date_from, date_to = request.args.get('from'), request.args.get('to')
+    if employee_id is None or not date_from or not date_to:
+        return jsonify({'success': False, 'message': 'employee_id, from and to are required'}), 400
+    conn = sqlite3.connect('checkins.db')
+    try:
+        return jsonify(employee_report(conn, employee_id, date_from[:10], date_to[:10]))
+    finally:
+        conn.close()
+
+@app.route('/api/reports/departments')
+@response_cache.cached('attendance_daily_summary')
+def api_report_departments():
+    """Per-department totals for one month: ?month=YYYY-MM[&department=]"""
+    month = request.args.get('month') or datetime.now().strftime('%Y-%m')
+    try:
+        datetime.strptime(month, '%Y-%m')
+    except ValueError:
+        return jsonify({'success': False, 'message': 'month must be YYYY-MM'}), 400
+    conn = sqlite3.connect('checkins.db')
+    try:
+        return jsonify(department_report(conn, month, request.args.get('department')))
+    finally:
+        conn.close()
+
+@app.route('/api/reports/rebuild', methods=['POST'])
+def api_report_rebuild():
+    """Close pending days now and recompute already closed days {from, to}"""
+    data = request.get_json(silent=True) or {}
+    closed = attendance_summary.close_days()
+    rebuilt = []
+    try:
+        if data.get('from') and data.get('to'):
+            rebuilt = attendance_summary.rebuild(datetime.fromisoformat(data['from']).date(),
+                                                 datetime.fromisoformat(data['to']).date())
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': attendance_summary.last_error is None, 'closed': closed, 'rebuilt': rebuilt,
+                    'error': attendance_summary.last_error})
+
+# ----- Edge Readers (remote doors pushing batches over HTTP) -----
+EDGE_PRUNE_INTERVAL = 3600
+edge_pruned_at = 0.0
+
+def ingest_edge_batch(conn: sqlite3.Connection, reader_id: str, parsed: list) -> List[dict]:
+    """Transaction body of an edge batch: dedup, decide each read at its device time, log outcomes"""
+    global edge_pruned_at
+    if time.time() - edge_pruned_at > EDGE_PRUNE_INTERVAL:
+        edge_pruned_at = time.time()
+        prune_ingest_log(conn)
+    return ingest_batch(conn, reader_id, parsed, _process_scan_in_transaction, divert=tag_enrollment.observe)
+
+@app.route('/api/edge/ingest', methods=['POST'])
+def api_edge_ingest():
+    """Batch of reads from an edge reader: {items: [{seq, epc, ts, rssi, antenna}]}
+
+    Authorization: Bearer <reader token>. The body may be sent with
+    Content-Encoding: gzip. Items whose (reader_id, seq) was already
+    received are answered from the ingest log, so retries are safe; that
+    also lets the batch be committed in groups of ITEMS_PER_TRANSACTION.
+    """
+    conn = sqlite3.connect('checkins.db')
+    try:
+        reader_id = authenticate_reader(conn, request.headers.get('Authorization'))
+    finally:
+        conn.close()
+    if reader_id is None:
+        return jsonify({'success': False, 'message': 'Invalid or missing reader token'}), 401
+    try:
+        parsed = parse_batch(decode_body(request.get_data(), request.headers.get('Content-Encoding')), reader_id)
+    except IngestError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    # Short transactions keep the write lock free for the local reader between groups
+    results: List[dict] = [None] * len(parsed)
+    for indexes in transaction_chunks(parsed):
+        chunk = [parsed[i] for i in indexes]
+        for i, result in zip(indexes, run_scan_transaction(lambda conn: ingest_edge_batch(conn, reader_id, chunk))):
+            results[i] = result
+            if not result['duplicate'] and result['status'] in ('success', 'ignored'):
+                notify_scan_result(parsed[i][0]['epc'], result)
+    # Reads from after an outage may land on days the report rollup already closed
+    past_days = {result['work_date'] for result in results
+                 if not result['duplicate'] and result['status'] == 'success' and result['work_date'] < today_key()}
+    for day in sorted(datetime.fromisoformat(work_date).date() for work_date in past_days):
+        attendance_summary.rebuild(day, day)
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    return jsonify({
+        'success': True,
+        'reader_id': reader_id,
+        'received': len(results),
+        'duplicates': sum(1 for result in results if result['duplicate']),
+        'counts': counts,
+        'results': results,
+    })
+
+@app.route('/api/edge/readers')
+def api_edge_readers():
+    conn = sqlite3.connect('checkins.db')
+    try:
+        return jsonify(list_edge_readers(conn))
+    finally:
+        conn.close()
+
+@app.route('/api/edge/readers', methods=['POST'])
+def api_register_edge_reader():
+    """Register an edge reader or rotate its token {reader_id, name}; the token is only shown once"""
+    data = request.get_json(silent=True) or {}
+    reader_id = (data.get('reader_id') or '').strip()
+    if not reader_id:
+        return jsonify({'success': False, 'message': 'reader_id is required'}), 400
+    conn = sqlite3.connect('checkins.db')
+    try:
+        token = issue_token(conn, reader_id, data.get('name'))
+        conn.commit()
+    finally:
+        conn.close()
+    return jsonify({'success': True, 'reader_id': reader_id, 'token': token})
+
+@app.route('/api/edge/readers/<reader_id>', methods=['DELETE'])
+def api_revoke_edge_reader(reader_id):
+    """Revoke a reader's token; its next batch gets 401"""
+    conn = sqlite3.connect('checkins.db')
+    try:
+        revoked = conn.execute('UPDATE edge_readers SET is_active = 0 WHERE reader_id = ?', (reader_id,)).rowcount
+        conn.commit()
+    finally:
+        conn.close()
+    if not revoked:
+        return jsonify({'success': False, 'message': 'Reader not found'}), 404
+    return jsonify({'success': True, 'message': 'Reader token revoked'})
+
+# ----- Shifts -----
+SHIFT_COLUMNS = ('name', 'work_start', 'work_end', 'checkin_start', 'checkin_end', 'checkout_start', 'checkout_end')
+
+def shift_values(shift: Shift) -> tuple:
+    values = shift.as_dict()
+    return tuple(values[column] for column in SHIFT_COLUMNS) + (','.join(map(str, values['days'])),)
+
+def reload_shifts(conn: sqlite3.Connection):
+    """Recompile the schedule after a shift/assignment write"""
+    shift_schedule.load(conn)
+    data_versions.bump('shifts')
+
+@app.route('/api/shifts')
+@response_cache.cached('shifts')
+def api_shifts():
+    """Active shifts, their assignments and the compiled schedule"""
+    return jsonify({'shifts': shift_schedule.shifts(), 'assignments': shift_schedule.assignments(),
+                    'stats': shift_schedule.stats()})
+
+@app.route('/api/shifts', methods=['POST'])
+def api_create_shift():
+    """Create a shift {name, work_start, work_end, [checkin_/checkout_ start/end], days: [0-6]}"""
+    try:
+        shift = Shift.from_dict(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    conn = sqlite3.connect('checkins.db')
+    try:
+        cursor = conn.execute(f'''
+            INSERT INTO shifts ({', '.join(SHIFT_COLUMNS)}, days) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', shift_values(shift))
+        conn.commit()
+        reload_shifts(conn)
+        return jsonify({'success': True, 'message': 'Shift created successfully', 'id': cursor.lastrowid})
+    finally:
+        conn.close()
+
+@app.route('/api/shifts/<int:shift_id>', methods=['PUT'])
+def api_update_shift(shift_id):
+    try:
+        shift = Shift.from_dict(request.get_json(silent=True) or {}, shift_id)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    conn = sqlite3.connect('checkins.db')
+    try:
+        updated = conn.execute(f'''
+            UPDATE shifts SET {', '.join(f'{column} = ?' for column in SHIFT_COLUMNS)}, days = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND is_active = 1
+        ''', shift_values(shift) + (shift_id,)).rowcount
+        if not updated:
+            return jsonify({'success': False, 'message': 'Shift not found'}), 404
+        conn.commit()
+        reload_shifts(conn)
+        return jsonify({'success': True, 'message': 'Shift updated successfully'})
+    finally:
+        conn.close()
+
+@app.route('/api/shifts/<int:shift_id>', methods=['DELETE'])
+def api_delete_shift(shift_id):
+    """Soft delete; its employees/departments fall back to their other shifts or the default"""
+    conn = sqlite3.connect('checkins.db')
+    try:
+        conn.execute('UPDATE shifts SET is_active = 0, updated_at = CURRENT_TIMESTAMP WHERE id = ?', (shift_id,))
+        conn.execute('DELETE FROM shift_assignments WHERE shift_id = ?', (shift_id,))
+        conn.commit()
+        reload_shifts(conn)
+        return jsonify({'success': True, 'message': 'Shift deleted successfully'})
+    finally:
+        conn.close()
+
+@app.route('/api/shifts/<int:shift_id>/assignments', methods=['PUT'])
+def api_assign_shift(shift_id):
+    """Replace who works a shift: {employee_ids: [...], departments: [...]}"""
+    data = request.get_json(silent=True) or {}
+    try:
+        employee_ids = sorted({int(employee_id) for employee_id in data.get('employee_ids') or []})
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'employee_ids must be integers'}), 400
+    departments = sorted({str(d).strip() for d in data.get('departments') or [] if str(d).strip()})
+    conn = sqlite3.connect('checkins.db')
+    try:
+        if not conn.execute('SELECT 1 FROM shifts WHERE id = ? AND is_active = 1', (shift_id,)).fetchone():
+            return jsonify({'success': False, 'message': 'Shift not found'}), 404
+        conn.execute('DELETE FROM shift_assignments WHERE shift_id = ?', (shift_id,))
+        conn.executemany('INSERT INTO shift_assignments (shift_id, employee_id) VALUES (?, ?)',
+                         [(shift_id, employee_id) for employee_id in employee_ids])
+        conn.executemany('INSERT INTO shift_assignments (shift_id, department) VALUES (?, ?)',
+                         [(shift_id, department) for department in departments])
+        conn.commit()
+        reload_shifts(conn)
+        return jsonify({'success': True, 'employee_ids': employee_ids, 'departments': departments})
+    finally:
+        conn.close()
+
+@app.route('/api/shifts/resolve')
+def api_resolve_shift():
+    """Which window applies: ?employee_id=[&at=ISO datetime]"""
+    employee_id = request.args.get('employee_id', type=int)
+    try:
+        at = datetime.fromisoformat(request.args['at']) if request.args.get('at') else datetime.now()
+    except ValueError:
+        return jsonify({'success': False, 'message': 'at must be an ISO datetime'}), 400
+    department = None
+    if employee_id is not None:
+        conn = sqlite3.connect('checkins.db')
+        row = conn.execute('SELECT department FROM employees WHERE id = ?', (employee_id,)).fetchone()
+        conn.close()
+        department = row[0] if row else None
+    window = resolve_time_window(employee_id, department, at)
+    return jsonify({
+        'employee_id': employee_id,
+        'department': department,
+        'at': at.isoformat(),
+        'window': window.window if window else 'outside',
+        'work_date': window.work_date.isoformat() if window else None,
+        'shift_id': window.shift_id if window else None,
+        'shift': window.shift_name if window else None,
+    })
+
+# ----- Attendance Analytics (columnar, needs numpy) -----
+def config_minutes(key: str, default: str) -> int:
+    """Minutes after midnight of an HH:MM config value"""
+    value = datetime.strptime(config_store.current().get(key, default), '%H:%M')
+    return value.hour * 60 + value.minute
+
+@app.route('/api/analytics/attendance')
+@response_cache.cached('attendances', 'employees', 'system_config')
+def api_attendance_analytics():
+    """Arrival percentiles, overtime histogram and chronic lateness: ?from=&to= (YYYY-MM-DD)"""
+    if not attendance_analytics.numpy_available():
+        return jsonify({'success': False, 'message': 'numpy is not installed'}), 503
+    try:
+        date_to = datetime.strptime((request.args.get('to') or today_key())[:10], '%Y-%m-%d')
+        date_from = (datetime.strptime(request.args['from'][:10], '%Y-%m-%d') if request.args.get('from')
+                     else date_to - timedelta(days=365))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'from and to must be YYYY-MM-DD'}), 400
+    date_from, date_to = date_from.strftime('%Y-%m-%d'), date_to.strftime('%Y-%m-%d')
+    try:
+        work_start = config_minutes('work_start', '09:00')
+        work_end = config_minutes('work_end', '18:00')
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid work_start/work_end config'}), 500
+    conn = sqlite3.connect('checkins.db')
+    try:
+        frame = attendance_analytics.load_frame(conn, date_from, date_to)
+    finally:
+        conn.close()
+    return jsonify({'from': date_from, 'to': date_to, 'work_start_minutes': work_start,
+                    'work_end_minutes': work_end,
+                    **attendance_analytics.analyze(frame, work_start, work_end)})
+
+@app.route('/api/retention')
+def api_retention():
+    """Retention job counters and the registered monthly archives"""
+    return jsonify({**scan_retention.stats(), 'archives': scan_retention.archives()})
+
+@app.route('/api/retention/run', methods=['POST'])
+def api_retention_run():
+    """Archive now instead of waiting for the background run"""
+    moved = scan_retention.run_once()
+    return jsonify({'success': scan_retention.last_error is None, 'moved': moved,
+                    'error': scan_retention.last_error})
+
+@app.route('/api/logs/rollup')
+def api_logs_rollup():
+    """Per-day/reader/status counts of archived scan logs (?from=&to= YYYY-MM-DD)"""
+    conditions, params = [], []
+    if request.args.get('from'):
+        conditions.append('day >= ?')
+        params.append(request.args['from'])
+    if request.args.get('to'):
+        conditions.append('day <= ?')
+        params.append(request.args['to'])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    conn = sqlite3.connect('checkins.db')
+    rows = conn.execute(f'''
+        SELECT day, reader_id, status, scan_count, first_scan, last_scan, archive
+        FROM scan_log_daily_rollup {where}
+        ORDER BY day, reader_id, status
+    ''', params).fetchall()
+    conn.close()
+    fields = ['day', 'reader_id', 'status', 'scan_count', 'first_scan', 'last_scan', 'archive']
+    return jsonify([dict(zip(fields, row)) for row in rows])
+
+@app.route('/api/pipeline/stats')
+def api_pipeline_stats():
+    """Per-stage queue depth gauges and drop counters of the scan pipeline"""
+    return jsonify(scan_pipeline.stats())
+
+@app.route('/api/filter/stats')
+def api_filter_stats():
+    """Enrolled-tag filter size and passed/dropped/sampled read counters"""
+    return jsonify(enrolled_filter.stats())
+
+@app.route('/api/trace/slow')
+def api_slow_scans():
+    """Slow scans with their stage timings, newest first (?limit=)"""
+    return jsonify({**scan_tracer.stats(), 'scans': scan_tracer.slow(request.args.get('limit', type=int))})
+
+@app.route('/api/trace/slow', methods=['DELETE'])
+def api_clear_slow_scans():
+    scan_tracer.clear()
+    return jsonify({'success': True})
+
+# ----- Prometheus Metrics -----
+# Values the components already count are read only when /metrics is scraped
+def _pipeline_samples(field: str):
+    stages = scan_pipeline.stats()['stages']
+    return [({'stage': stage}, stats[field]) for stage, stats in stages.items()]
+
+REGISTRY.collector('scan_queue_depth', 'gauge', 'Reads waiting in each pipeline queue',
+                   lambda: _pipeline_samples('depth'))
+REGISTRY.collector('scan_queue_high_watermark', 'gauge', 'Highest depth of each pipeline queue',
+                   lambda: _pipeline_samples('high_watermark'))
+REGISTRY.collector('scan_queue_dropped_total', 'counter', 'Reads dropped by full pipeline queues',
+                   lambda: [({'stage': stage, 'policy': policy}, stats[f'dropped_{policy}'])
+                            for stage, stats in scan_pipeline.stats()['stages'].items()
+                            for policy in ('duplicate', 'oldest')])
+REGISTRY.collector('scan_pipeline_errors_total', 'counter', 'Scan batches that failed to process',
+                   lambda: [({}, scan_pipeline.stats()['errors'])])
+REGISTRY.collector('scan_pipeline_dropped_reads_total', 'counter',
+                   'Reads dropped after still failing in their own transaction',
+                   lambda: [({}, scan_pipeline.stats()['dropped'])])
+REGISTRY.collector('reader_running', 'gauge', 'Whether the local inventory loop is running',
+                   lambda: [({}, int(reader_running))])
+REGISTRY.collector('tag_filter_reads_total', 'counter', 'Reads seen by the enrolled-tag filter',
+                   lambda: [({'result': result}, enrolled_filter.stats()[result])
+                            for result in ('passed', 'dropped', 'sampled')])
+REGISTRY.collector('tag_filter_entries', 'gauge', 'EPCs in the enrolled-tag filter',
+                   lambda: [({}, enrolled_filter.stats()['entries'])])
+REGISTRY.collector('socketio_clients', 'gauge', 'Connected Socket.IO clients',
+                   lambda: [({}, emit_coalescer.stats()['clients'])])
+REGISTRY.collector('socketio_events_total', 'counter', 'Events through the emit coalescer',
+                   lambda: [({'result': result}, emit_coalescer.stats()[key]) for result, key in
+                            (('queued', 'events_in'), ('superseded', 'dropped_superseded'),
+                             ('no_clients', 'dropped_no_clients'))])
+REGISTRY.collector('socketio_client_events_total', 'counter', 'Per-client event deliveries after fan-out',
+                   lambda: [({'result': result}, emit_coalescer.stats()[key]) for result, key in
+                            (('sent', 'events_sent'), ('superseded', 'client_superseded'))])
+REGISTRY.collector('response_cache_requests_total', 'counter', 'Cached API responses by outcome',
+                   lambda: [({'result': result}, response_cache.stats()[result])
+                            for result in ('hits', 'misses', 'not_modified')])
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Counters, gauges and histograms in Prometheus text format"""
+    return Response(REGISTRY.expose(), content_type=metrics.CONTENT_TYPE)
+
 # ----- HTTP Routes -----
 @app.route('/')
 def index():
-    today = datetime.now().strftime('%Y-%m-%d')
-    conn = sqlite3.connect('checkins.db')
-    # Get all employees with their attendance for today and all tags
-    employees = conn.execute('''
-        SELECT e.id, e.name,
-               (SELECT GROUP_CONCAT(et.rfid_uid, ', ') FROM employee_tags et WHERE et.employee_id = e.id AND et.is_active = 1) as rfid_uids,
-               a.check_in_time, a.check_out_time
-        FROM employees e
-        LEFT JOIN attendances a ON e.id = a.employee_id AND a.date = ?
-        WHERE e.is_active = 1
-        ORDER BY e.name
-    ''', (today,)).fetchall()
-    records = []
-    for emp_id, name, rfid_uids, check_in, check_out in employees:
-        records.append({
-            'id': emp_id,
-            'name': name,
-            'rfid_uids': rfid_uids or '',
-            'check_in_time': check_in,
-            'check_out_time': check_out,
-            'status': 'present' if check_in else 'absent'
-        })
+    records = attendance_board.records()
     # Lấy config khung giờ
     config = get_system_config()
     checkin_start = config.get('checkin_start', '08:45')
     checkin_end = config.get('checkin_end', '09:15')
     checkout_start = config.get('checkout_start', '17:45')
     checkout_end = config.get('checkout_end', '18:15')
-    conn.close()
     return render_template('index.html', records=records,
         checkin_start=checkin_start, checkin_end=checkin_end,
         checkout_start=checkout_start, checkout_end=checkout_end)
 
 @app.route('/get_attendance_data')
+@response_cache.cached('employees', 'employee_tags', 'attendances', vary=today_key)
 def get_attendance_data():
-    today = datetime.now().strftime('%Y-%m-%d')
-    conn = sqlite3.connect('checkins.db')
-    
-    employees = conn.execute('''
-        SELECT e.id, e.name,
-               (SELECT GROUP_CONCAT(et.rfid_uid, ', ') FROM employee_tags et WHERE et.employee_id = e.id AND et.is_active = 1) as rfid_uids,
-               a.check_in_time, a.check_out_time
-        FROM employees e
-        LEFT JOIN attendances a ON e.id = a.employee_id AND a.date = ?
-        WHERE e.is_active = 1
-        ORDER BY e.name
-    ''', (today,)).fetchall()
-
-    records = []
-    for emp_id, name, rfid_uids, check_in, check_out in employees:
-        records.append({
-            'id': emp_id,
-            'name': name,
-            'rfid_uids': rfid_uids or '',
-            'check_in_time': check_in,
-            'check_out_time': check_out,
-            'status': 'present' if check_in else 'absent'
-        })
-    
-    conn.close()
-    return jsonify(records)
+    return jsonify(attendance_board.records())
 
 @app.route('/clear_today_data', methods=['POST'])
 def clear_today_data():
@@ -558,9 +1262,14 @@ def clear_today_data():
         today = datetime.now().strftime('%Y-%m-%d')
         conn = sqlite3.connect('checkins.db')
         conn.execute("DELETE FROM attendances WHERE date=?", (today,))
-        conn.execute("DELETE FROM rfid_scan_logs WHERE date(timestamp)=?", (today,))
+        conn.execute("DELETE FROM rfid_scan_logs WHERE timestamp >= ? AND timestamp < ?",
+                     date_range_bounds(today, today))
         conn.commit()
         conn.close()
+        # Invalidate before bumping so no request caches the old state under the new version
+        attendance_state.invalidate()
+        attendance_board.invalidate_attendance()
+        data_versions.bump('attendances', 'rfid_scan_logs')
         logger.info(f"Cleared all attendance data for {today}")
         return jsonify({'success': True, 'message': f'Cleared data for {today}'})
     except Exception as e:
@@ -578,15 +1287,9 @@ def scan_logs():
         ORDER BY sl.timestamp DESC
         LIMIT 100
     ''').fetchall()
-    # Thống kê
-    total_logs = conn.execute('SELECT COUNT(*) FROM rfid_scan_logs').fetchone()[0]
-    total_success = conn.execute("""
-        SELECT COUNT(*) FROM rfid_scan_logs WHERE status IN ('checkin', 'checkout')
-    """).fetchone()[0]
-    total_ignored = conn.execute("""
-        SELECT COUNT(*) FROM rfid_scan_logs WHERE status IN (
-            'ignored', 'outside_hours', 'recent_scan', 'already_checked_in', 'already_checked_out', 'no_checkin')
-    """).fetchone()[0]
+    # Thống kê (pre-aggregated counters, O(days) instead of O(scans))
+    stats = query_scan_stats(conn)
+    total_logs, total_success, total_ignored = stats['total'], stats['success'], stats['ignored']
     conn.close()
     def get_status_display(status):
         status_map = {
@@ -613,10 +1316,8 @@ def admin_dashboard():
     # Get statistics
     total_employees = conn.execute('SELECT COUNT(*) FROM employees WHERE is_active = 1').fetchone()[0]
     total_tags = conn.execute('SELECT COUNT(*) FROM employee_tags WHERE is_active = 1').fetchone()[0]
-    today_attendance = conn.execute('''
-        SELECT COUNT(*) FROM attendances 
-        WHERE date = ? AND check_in_time IS NOT NULL
-    ''', (datetime.now().strftime('%Y-%m-%d'),)).fetchone()[0]
+    # Today's check-ins come from the in-memory attendance state
+    today_attendance = sum(1 for record in attendance_state.snapshot().values() if record.get('check_in_time'))
     
     # Get recent activities
     recent_logs = conn.execute('''
@@ -665,16 +1366,15 @@ def admin_add_employee():
             phone = request.form['phone']
             
             conn = sqlite3.connect('checkins.db')
-            conn.execute('''
+            cursor = conn.execute('''
                 INSERT INTO employees (name, employee_code, department, position, email, phone)
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (name, employee_code, department, position, email, phone))
             conn.commit()
+            attendance_board.refresh_employee(cursor.lastrowid, conn)
+            data_versions.bump('employees')
             conn.close()
             
-            # Reload employee map
-            load_employee_map()
-            
             return jsonify({'success': True, 'message': 'Employee added successfully'})
         except Exception as e:
             return jsonify({'success': False, 'message': str(e)})
@@ -701,9 +1401,8 @@ def admin_edit_employee(employee_id):
                 WHERE id=?
             ''', (name, employee_code, department, position, email, phone, employee_id))
             conn.commit()
-            
-            # Reload employee map
-            load_employee_map()
+            attendance_board.refresh_employee(employee_id, conn)
+            data_versions.bump('employees')
             
             return jsonify({'success': True, 'message': 'Employee updated successfully'})
         except Exception as e:
@@ -724,11 +1423,10 @@ def admin_delete_employee(employee_id):
         conn = sqlite3.connect('checkins.db')
         conn.execute('UPDATE employees SET is_active = 0 WHERE id = ?', (employee_id,))
         conn.commit()
+        attendance_board.refresh_employee(employee_id, conn)
+        data_versions.bump('employees')
         conn.close()
         
-        # Reload employee map
-        load_employee_map()
-        
         return jsonify({'success': True, 'message': 'Employee deleted successfully'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
@@ -765,16 +1463,15 @@ def admin_add_tag():
         tag_name = request.form['tag_name']
         
         conn = sqlite3.connect('checkins.db')
-        conn.execute('''
+        cursor = conn.execute('''
             INSERT INTO employee_tags (employee_id, rfid_uid, tag_name)
             VALUES (?, ?, ?)
         ''', (employee_id, rfid_uid, tag_name))
         conn.commit()
+        attendance_board.refresh_tag(cursor.lastrowid, conn)
+        data_versions.bump('employee_tags')
         conn.close()
         
-        # Reload employee map
-        load_employee_map()
-        
         return jsonify({'success': True, 'message': 'Tag added successfully'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
@@ -786,11 +1483,10 @@ def admin_delete_tag(tag_id):
         conn = sqlite3.connect('checkins.db')
         conn.execute('UPDATE employee_tags SET is_active = 0 WHERE id = ?', (tag_id,))
         conn.commit()
+        attendance_board.refresh_tag(tag_id, conn)
+        data_versions.bump('employee_tags')
         conn.close()
         
-        # Reload employee map
-        load_employee_map()
-        
         return jsonify({'success': True, 'message': 'Tag deleted successfully'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
@@ -817,7 +1513,7 @@ def admin_update_config():
         conn.commit()
         conn.close()
         
-        # Reload configuration
+        # Reload configuration (subscribers bump the cached /api/config)
         load_config_from_db()
         
         return jsonify({'success': True, 'message': 'Configuration updated successfully'})
@@ -828,39 +1524,179 @@ def admin_update_config():
 @socketio.on('connect')
 def handle_connect():
     logger.info(f"Client connected: {request.sid}")
+    emit_coalescer.add_client(request.sid)
 
 @socketio.on('disconnect')
 def handle_disconnect():
     logger.info(f"Client disconnected: {request.sid}")
+    emit_coalescer.remove_client(request.sid)
+
+# ----- Subscription Protocol -----
+# Client -> server: 'subscribe'   {reader_ids: [...], departments: [...]}
+#                   'unsubscribe' {reader_ids: [...], departments: [...]} (empty = all)
+# Server -> client: 'subscribed'  {rooms: [...]}
+# Clients without any subscription receive every scan event; once subscribed
+# they only receive employee_status_update for their readers/departments.
+# Board deltas stay broadcast, since the board needs every seq. Subscriptions
+# live in the emit coalescer, which routes every batch to its client's sid.
+def subscription_rooms(data) -> List[str]:
+    data = data or {}
+    rooms = []
+    for field, to_room in (('reader_ids', reader_room), ('departments', department_room)):
+        values = data.get(field) or []
+        if isinstance(values, str):
+            values = [values]
+        rooms.extend(to_room(str(value).strip()) for value in values if str(value).strip())
+    return rooms
+
+@socketio.on('subscribe')
+def handle_subscribe(data=None):
+    subscribed = emit_coalescer.subscribe(request.sid, subscription_rooms(data))
+    socketio.emit('subscribed', {'rooms': sorted(subscribed)}, to=request.sid)
+
+@socketio.on('unsubscribe')
+def handle_unsubscribe(data=None):
+    subscribed = emit_coalescer.unsubscribe(request.sid, subscription_rooms(data) or None)
+    socketio.emit('subscribed', {'rooms': sorted(subscribed)}, to=request.sid)
+
+# ----- Tag Enrollment Protocol -----
+# Client -> server: 'enrollment_join'  {}  watch the session (admin screens)
+#                   'enrollment_start' {}  open a session and watch it
+#                   'enrollment_stop'  {}
+#                   'enrollment_bind'  {assignments: [{epc, employee_id | employee_code, tag_name}],
+#                                       employee_codes: [...] (zipped with pending EPCs in seen order),
+#                                       dismiss: [epc, ...]}
+# Server -> room:   'enrollment_tags'  {tags: [{epc, first_seen, last_seen, reads}], pending_count}
+#                   'enrollment_state' {active, pending, pending_count, bound, ...}
+# Server -> client: 'enrollment_bound' bulk import report of the bind
+ENROLLMENT_ROOM = 'enrollment'
+
+def publish_enrollment_tags(tags: List[dict], pending_count: int):
+    socketio.emit('enrollment_tags', {'tags': tags, 'pending_count': pending_count}, to=ENROLLMENT_ROOM)
+
+# Known = active tag in the EPC map. Every employee/tag write bumps data_versions,
+# which reloads the map; a session start also reloads it for writes made elsewhere.
+data_versions.subscribe(lambda tables: load_employee_map()
+                        if 'employees' in tables or 'employee_tags' in tables else None)
+tag_enrollment = TagEnrollment(lambda epc: epc in EMPLOYEE_MAP, publish_enrollment_tags)
+
+def enrollment_state() -> dict:
+    return {**tag_enrollment.state(), 'reader_running': reader_running}
+
+def broadcast_enrollment_state():
+    socketio.emit('enrollment_state', enrollment_state(), to=ENROLLMENT_ROOM)
+
+def bind_enrollment(data: dict) -> dict:
+    """Bind pending EPCs to employees with one batched tag import"""
+    rows = [{
+        'rfid_uid': item.get('epc') or item.get('rfid_uid'),
+        'employee_id': item.get('employee_id'),
+        'employee_code': item.get('employee_code'),
+        'tag_name': item.get('tag_name'),
+    } for item in data.get('assignments') or []]
+    codes = data.get('employee_codes') or []
+    if codes:
+        assigned = {normalize_epc(row['rfid_uid']) for row in rows}
+        free = [tag['epc'] for tag in tag_enrollment.pending() if tag['epc'] not in assigned]
+        rows.extend({'rfid_uid': epc, 'employee_code': code} for epc, code in zip(free, codes))
+    tag_enrollment.remove(data.get('dismiss') or [], bound=False)
+    report = apply_bulk_import(import_tags, rows, ('employee_tags',)) if rows else \
+        {'total': 0, 'created': 0, 'reactivated': 0, 'errors': 0, 'results': []}
+    tag_enrollment.remove(result['rfid_uid'] for result in report['results']
+                          if result['status'] in ('created', 'reactivated'))
+    return report
+
+@socketio.on('enrollment_join')
+def handle_enrollment_join(data=None):
+    join_room(ENROLLMENT_ROOM)
+    socketio.emit('enrollment_state', enrollment_state(), to=request.sid)
+
+@socketio.on('enrollment_start')
+def handle_enrollment_start(data=None):
+    join_room(ENROLLMENT_ROOM)
+    # Writes from other processes never bump data_versions here
+    load_employee_map()
+    tag_enrollment.start()
+    broadcast_enrollment_state()
+
+@socketio.on('enrollment_stop')
+def handle_enrollment_stop(data=None):
+    tag_enrollment.stop()
+    broadcast_enrollment_state()
+
+@socketio.on('enrollment_bind')
+def handle_enrollment_bind(data=None):
+    try:
+        report = bind_enrollment(data or {})
+        socketio.emit('enrollment_bound', {'success': report['errors'] == 0, **report}, to=request.sid)
+    except Exception as e:
+        logger.error(f"Enrollment bind failed: {e}")
+        socketio.emit('enrollment_bound', {'success': False, 'message': str(e)}, to=request.sid)
+    broadcast_enrollment_state()
+
+@app.route('/api/enrollment')
+def api_enrollment():
+    """Current enrollment session and its unbound EPCs"""
+    return jsonify(enrollment_state())
+
+@app.route('/api/enrollment/bind', methods=['POST'])
+def api_enrollment_bind():
+    """HTTP form of enrollment_bind"""
+    try:
+        report = bind_enrollment(request.get_json() or {})
+    except Exception as e:
+        logger.error(f"Enrollment bind failed: {e}")
+        return jsonify({'success': False, 'message': str(e)})
+    broadcast_enrollment_state()
+    return jsonify({'success': report['errors'] == 0, **report})
+
+# ----- Board Delta Protocol -----
+# Server -> all:    'board_delta'    {seq, op: upsert|patch|remove|reset, ...}
+#                   (delivered inside 'event_batch' {events: [{event, data}]})
+# Client -> server: 'board_sync'     {since: <last seen seq>} (omit since for a snapshot)
+# Server -> client: 'board_deltas'   {seq, deltas: [...]} when the gap is still buffered
+#                   'board_snapshot' {seq, records: [...]} otherwise
+def broadcast_board_delta(delta: dict):
+    # Not keyed: clients need every seq to apply deltas in order
+    emit_coalescer.emit('board_delta', delta)
+
+attendance_board.subscribe(broadcast_board_delta)
+
+def board_sync_payload(since: Optional[int]) -> Tuple[str, dict]:
+    """Event name and payload answering a client that last saw `since`"""
+    if since is not None:
+        deltas = attendance_board.changes_since(since)
+        if deltas is not None:
+            seq = deltas[-1]['seq'] if deltas else since
+            return 'board_deltas', {'seq': seq, 'deltas': deltas}
+    seq, records = attendance_board.snapshot()
+    return 'board_snapshot', {'seq': seq, 'records': records}
+
+@socketio.on('board_sync')
+def handle_board_sync(data=None):
+    since = (data or {}).get('since')
+    try:
+        since = int(since) if since is not None else None
+    except (TypeError, ValueError):
+        since = None
+    event, payload = board_sync_payload(since)
+    socketio.emit(event, payload, to=request.sid)
+
+@app.route('/api/attendance/changes')
+def api_attendance_changes():
+    """HTTP form of board_sync: ?since=N returns missed deltas or a snapshot"""
+    since = request.args.get('since', type=int)
+    event, payload = board_sync_payload(since)
+    return jsonify({'type': 'deltas' if event == 'board_deltas' else 'snapshot', **payload})
 
 # ----- API Routes -----
 @app.route('/api/attendance')
+@response_cache.cached('employees', 'employee_tags', 'attendances', vary=today_key)
 def api_attendance():
-    today = datetime.now().strftime('%Y-%m-%d')
-    conn = sqlite3.connect('checkins.db')
-    employees = conn.execute('''
-        SELECT e.id, e.name,
-               (SELECT GROUP_CONCAT(et.rfid_uid, ', ') FROM employee_tags et WHERE et.employee_id = e.id AND et.is_active = 1) as rfid_uids,
-               a.check_in_time, a.check_out_time
-        FROM employees e
-        LEFT JOIN attendances a ON e.id = a.employee_id AND a.date = ?
-        WHERE e.is_active = 1
-        ORDER BY e.name
-    ''', (today,)).fetchall()
-    records = []
-    for emp_id, name, rfid_uids, check_in, check_out in employees:
-        records.append({
-            'id': emp_id,
-            'name': name,
-            'rfid_uids': rfid_uids or '',
-            'check_in_time': check_in,
-            'check_out_time': check_out,
-            'status': 'present' if check_in else 'absent'
-        })
-    conn.close()
-    return jsonify(records)
+    return jsonify(attendance_board.records())
 
 @app.route('/api/employees')
+@response_cache.cached('employees', 'employee_tags')
 def api_employees():
     conn = sqlite3.connect('checkins.db')
     employees = conn.execute('''
@@ -891,6 +1727,7 @@ def api_employees():
     return jsonify(result)
 
 @app.route('/api/tags')
+@response_cache.cached('employees', 'employee_tags')
 def api_tags():
     conn = sqlite3.connect('checkins.db')
     tags = conn.execute('''
@@ -916,42 +1753,262 @@ def api_tags():
     conn.close()
     return jsonify(result)
 
+def current_sync_version() -> int:
+    """sync_clock version; the triggers move it on every employee/tag write, from any process"""
+    conn = sqlite3.connect('checkins.db')
+    try:
+        return current_version(conn)
+    finally:
+        conn.close()
+
+@app.route('/api/sync')
+@response_cache.cached(vary=current_sync_version)
+def api_sync():
+    """Employees and tags changed since a version: ?since=N[&limit=]
+
+    Start with since=0 (full snapshot), then pass the returned version.
+    """
+    since = request.args.get('since', 0, type=int)
+    limit = min(max(request.args.get('limit', SYNC_DEFAULT_LIMIT, type=int), 1), SYNC_MAX_LIMIT)
+    if since < 0:
+        return jsonify({'success': False, 'message': 'since must be >= 0'}), 400
+    conn = sqlite3.connect('checkins.db')
+    try:
+        return jsonify(changes_since(conn, since, limit))
+    finally:
+        conn.close()
+
+# event_type (as shown in the UI) -> sargable condition on status/note
+LOG_EVENT_TYPE_FILTERS = {
+    'checkin': "sl.status = 'checkin'",
+    'checkout': "sl.status = 'checkout'",
+    'already_checked_in': "sl.status = 'ignored' AND sl.note = 'Already checked in today'",
+    'already_checked_out': "sl.status = 'ignored' AND sl.note = 'Later check-out already recorded'",
+    'no_checkin': "sl.status = 'ignored' AND sl.note = 'No check-in found for today'",
+    'recent_scan': "sl.status = 'ignored' AND sl.note = 'Recent scan detected'",
+    'unknown_employee': "(sl.status = 'unknown_employee' OR (sl.status = 'ignored' AND sl.note = 'Unknown RFID UID'))",
+    'outside_hours': "sl.status = 'outside_hours'",
+}
+
+LOGS_DEFAULT_LIMIT = 100
+LOGS_MAX_LIMIT = 1000
+
+def encode_log_cursor(timestamp: str, log_id: int) -> str:
+    """Opaque keyset cursor for (timestamp, id)"""
+    raw = json.dumps([timestamp, log_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_log_cursor(cursor: str) -> Tuple[str, int]:
+    """Decode a cursor produced by encode_log_cursor (raises ValueError)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, log_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(timestamp), int(log_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def date_range_bounds(date_from: Optional[str], date_to: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Turn from/to (YYYY-MM-DD or ISO datetime) into [lower, upper) timestamp bounds.
+
+    A plain date as the upper bound includes the whole day.
+    """
+    lower = upper = None
+    if date_from:
+        lower = datetime.fromisoformat(date_from).isoformat()
+    if date_to:
+        if len(date_to) == 10:
+            upper = (datetime.fromisoformat(date_to) + timedelta(days=1)).isoformat()
+        else:
+            upper = datetime.fromisoformat(date_to).isoformat()
+    return lower, upper
+
+LOG_SELECT_SQL = '''
+    SELECT sl.id, sl.rfid_uid, e.name as employee_name, e.employee_code, sl.timestamp, 
+           CASE 
+               WHEN sl.status = 'checkin' THEN 'checkin'
+               WHEN sl.status = 'checkout' THEN 'checkout'
+               WHEN sl.status = 'ignored' AND sl.note = 'Already checked in today' THEN 'already_checked_in'
+               WHEN sl.status = 'ignored' AND sl.note = 'Later check-out already recorded' THEN 'already_checked_out'
+               WHEN sl.status = 'ignored' AND sl.note = 'No check-in found for today' THEN 'no_checkin'
+               WHEN sl.status = 'ignored' AND sl.note = 'Recent scan detected' THEN 'recent_scan'
+               WHEN sl.status = 'ignored' AND sl.note = 'Unknown RFID UID' THEN 'unknown_employee'
+               WHEN sl.status = 'outside_hours' THEN 'outside_hours'
+               ELSE sl.status
+           END as event_type,
+           sl.reader_id as device_id, 'success' as status
+    FROM rfid_scan_logs sl
+    LEFT JOIN employees e ON sl.employee_id = e.id
+'''
+
+LOG_EXPORT_FIELDS = ['id', 'rfid_uid', 'employee_name', 'employee_code', 'scan_time', 'event_type', 'device_id', 'status']
+
+def log_row_to_dict(log) -> dict:
+    return {
+        'id': log[0],
+        'rfid_uid': log[1],
+        'employee_name': log[2] or 'Unknown',
+        'employee_code': log[3] or 'N/A',
+        'scan_time': log[4],
+        'event_type': log[5],
+        'device_id': log[6],
+        'status': log[7]
+    }
+
+def build_log_filters(args) -> Tuple[List[str], list]:
+    """WHERE conditions and params for the from/to/employee_id/reader_id/event_type filters"""
+    lower, upper = date_range_bounds(args.get('from'), args.get('to'))
+    conditions = []
+    params = []
+    if lower:
+        conditions.append('sl.timestamp >= ?')
+        params.append(lower)
+    if upper:
+        conditions.append('sl.timestamp < ?')
+        params.append(upper)
+    if args.get('employee_id'):
+        conditions.append('sl.employee_id = ?')
+        params.append(int(args['employee_id']))
+    if args.get('reader_id'):
+        conditions.append('sl.reader_id = ?')
+        params.append(args['reader_id'])
+    event_type = args.get('event_type')
+    if event_type and event_type != 'all':
+        if event_type in LOG_EVENT_TYPE_FILTERS:
+            conditions.append(LOG_EVENT_TYPE_FILTERS[event_type])
+        else:
+            conditions.append('sl.status = ?')
+            params.append(event_type)
+    return conditions, params
+
 @app.route('/api/logs')
 def api_logs():
+    """Scan logs, newest first, keyset-paginated on (timestamp, id).
+
+    Query parameters: limit, cursor, from, to, employee_id, reader_id,
+    event_type. The body stays a JSON array; the cursor of the next page
+    is returned in the X-Next-Cursor header (absent on the last page).
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', LOGS_DEFAULT_LIMIT)), 1), LOGS_MAX_LIMIT)
+        conditions, params = build_log_filters(request.args)
+        cursor = request.args.get('cursor')
+        if cursor:
+            conditions.append('(sl.timestamp, sl.id) < (?, ?)')
+            params.extend(decode_log_cursor(cursor))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+
     conn = sqlite3.connect('checkins.db')
-    logs = conn.execute('''
-        SELECT sl.id, sl.rfid_uid, e.name as employee_name, e.employee_code, sl.timestamp, 
-               CASE 
-                   WHEN sl.status = 'checkin' THEN 'checkin'
-                   WHEN sl.status = 'checkout' THEN 'checkout'
-                   WHEN sl.status = 'ignored' AND sl.note = 'Already checked in today' THEN 'already_checked_in'
-                   WHEN sl.status = 'ignored' AND sl.note = 'No check-in found for today' THEN 'no_checkin'
-                   WHEN sl.status = 'ignored' AND sl.note = 'Recent scan detected' THEN 'recent_scan'
-                   WHEN sl.status = 'ignored' AND sl.note = 'Unknown RFID UID' THEN 'unknown_employee'
-                   WHEN sl.status = 'outside_hours' THEN 'outside_hours'
-                   ELSE sl.status
-               END as event_type,
-               sl.reader_id as device_id, 'success' as status
-        FROM rfid_scan_logs sl
-        LEFT JOIN employees e ON sl.employee_id = e.id
-        ORDER BY sl.timestamp DESC
-    ''').fetchall()
-    result = []
-    for log in logs:
-        result.append({
-            'id': log[0],
-            'rfid_uid': log[1],
-            'employee_name': log[2] or 'Unknown',
-            'employee_code': log[3] or 'N/A',
-            'scan_time': log[4],
-            'event_type': log[5],
-            'device_id': log[6],
-            'status': log[7]
-        })
+    logs = conn.execute(f'''
+        {LOG_SELECT_SQL}
+        {where}
+        ORDER BY sl.timestamp DESC, sl.id DESC
+        LIMIT ?
+    ''', (*params, limit + 1)).fetchall()
     conn.close()
-    return jsonify(result)
+
+    has_more = len(logs) > limit
+    logs = logs[:limit]
+    response = jsonify([log_row_to_dict(log) for log in logs])
+    if has_more:
+        response.headers['X-Next-Cursor'] = encode_log_cursor(logs[-1][4], logs[-1][0])
+    return response
+
+# ----- Streaming Exports -----
+EXPORT_FETCH_SIZE = 500
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+def stream_query_rows(sql: str, params: list, fields: List[str], to_dict, fmt: str):
+    """Yield CSV or NDJSON chunks from a query, EXPORT_FETCH_SIZE rows at a time.
+
+    The connection lives inside the generator, so the query only starts
+    when the client begins reading and memory stays constant.
+    """
+    conn = sqlite3.connect('checkins.db')
+    try:
+        cursor = conn.execute(sql, params)
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields) if fmt == 'csv' else None
+        if writer:
+            writer.writeheader()
+            yield buffer.getvalue()
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            if writer:
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(to_dict(row) for row in rows)
+                yield buffer.getvalue()
+            else:
+                yield ''.join(json.dumps(to_dict(row), ensure_ascii=False) + '\n' for row in rows)
+    finally:
+        conn.close()
+
+def export_response(name: str, generator, fmt: str) -> Response:
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    response = Response(stream_with_context(generator), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{name}.{extension}"'
+    return response
+
+@app.route('/api/logs/export')
+def api_logs_export():
+    """Stream scan logs as CSV (default) or NDJSON; same filters as /api/logs"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'message': f'Unsupported format: {fmt}'}), 400
+    try:
+        conditions, params = build_log_filters(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+    sql = f'{LOG_SELECT_SQL} {where} ORDER BY sl.timestamp, sl.id'
+    generator = stream_query_rows(sql, params, LOG_EXPORT_FIELDS, log_row_to_dict, fmt)
+    return export_response('scan_logs', generator, fmt)
+
+ATTENDANCE_EXPORT_FIELDS = ['date', 'employee_id', 'employee_code', 'name', 'department',
+                            'check_in_time', 'check_out_time', 'note']
+
+@app.route('/api/attendance/export')
+def api_attendance_export():
+    """Stream attendance rows for a date range (from/to, YYYY-MM-DD) as CSV or NDJSON"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'message': f'Unsupported format: {fmt}'}), 400
+    conditions = []
+    params = []
+    try:
+        if request.args.get('from'):
+            conditions.append('a.date >= ?')
+            params.append(datetime.strptime(request.args['from'], '%Y-%m-%d').strftime('%Y-%m-%d'))
+        if request.args.get('to'):
+            conditions.append('a.date <= ?')
+            params.append(datetime.strptime(request.args['to'], '%Y-%m-%d').strftime('%Y-%m-%d'))
+        if request.args.get('employee_id'):
+            conditions.append('a.employee_id = ?')
+            params.append(int(request.args['employee_id']))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+    sql = f'''
+        SELECT a.date, a.employee_id, e.employee_code, e.name, e.department,
+               a.check_in_time, a.check_out_time, a.note
+        FROM attendances a
+        JOIN employees e ON a.employee_id = e.id
+        {where}
+        ORDER BY a.date, a.employee_id
+    '''
+    generator = stream_query_rows(sql, params, ATTENDANCE_EXPORT_FIELDS,
+                                  lambda row: dict(zip(ATTENDANCE_EXPORT_FIELDS, row)), fmt)
+    return export_response('attendance', generator, fmt)
 
 @app.route('/api/config')
+@response_cache.cached('system_config', vary=lambda: config_store.current().row_version)
 def api_config():
     config = get_system_config()
     return jsonify(config)
@@ -993,9 +2050,14 @@ def api_clear_today_attendance():
         today = datetime.now().strftime('%Y-%m-%d')
         conn = sqlite3.connect('checkins.db')
         conn.execute("DELETE FROM attendances WHERE date=?", (today,))
-        conn.execute("DELETE FROM rfid_scan_logs WHERE date(timestamp)=?", (today,))
+        conn.execute("DELETE FROM rfid_scan_logs WHERE timestamp >= ? AND timestamp < ?",
+                     date_range_bounds(today, today))
         conn.commit()
         conn.close()
+        # Invalidate before bumping so no request caches the old state under the new version
+        attendance_state.invalidate()
+        attendance_board.invalidate_attendance()
+        data_versions.bump('attendances', 'rfid_scan_logs')
         logger.info(f"Cleared all attendance data for {today}")
         return jsonify({'success': True, 'message': f'Cleared data for {today}'})
     except Exception as e:
@@ -1033,6 +2095,8 @@ def api_create_employee():
                     existing[0]
                 ))
                 conn.commit()
+                attendance_board.refresh_employee(existing[0], conn)
+                data_versions.bump('employees')
                 conn.close()
                 return jsonify({'success': True, 'message': 'Employee reactivated successfully', 'id': existing[0]})
         
@@ -1051,12 +2115,74 @@ def api_create_employee():
         
         employee_id = cursor.lastrowid
         conn.commit()
+        attendance_board.refresh_employee(employee_id, conn)
+        data_versions.bump('employees')
         conn.close()
         
         return jsonify({'success': True, 'message': 'Employee created successfully', 'id': employee_id})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+# ----- Bulk Import -----
+MAX_IMPORT_ROWS = 50000
+
+def read_import_rows() -> List[dict]:
+    """Rows of a bulk import: JSON array, CSV body or an uploaded 'file'"""
+    upload = request.files.get('file')
+    if upload:
+        return read_rows(upload.read(), upload.mimetype or '')
+    return read_rows(request.get_data(), request.content_type or '')
+
+def apply_bulk_import(importer, rows: List[dict], tables: Tuple[str, ...], dry_run: bool = False) -> dict:
+    """Validate in memory, write in one transaction, refresh derived state once"""
+    conn = sqlite3.connect('checkins.db', isolation_level=None)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            report, employee_ids = importer(conn, rows)
+            conn.execute('ROLLBACK' if dry_run else 'COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        written = not dry_run and (report['created'] or report['reactivated'])
+        if written:
+            # One roster query for every affected employee
+            attendance_board.refresh_employees(employee_ids, conn)
+    finally:
+        conn.close()
+
+    if written:
+        data_versions.bump(*tables)
+    logger.info(f"Bulk import{' (dry run)' if dry_run else ''}: {report['created']} created, "
+                f"{report['reactivated']} reactivated, {report['errors']} error(s)")
+    return report
+
+def run_bulk_import(importer, tables: Tuple[str, ...]):
+    """HTTP form of apply_bulk_import; ?dry_run=1 validates without writing"""
+    try:
+        rows = read_import_rows()
+    except ImportFormatError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if len(rows) > MAX_IMPORT_ROWS:
+        return jsonify({'success': False, 'message': f'At most {MAX_IMPORT_ROWS} rows per import'}), 400
+    dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+    try:
+        report = apply_bulk_import(importer, rows, tables, dry_run)
+    except Exception as e:
+        logger.error(f"Bulk import failed: {e}")
+        return jsonify({'success': False, 'message': str(e)})
+    return jsonify({'success': report['errors'] == 0, 'dry_run': dry_run, **report})
+
+@app.route('/api/employees/import', methods=['POST'])
+def api_import_employees():
+    """Bulk create/reactivate employees (name, employee_code, department, position, email, phone)"""
+    return run_bulk_import(import_employees, ('employees',))
+
+@app.route('/api/tags/import', methods=['POST'])
+def api_import_tags():
+    """Bulk create/reactivate tags (rfid_uid, employee_id or employee_code, tag_name)"""
+    return run_bulk_import(import_tags, ('employee_tags',))
+
 @app.route('/api/employees/<int:employee_id>', methods=['PUT'])
 def api_update_employee(employee_id):
     try:
@@ -1087,6 +2213,8 @@ def api_update_employee(employee_id):
         ))
         
         conn.commit()
+        attendance_board.refresh_employee(employee_id, conn)
+        data_versions.bump('employees')
         conn.close()
         
         return jsonify({'success': True, 'message': 'Employee updated successfully'})
@@ -1103,6 +2231,8 @@ def api_delete_employee(employee_id):
         conn.execute('UPDATE employee_tags SET is_active = 0 WHERE employee_id = ?', (employee_id,))
         
         conn.commit()
+        attendance_board.refresh_employee(employee_id, conn)
+        data_versions.bump('employees', 'employee_tags')
         conn.close()
         
         return jsonify({'success': True, 'message': 'Employee deleted successfully'})
@@ -1137,6 +2267,8 @@ def api_create_tag():
                     existing[0]
                 ))
                 conn.commit()
+                attendance_board.refresh_tag(existing[0], conn)
+                data_versions.bump('employee_tags')
                 conn.close()
                 return jsonify({'success': True, 'message': 'Tag reactivated successfully', 'id': existing[0]})
         
@@ -1152,6 +2284,8 @@ def api_create_tag():
         
         tag_id = cursor.lastrowid
         conn.commit()
+        attendance_board.refresh_tag(tag_id, conn)
+        data_versions.bump('employee_tags')
         conn.close()
         
         return jsonify({'success': True, 'message': 'Tag created successfully', 'id': tag_id})
@@ -1185,6 +2319,8 @@ def api_update_tag(tag_id):
         ))
         
         conn.commit()
+        attendance_board.refresh_tag(tag_id, conn)
+        data_versions.bump('employee_tags')
         conn.close()
         
         return jsonify({'success': True, 'message': 'Tag updated successfully'})
@@ -1200,6 +2336,8 @@ def api_delete_tag(tag_id):
         conn.execute('UPDATE employee_tags SET is_active = 0 WHERE id = ?', (tag_id,))
         
         conn.commit()
+        attendance_board.refresh_tag(tag_id, conn)
+        data_versions.bump('employee_tags')
         conn.close()
         
         return jsonify({'success': True, 'message': 'Tag deleted successfully'})
@@ -1209,6 +2347,11 @@ def api_delete_tag(tag_id):
 # ----- Main Entry Point -----
 if __name__ == '__main__':
     init_db()
+    load_config_from_db()
+    shift_schedule.load()
+    attendance_state.load()
+    scan_retention.start()
+    attendance_summary.start()
     # Không tự động start reader nữa
     logger.info("App ready. Use web UI to start/stop reader.")
     logger.info("Starting Flask-SocketIO app on http://localhost:3000")
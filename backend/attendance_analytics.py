@@ -0,0 +1,202 @@
+import sqlite3
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency: only the analytics endpoints need it
+    np = None
+
+# Upper bounds (minutes) of the overtime histogram bins; the last bin is open
+OVERTIME_BINS = [0, 15, 30, 60, 120, 240]
+DEFAULT_PERCENTILES = (10, 50, 90, 95)
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+@dataclass
+class AttendanceFrame:
+    """Columnar attendance data for a date range.
+
+    One entry per attendance row. Times are seconds since the epoch of the
+    naive local timestamps (NaN when missing), so time of day is simply
+    ``(t - day * 86400) / 60`` minutes.
+    """
+    employee: 'np.ndarray'          # int32 code into employee_ids
+    department: 'np.ndarray'        # int32 code into departments
+    day: 'np.ndarray'               # int32 days since the epoch
+    check_in: 'np.ndarray'          # float64 epoch seconds, NaN if missing
+    check_out: 'np.ndarray'         # float64 epoch seconds, NaN if missing
+    employee_ids: 'np.ndarray'      # int64 employee ID per code
+    departments: List[str]          # department name per code
+
+    def __len__(self) -> int:
+        return int(self.day.shape[0])
+
+    @classmethod
+    def from_columns(cls, employee_ids: Sequence[int], departments: Sequence[Optional[str]],
+                     dates: Sequence[str], check_ins: Sequence[Optional[str]],
+                     check_outs: Sequence[Optional[str]]) -> 'AttendanceFrame':
+        """Build a frame from raw column sequences (ISO strings, None for missing)."""
+        if np is None:
+            raise RuntimeError('numpy is required for attendance analytics')
+        unique_employees, employee_codes = np.unique(np.asarray(employee_ids, dtype=np.int64), return_inverse=True)
+        department_names = np.asarray([d or '' for d in departments], dtype=object)
+        unique_departments, department_codes = np.unique(department_names.astype(str), return_inverse=True)
+        return cls(
+            employee=employee_codes.astype(np.int32),
+            department=department_codes.astype(np.int32),
+            day=np.asarray(dates, dtype='datetime64[D]').astype(np.int32),
+            check_in=_epoch_seconds(check_ins),
+            check_out=_epoch_seconds(check_outs),
+            employee_ids=unique_employees,
+            departments=[str(d) for d in unique_departments],
+        )
+
+
+def _epoch_seconds(values: Sequence[Optional[str]]) -> 'np.ndarray':
+    stamps = np.asarray([v if v else 'NaT' for v in values], dtype='datetime64[us]')
+    seconds = stamps.astype('datetime64[s]').astype(np.int64).astype(np.float64)
+    seconds[np.isnat(stamps)] = np.nan
+    return seconds
+
+
+def load_frame(conn: sqlite3.Connection, date_from: str, date_to: str) -> AttendanceFrame:
+    """Load attendances between two dates (inclusive) in one query."""
+    rows = conn.execute('''
+        SELECT a.employee_id, e.department, a.date, a.check_in_time, a.check_out_time
+        FROM attendances a
+        JOIN employees e ON e.id = a.employee_id
+        WHERE a.date BETWEEN ? AND ?
+    ''', (date_from, date_to)).fetchall()
+    columns = list(zip(*rows)) if rows else [[], [], [], [], []]
+    return AttendanceFrame.from_columns(*columns)
+
+
+def _minutes_of_day(frame: AttendanceFrame, stamps: 'np.ndarray', mask: 'np.ndarray') -> 'np.ndarray':
+    """Minutes after midnight of the masked rows of a time column"""
+    return (stamps[mask] - frame.day[mask].astype(np.float64) * 86400.0) / 60.0
+
+
+def _group_percentiles(groups: 'np.ndarray', values: 'np.ndarray', n_groups: int,
+                       percentiles: Sequence[float]) -> 'np.ndarray':
+    """Linear-interpolated percentiles of values per group code, without a loop over groups.
+
+    Returns:
+        np.ndarray: Shape (n_groups, len(percentiles)), NaN for empty groups.
+    """
+    counts = np.bincount(groups, minlength=n_groups)
+    # One sort on a composite key: each group occupies its own, ordered value range
+    if values.size:
+        low = values.min()
+        span = values.max() - low + 1.0
+        offsets = np.repeat(np.arange(n_groups), counts) * span
+        sorted_values = np.sort(groups * span + (values - low)) - offsets + low
+    else:
+        sorted_values = values
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    q = np.asarray(percentiles, dtype=np.float64) / 100.0
+    # Fractional rank of every (group, percentile) pair
+    rank = starts[:, None] + q[None, :] * np.maximum(counts - 1, 0)[:, None]
+    lower = np.floor(rank).astype(np.int64)
+    upper = np.minimum(lower + 1, starts[:, None] + np.maximum(counts - 1, 0)[:, None])
+    result = np.full((n_groups, len(q)), np.nan)
+    has_data = counts > 0
+    if sorted_values.size:
+        lower_c = np.clip(lower, 0, sorted_values.size - 1)
+        upper_c = np.clip(upper, 0, sorted_values.size - 1)
+        weight = rank - lower
+        interpolated = sorted_values[lower_c] * (1 - weight) + sorted_values[upper_c] * weight
+        result[has_data] = interpolated[has_data]
+    return result
+
+
+def arrival_percentiles(frame: AttendanceFrame,
+                        percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Dict[str, float]]:
+    """Check-in time-of-day percentiles (minutes after midnight) per department."""
+    present = ~np.isnan(frame.check_in)
+    minutes = _minutes_of_day(frame, frame.check_in, present)
+    values = _group_percentiles(frame.department[present], minutes, len(frame.departments), percentiles)
+    counts = np.bincount(frame.department[present], minlength=len(frame.departments))
+    return {
+        name: {'count': int(counts[i]), **{f'p{p:g}': _round(values[i, j]) for j, p in enumerate(percentiles)}}
+        for i, name in enumerate(frame.departments)
+    }
+
+
+def overtime_histogram(frame: AttendanceFrame, work_end_minutes: float,
+                       bins: Sequence[float] = OVERTIME_BINS) -> Dict[str, Any]:
+    """Histogram of minutes worked past work end, overall and per department.
+
+    Only days with a check-out are counted; leaving before work end counts
+    as zero overtime.
+    """
+    has_out = ~np.isnan(frame.check_out)
+    overtime = np.maximum(_minutes_of_day(frame, frame.check_out, has_out) - work_end_minutes, 0.0)
+    bin_index = np.digitize(overtime, bins[1:], right=True)
+    n_bins = len(bins)
+    per_department = np.bincount(frame.department[has_out] * n_bins + bin_index,
+                                 minlength=len(frame.departments) * n_bins).reshape(-1, n_bins)
+    labels = [f'{lo}-{hi}' for lo, hi in zip(bins[:-1], bins[1:])] + [f'{bins[-1]}+']
+    return {
+        'bins': labels,
+        'overall': per_department.sum(axis=0).tolist(),
+        'departments': {name: per_department[i].tolist() for i, name in enumerate(frame.departments)},
+        'mean_minutes': _round(overtime.mean()) if overtime.size else 0.0,
+    }
+
+
+def chronic_late(frame: AttendanceFrame, work_start_minutes: float, grace_minutes: float = 5.0,
+                 min_late_ratio: float = 0.3, min_months: int = 3, min_days: int = 8) -> List[Dict[str, Any]]:
+    """Employees late on at least min_late_ratio of their days in >= min_months months.
+
+    A month only counts if the employee has at least min_days check-ins in it.
+    """
+    present = ~np.isnan(frame.check_in)
+    employees = frame.employee[present]
+    months = frame.day[present].astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    if months.size == 0:
+        return []
+    first_month = months.min()
+    month_index = months - first_month
+    n_months = int(month_index.max()) + 1
+    n_employees = len(frame.employee_ids)
+    late = _minutes_of_day(frame, frame.check_in, present) > work_start_minutes + grace_minutes
+
+    cell = employees.astype(np.int64) * n_months + month_index
+    days = np.bincount(cell, minlength=n_employees * n_months).reshape(n_employees, n_months)
+    late_days = np.bincount(cell, weights=late, minlength=n_employees * n_months).reshape(n_employees, n_months)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = np.where(days > 0, late_days / days, 0.0)
+    chronic_months = (ratio >= min_late_ratio) & (days >= min_days)
+    month_counts = chronic_months.sum(axis=1)
+    flagged = np.nonzero(month_counts >= min_months)[0]
+
+    total_days = days.sum(axis=1)
+    total_late = late_days.sum(axis=1)
+    month_labels = (np.arange(n_months) + first_month).astype('datetime64[M]').astype(str)
+    return [{
+        'employee_id': int(frame.employee_ids[e]),
+        'late_months': int(month_counts[e]),
+        'months': month_labels[chronic_months[e]].tolist(),
+        'late_days': int(total_late[e]),
+        'days': int(total_days[e]),
+        'late_ratio': _round(total_late[e] / total_days[e]) if total_days[e] else 0.0,
+    } for e in flagged[np.argsort(-month_counts[flagged], kind='stable')]]
+
+
+def _round(value: float, digits: int = 2) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def analyze(frame: AttendanceFrame, work_start_minutes: float, work_end_minutes: float) -> Dict[str, Any]:
+    """All HR distributions for one frame."""
+    return {
+        'rows': len(frame),
+        'employees': int(len(frame.employee_ids)),
+        'arrival_percentiles': arrival_percentiles(frame),
+        'overtime_histogram': overtime_histogram(frame, work_end_minutes),
+        'chronic_late': chronic_late(frame, work_start_minutes),
+    }
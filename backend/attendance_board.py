@@ -0,0 +1,306 @@
+import sqlite3
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from attendance_state import TodayAttendanceState
+
+
+logger = logging.getLogger(__name__)
+
+
+class AttendanceBoard:
+    """Materialised view of today's attendance board.
+
+    One row per active employee with their active tags and today's
+    check-in/check-out, kept in memory and updated incrementally:
+
+    - accepted scans call ``apply_attendance``
+    - employee changes call ``refresh_employee``
+    - tag changes call ``refresh_tag``
+    - the attendance part is re-pulled from ``TodayAttendanceState`` at
+      midnight rollover or after ``invalidate_attendance``
+
+    Routes that render the board read ``records()`` and never query.
+
+    Every change is also recorded as a delta with a monotonically increasing
+    sequence number (``upsert``, ``patch``, ``remove`` or ``reset``). The last
+    ``delta_capacity`` deltas are kept so a reconnecting client can replay
+    what it missed with ``changes_since``.
+    """
+
+    def __init__(self, attendance_state: TodayAttendanceState, db_path: str = 'checkins.db',
+                 delta_capacity: int = 1000):
+        self.attendance_state = attendance_state
+        self.db_path = db_path
+        self._seq = 0
+        self._deltas: deque = deque(maxlen=delta_capacity)
+        self._listeners: List[Callable[[dict], None]] = []
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._date: Optional[str] = None
+        self._rows: Dict[int, dict] = {}
+        self._tags: Dict[int, Dict[int, str]] = {}   # employee_id -> {tag_id: rfid_uid}
+        self._tag_owner: Dict[int, int] = {}         # tag_id -> employee_id
+        self._order: List[int] = []
+        self._order_dirty = True
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now().strftime('%Y-%m-%d')
+
+    def subscribe(self, listener: Callable[[dict], None]) -> None:
+        """Register a callback receiving every delta after it is recorded."""
+        self._listeners.append(listener)
+
+    def _record(self, pending: List[dict], op: str, **payload) -> None:
+        # Caller holds self._lock, so sequence order == mutation order
+        self._seq += 1
+        delta = {'seq': self._seq, 'op': op, **payload}
+        self._deltas.append(delta)
+        pending.append(delta)
+
+    def _publish(self, pending: List[dict]) -> None:
+        for delta in pending:
+            for listener in self._listeners:
+                try:
+                    listener(delta)
+                except Exception as e:
+                    logger.error(f"Error publishing board delta {delta['seq']}: {e}")
+
+    def _query_roster(self, conn: sqlite3.Connection, employee_ids: Optional[Iterable[int]] = None):
+        where = 'e.is_active = 1'
+        params: tuple = ()
+        if employee_ids is not None:
+            ids = list(employee_ids)
+            where += f" AND e.id IN ({','.join('?' * len(ids))})"
+            params = tuple(ids)
+        return conn.execute(f'''
+            SELECT e.id, e.name, et.id, et.rfid_uid
+            FROM employees e
+            LEFT JOIN employee_tags et ON et.employee_id = e.id AND et.is_active = 1
+            WHERE {where}
+            ORDER BY e.id, et.id
+        ''', params).fetchall()
+
+    def _new_row(self, employee_id: int, name: str) -> dict:
+        return {
+            'id': employee_id,
+            'name': name,
+            'rfid_uids': '',
+            'check_in_time': None,
+            'check_out_time': None,
+            'status': 'absent',
+        }
+
+    @staticmethod
+    def _set_attendance(row: dict, attendance: Optional[dict]) -> None:
+        check_in = attendance.get('check_in_time') if attendance else None
+        row['check_in_time'] = check_in
+        row['check_out_time'] = attendance.get('check_out_time') if attendance else None
+        row['status'] = 'present' if check_in else 'absent'
+
+    def load(self, conn: Optional[sqlite3.Connection] = None) -> None:
+        """Build the whole board: one roster query plus the in-memory attendance."""
+        own_conn = conn is None
+        if own_conn:
+            conn = sqlite3.connect(self.db_path)
+        try:
+            roster = self._query_roster(conn)
+        finally:
+            if own_conn:
+                conn.close()
+        attendance = self.attendance_state.snapshot()
+
+        rows: Dict[int, dict] = {}
+        tags: Dict[int, Dict[int, str]] = {}
+        tag_owner: Dict[int, int] = {}
+        for employee_id, name, tag_id, rfid_uid in roster:
+            if employee_id not in rows:
+                rows[employee_id] = self._new_row(employee_id, name)
+                tags[employee_id] = {}
+                self._set_attendance(rows[employee_id], attendance.get(employee_id))
+            if tag_id is not None:
+                tags[employee_id][tag_id] = rfid_uid
+                tag_owner[tag_id] = employee_id
+        for employee_id, row in rows.items():
+            row['rfid_uids'] = ', '.join(tags[employee_id].values())
+
+        pending: List[dict] = []
+        with self._lock:
+            self._rows = rows
+            self._tags = tags
+            self._tag_owner = tag_owner
+            self._date = self._today()
+            self._order_dirty = True
+            if self._loaded:
+                self._record(pending, 'reset')
+            self._loaded = True
+        self._publish(pending)
+        logger.info(f"Attendance board loaded: {len(rows)} employee(s)")
+
+    def _ensure_current(self) -> None:
+        if not self._loaded:
+            self.load()
+            return
+        if self._date != self._today():
+            attendance = self.attendance_state.snapshot()
+            pending: List[dict] = []
+            with self._lock:
+                for employee_id, row in self._rows.items():
+                    self._set_attendance(row, attendance.get(employee_id))
+                self._date = self._today()
+                self._record(pending, 'reset')
+            self._publish(pending)
+
+    def refresh_employee(self, employee_id: int, conn: Optional[sqlite3.Connection] = None) -> None:
+        """Re-read one employee (and their tags) after an employee or tag change."""
+        self.refresh_employees([employee_id], conn)
+
+    def refresh_employees(self, employee_ids: Iterable[int], conn: Optional[sqlite3.Connection] = None) -> None:
+        """Re-read several employees in one query."""
+        ids = {int(employee_id) for employee_id in employee_ids if employee_id is not None}
+        if not ids or not self._loaded:
+            return
+        own_conn = conn is None
+        if own_conn:
+            conn = sqlite3.connect(self.db_path)
+        try:
+            roster = self._query_roster(conn, ids)
+        finally:
+            if own_conn:
+                conn.close()
+
+        fresh: Dict[int, tuple] = {}
+        for employee_id, name, tag_id, rfid_uid in roster:
+            name_and_tags = fresh.setdefault(employee_id, (name, {}))
+            if tag_id is not None:
+                name_and_tags[1][tag_id] = rfid_uid
+
+        pending: List[dict] = []
+        with self._lock:
+            for employee_id in ids:
+                for tag_id in self._tags.pop(employee_id, {}):
+                    self._tag_owner.pop(tag_id, None)
+                if employee_id not in fresh:
+                    if self._rows.pop(employee_id, None) is not None:
+                        self._order_dirty = True
+                        self._record(pending, 'remove', id=employee_id)
+                    continue
+                name, employee_tags = fresh[employee_id]
+                row = self._rows.get(employee_id)
+                if row is None:
+                    row = self._new_row(employee_id, name)
+                    self._set_attendance(row, self.attendance_state.get(employee_id))
+                    self._rows[employee_id] = row
+                    self._order_dirty = True
+                elif row['name'] != name:
+                    row['name'] = name
+                    self._order_dirty = True
+                self._tags[employee_id] = employee_tags
+                for tag_id in employee_tags:
+                    self._tag_owner[tag_id] = employee_id
+                row['rfid_uids'] = ', '.join(employee_tags.values())
+                self._record(pending, 'upsert', row=dict(row))
+        self._publish(pending)
+
+    def refresh_tag(self, tag_id: int, conn: Optional[sqlite3.Connection] = None) -> None:
+        """Refresh the previous and current owner of a tag after a tag change."""
+        if not self._loaded:
+            return
+        own_conn = conn is None
+        if own_conn:
+            conn = sqlite3.connect(self.db_path)
+        try:
+            owner = conn.execute('SELECT employee_id FROM employee_tags WHERE id = ?', (tag_id,)).fetchone()
+            with self._lock:
+                previous = self._tag_owner.get(tag_id)
+            self.refresh_employees([previous, owner[0] if owner else None], conn)
+        finally:
+            if own_conn:
+                conn.close()
+
+    def apply_attendance(self, employee_id: int, check_type: str, timestamp: str) -> None:
+        """Record an accepted check-in/check-out on the board."""
+        # First scan after midnight rolls the board over before patching it
+        self._ensure_current()
+        pending: List[dict] = []
+        with self._lock:
+            row = self._rows.get(employee_id)
+            if row is None or self._date != timestamp[:10]:
+                return
+            if check_type == 'checkin':
+                row['check_in_time'] = timestamp
+                row['status'] = 'present'
+                changes = {'check_in_time': timestamp, 'status': 'present'}
+            else:
+                row['check_out_time'] = timestamp
+                changes = {'check_out_time': timestamp}
+            self._record(pending, 'patch', id=employee_id, changes=changes)
+        self._publish(pending)
+
+    def invalidate_attendance(self) -> None:
+        """Re-pull the attendance columns from the attendance state now.
+
+        Records a ``reset`` delta, telling clients to take a new snapshot.
+        """
+        if not self._loaded:
+            return
+        with self._lock:
+            self._date = None
+        self._ensure_current()
+
+    def records(self) -> List[dict]:
+        """Board rows ordered by name, as plain dicts."""
+        self._ensure_current()
+        with self._lock:
+            if self._order_dirty:
+                self._order = sorted(self._rows, key=lambda eid: (self._rows[eid]['name'], eid))
+                self._order_dirty = False
+            return [dict(self._rows[employee_id]) for employee_id in self._order]
+
+    def snapshot(self) -> Tuple[int, List[dict]]:
+        """Sequence number and board rows, taken consistently."""
+        self._ensure_current()
+        with self._lock:
+            seq = self._seq
+        records = self.records()
+        with self._lock:
+            if self._seq == seq:
+                return seq, records
+        # A change raced the copy; retry once under a stable sequence
+        return self.snapshot()
+
+    def changes_since(self, seq: int) -> Optional[List[dict]]:
+        """Deltas after ``seq``, or None if the client must take a snapshot.
+
+        A snapshot is needed when the gap is older than the ring buffer, when
+        a ``reset`` happened in between, or when ``seq`` is from the future
+        (e.g. the server restarted).
+        """
+        self._ensure_current()
+        with self._lock:
+            if seq > self._seq:
+                return None
+            if seq == self._seq:
+                return []
+            if not self._deltas or self._deltas[0]['seq'] > seq + 1:
+                return None
+            missed = [delta for delta in self._deltas if delta['seq'] > seq]
+        if any(delta['op'] == 'reset' for delta in missed):
+            return None
+        return missed
+
+    @property
+    def seq(self) -> int:
+        with self._lock:
+            return self._seq
+
+    def get(self, employee_id: int) -> Optional[dict]:
+        """One board row, or None if the employee is not on the board."""
+        self._ensure_current()
+        with self._lock:
+            row = self._rows.get(employee_id)
+            return dict(row) if row else None
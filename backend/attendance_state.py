@@ -0,0 +1,108 @@
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class TodayAttendanceState:
+    """In-memory table of today's attendance, keyed by employee ID.
+
+    The table is loaded from ``attendances`` on first use and again whenever
+    the calendar date changes (midnight rollover). Scan processing updates it
+    after each accepted scan, so check-in/check-out decisions are plain dict
+    lookups instead of a query per scan.
+    """
+
+    def __init__(self, db_path: str = 'checkins.db'):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._date: Optional[str] = None
+        self._rows: Dict[int, dict] = {}
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now().strftime('%Y-%m-%d')
+
+    def load(self, conn: Optional[sqlite3.Connection] = None) -> None:
+        """Reload today's rows from the database.
+
+        Parameters:
+            conn (Optional[sqlite3.Connection]): Connection to read with. A new
+                connection is opened when omitted.
+        """
+        today = self._today()
+        own_conn = conn is None
+        if own_conn:
+            conn = sqlite3.connect(self.db_path)
+        # Held across the query and the swap so an apply() in between is not lost
+        with self._lock:
+            try:
+                rows = conn.execute('''
+                    SELECT employee_id, check_in_time, check_out_time
+                    FROM attendances
+                    WHERE date = ?
+                ''', (today,)).fetchall()
+            finally:
+                if own_conn:
+                    conn.close()
+            self._date = today
+            self._rows = {
+                employee_id: {'check_in_time': check_in, 'check_out_time': check_out}
+                for employee_id, check_in, check_out in rows
+            }
+        logger.info(f"Attendance state loaded for {today}: {len(rows)} record(s)")
+
+    def _ensure_current(self, conn: Optional[sqlite3.Connection] = None) -> None:
+        if self._date != self._today():
+            self.load(conn)
+
+    def get(self, employee_id: int, conn: Optional[sqlite3.Connection] = None) -> Optional[dict]:
+        """Get today's attendance for an employee.
+
+        Parameters:
+            employee_id (int): Employee ID.
+            conn (Optional[sqlite3.Connection]): Connection used if a rollover
+                reload is needed.
+
+        Returns:
+            Optional[dict]: Copy of the record with check_in_time and
+                check_out_time, or None if the employee has no record today.
+        """
+        self._ensure_current(conn)
+        with self._lock:
+            row = self._rows.get(employee_id)
+            return dict(row) if row else None
+
+    def apply(self, employee_id: int, check_type: str, timestamp: str) -> None:
+        """Record an accepted check-in or check-out that was written to the DB.
+
+        Parameters:
+            employee_id (int): Employee ID.
+            check_type (str): 'checkin' or 'checkout'.
+            timestamp (str): ISO timestamp written to ``attendances``.
+        """
+        column = 'check_in_time' if check_type == 'checkin' else 'check_out_time'
+        with self._lock:
+            if self._date != timestamp[:10]:
+                # Write belongs to another day than the loaded table; the next
+                # read reloads from the database.
+                self._date = None
+                return
+            row = self._rows.setdefault(employee_id, {'check_in_time': None, 'check_out_time': None})
+            row[column] = timestamp
+
+    def snapshot(self) -> Dict[int, dict]:
+        """Get a copy of all of today's records keyed by employee ID."""
+        self._ensure_current()
+        with self._lock:
+            return {employee_id: dict(row) for employee_id, row in self._rows.items()}
+
+    def invalidate(self) -> None:
+        """Drop the table so the next access reloads it from the database."""
+        with self._lock:
+            self._date = None
+            self._rows = {}
@@ -0,0 +1,317 @@
+import sqlite3
+import logging
+import threading
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# (employee_id, department, day) -> expected (start, end), or None for a day off
+ExpectedHours = Callable[[int, Optional[str], date], Optional[Tuple[dt_time, dt_time]]]
+
+
+def init_summary_tables(conn: sqlite3.Connection) -> None:
+    """Create the daily attendance rollup and its bookkeeping table."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_daily_summary (
+            employee_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            department TEXT,
+            check_in_time TEXT,
+            check_out_time TEXT,
+            worked_minutes INTEGER NOT NULL DEFAULT 0,
+            late_minutes INTEGER NOT NULL DEFAULT 0,
+            early_leave_minutes INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL,
+            closed_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (employee_id, date)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_attendance_summary_dept_date ON attendance_daily_summary (department, date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_attendance_summary_date ON attendance_daily_summary (date)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_summary_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+
+
+def weekday_hours(start: dt_time, end: dt_time) -> ExpectedHours:
+    """Same hours for everybody, Monday to Friday."""
+    def expected(employee_id: int, department: Optional[str], day: date) -> Optional[Tuple[dt_time, dt_time]]:
+        return (start, end) if day.weekday() < 5 else None
+    return expected
+
+
+def summarize_day(day: date, check_in: Optional[str], check_out: Optional[str],
+                  expected: Optional[Tuple[dt_time, dt_time]]) -> Optional[Dict[str, Any]]:
+    """Duration, late/early minutes and status of one employee-day.
+
+    Returns None for a day off without any scan (nothing to record).
+    """
+    if not check_in and not check_out:
+        if expected is None:
+            return None
+        return {'worked_minutes': 0, 'late_minutes': 0, 'early_leave_minutes': 0, 'status': 'absent'}
+
+    arrived = datetime.fromisoformat(check_in) if check_in else None
+    left = datetime.fromisoformat(check_out) if check_out else None
+    worked = int((left - arrived).total_seconds() // 60) if arrived and left and left > arrived else 0
+    late = early = 0
+    if expected is not None:
+        start, end = (datetime.combine(day, t) for t in expected)
+        if end <= start:
+            # Night shift: ends on the next calendar day
+            end += timedelta(days=1)
+        if arrived and arrived > start:
+            late = int((arrived - start).total_seconds() // 60)
+        if left and left < end:
+            early = int((end - left).total_seconds() // 60)
+
+    if not arrived:
+        status = 'missing_checkin'
+    elif not left:
+        status = 'missing_checkout'
+    elif late:
+        status = 'late'
+    else:
+        status = 'present'
+    return {'worked_minutes': worked, 'late_minutes': late, 'early_leave_minutes': early, 'status': status}
+
+
+class AttendanceSummary:
+    """Incrementally maintained ``attendance_daily_summary`` rollup.
+
+    A day is summarised once it is over: ``close_days`` closes every day
+    after the last closed one up to yesterday, a few days per transaction,
+    and remembers how far it got. Reports read only from the rollup, so a month
+    for 2,000 employees is an indexed GROUP BY over ~44k small rows instead
+    of a scan of attendances plus per-row Python.
+    """
+
+    def __init__(self, db_path: str = 'checkins.db', expected_hours: Optional[ExpectedHours] = None,
+                 interval: float = 600.0, days_per_transaction: int = 7,
+                 on_closed: Optional[Callable[[List[str]], None]] = None,
+                 close_delay: Optional[Callable[[], timedelta]] = None):
+        """Create the rollup maintainer.
+
+        Parameters:
+            db_path (str, optional): Main database.
+            expected_hours (Optional[ExpectedHours]): Expected start/end per
+                employee-day; defaults to 09:00-18:00 on weekdays.
+            interval (float, optional): Seconds between background checks.
+            days_per_transaction (int, optional): Days closed per commit when
+                catching up (one day takes ~20 ms for 2,000 employees).
+            on_closed (Optional[Callable[[List[str]], None]]): Called with the
+                days closed by a run.
+            close_delay (Optional[Callable[[], timedelta]]): How long after
+                midnight a day may still receive scans (night shifts); the day
+                is closed only after that.
+        """
+        self.db_path = db_path
+        self.expected_hours = expected_hours or weekday_hours(dt_time(9, 0), dt_time(18, 0))
+        self.interval = interval
+        self.days_per_transaction = days_per_transaction
+        self.on_closed = on_closed
+        self.close_delay = close_delay
+        self._run_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.days_closed = 0
+        self.last_error: Optional[str] = None
+
+    def _closed_through(self, conn: sqlite3.Connection) -> Optional[str]:
+        row = conn.execute("SELECT value FROM attendance_summary_state WHERE key = 'closed_through'").fetchone()
+        return row[0] if row else None
+
+    def close_day(self, conn: sqlite3.Connection, day: date) -> int:
+        """(Re)build the rollup of one day inside the caller's transaction."""
+        day_str = day.isoformat()
+        # Employees active (and already created) that day, plus anyone with attendance
+        rows = conn.execute('''
+            SELECT e.id, e.department, a.check_in_time, a.check_out_time
+            FROM employees e
+            LEFT JOIN attendances a ON a.employee_id = e.id AND a.date = ?
+            WHERE (e.is_active = 1 AND substr(COALESCE(e.created_at, ''), 1, 10) <= ?) OR a.id IS NOT NULL
+        ''', (day_str, day_str)).fetchall()
+        summaries = []
+        for employee_id, department, check_in, check_out in rows:
+            summary = summarize_day(day, check_in, check_out, self.expected_hours(employee_id, department, day))
+            if summary is None:
+                continue
+            summaries.append((employee_id, day_str, department, check_in, check_out,
+                              summary['worked_minutes'], summary['late_minutes'],
+                              summary['early_leave_minutes'], summary['status']))
+        conn.execute('DELETE FROM attendance_daily_summary WHERE date = ?', (day_str,))
+        conn.executemany('''
+            INSERT INTO attendance_daily_summary
+                (employee_id, date, department, check_in_time, check_out_time,
+                 worked_minutes, late_minutes, early_leave_minutes, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', summaries)
+        return len(summaries)
+
+    def _close_range(self, first: date, last: date, advance: bool) -> List[str]:
+        closed: List[str] = []
+        conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=30)
+        try:
+            init_summary_tables(conn)
+            day = first
+            while day <= last and not self._stop.is_set():
+                batch: List[date] = []
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    while day <= last and len(batch) < self.days_per_transaction:
+                        self.close_day(conn, day)
+                        batch.append(day)
+                        day += timedelta(days=1)
+                    if advance:
+                        conn.execute('''
+                            INSERT INTO attendance_summary_state (key, value) VALUES ('closed_through', ?)
+                            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                        ''', (batch[-1].isoformat(),))
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+                closed.extend(d.isoformat() for d in batch)
+        finally:
+            conn.close()
+        self.days_closed += len(closed)
+        if closed and self.on_closed:
+            self.on_closed(closed)
+        return closed
+
+    def close_days(self, today: Optional[date] = None) -> List[str]:
+        """Close every day after the last closed one, up to yesterday."""
+        if not self._run_lock.acquire(blocking=False):
+            return []
+        try:
+            if today is None:
+                delay = self.close_delay() if self.close_delay else timedelta(0)
+                today = (datetime.now() - delay).date()
+            conn = sqlite3.connect(self.db_path)
+            try:
+                init_summary_tables(conn)
+                closed_through = self._closed_through(conn)
+                if closed_through:
+                    first = date.fromisoformat(closed_through) + timedelta(days=1)
+                else:
+                    # First run: backfill from the oldest attendance on record
+                    oldest = conn.execute('SELECT MIN(date) FROM attendances').fetchone()[0]
+                    first = date.fromisoformat(oldest) if oldest else today
+            finally:
+                conn.close()
+            closed = self._close_range(first, today - timedelta(days=1), advance=True)
+            if closed:
+                logger.info(f"Attendance summary closed {len(closed)} day(s) through {closed[-1]}")
+            self.last_error = None
+            return closed
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Error closing attendance days: {e}")
+            return []
+        finally:
+            self._run_lock.release()
+
+    def rebuild(self, first: date, last: date) -> List[str]:
+        """Recompute already closed days, e.g. after editing past attendance."""
+        with self._run_lock:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                init_summary_tables(conn)
+                closed_through = self._closed_through(conn)
+            finally:
+                conn.close()
+            if not closed_through:
+                return []
+            last = min(last, date.fromisoformat(closed_through))
+            return self._close_range(first, last, advance=False)
+
+    def start(self) -> None:
+        """Close days in a background thread every `interval` seconds (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='attendance-summary', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.close_days()
+            self._stop.wait(self.interval)
+
+
+SUMMARY_TOTALS_SQL = '''
+    COUNT(*) AS days,
+    SUM(status IN ('present', 'late', 'missing_checkout')) AS days_present,
+    SUM(status = 'absent') AS days_absent,
+    SUM(status = 'late') AS days_late,
+    SUM(status = 'missing_checkout') AS missing_checkouts,
+    SUM(status = 'missing_checkin') AS missing_checkins,
+    SUM(worked_minutes) AS worked_minutes,
+    SUM(late_minutes) AS late_minutes,
+    SUM(early_leave_minutes) AS early_leave_minutes
+'''
+SUMMARY_TOTAL_FIELDS = ['days', 'days_present', 'days_absent', 'days_late', 'missing_checkouts',
+                        'missing_checkins', 'worked_minutes', 'late_minutes', 'early_leave_minutes']
+SUMMARY_DAY_FIELDS = ['date', 'department', 'check_in_time', 'check_out_time', 'worked_minutes',
+                      'late_minutes', 'early_leave_minutes', 'status']
+
+
+def employee_report(conn: sqlite3.Connection, employee_id: int, date_from: str, date_to: str) -> Dict[str, Any]:
+    """Per-day rows and totals of one employee over a date range (rollup only)."""
+    days = conn.execute(f'''
+        SELECT {', '.join(SUMMARY_DAY_FIELDS)} FROM attendance_daily_summary
+        WHERE employee_id = ? AND date BETWEEN ? AND ?
+        ORDER BY date
+    ''', (employee_id, date_from, date_to)).fetchall()
+    totals = conn.execute(f'''
+        SELECT {SUMMARY_TOTALS_SQL} FROM attendance_daily_summary
+        WHERE employee_id = ? AND date BETWEEN ? AND ?
+    ''', (employee_id, date_from, date_to)).fetchone()
+    return {
+        'employee_id': employee_id,
+        'from': date_from,
+        'to': date_to,
+        'totals': {field: value or 0 for field, value in zip(SUMMARY_TOTAL_FIELDS, totals)},
+        'days': [dict(zip(SUMMARY_DAY_FIELDS, row)) for row in days],
+    }
+
+
+def department_report(conn: sqlite3.Connection, month: str, department: Optional[str] = None) -> Dict[str, Any]:
+    """Totals per department for one month (YYYY-MM), rollup only."""
+    first = date.fromisoformat(f'{month}-01')
+    last = ((first + timedelta(days=32)).replace(day=1) - timedelta(days=1))
+    params: List[Any] = [first.isoformat(), last.isoformat()]
+    where = 'date BETWEEN ? AND ?'
+    if department:
+        where += ' AND department = ?'
+        params.append(department)
+    rows = conn.execute(f'''
+        SELECT department, COUNT(DISTINCT employee_id) AS employees, {SUMMARY_TOTALS_SQL}
+        FROM attendance_daily_summary
+        WHERE {where}
+        GROUP BY department
+        ORDER BY department
+    ''', params).fetchall()
+    departments = []
+    for row in rows:
+        totals = {field: value or 0 for field, value in zip(SUMMARY_TOTAL_FIELDS, row[2:])}
+        present = totals['days_present']
+        complete = present - totals['missing_checkouts']
+        departments.append({
+            'department': row[0],
+            'employees': row[1],
+            **totals,
+            'avg_worked_minutes': round(totals['worked_minutes'] / complete, 1) if complete else 0,
+            'attendance_rate': round(present / totals['days'], 4) if totals['days'] else 0,
+        })
+    return {'month': month, 'from': first.isoformat(), 'to': last.isoformat(), 'departments': departments}
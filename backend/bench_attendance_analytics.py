@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the attendance analytics engine
+Compares per-row Python loops with the vectorized numpy implementation on a
+synthetic year of attendances (default: 10,000 employees, weekdays only)
+"""
+
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+import attendance_analytics
+from attendance_analytics import AttendanceFrame
+
+WORK_START = 9 * 60
+WORK_END = 18 * 60
+
+def synthetic_columns(employees: int, days: int, seed: int = 42):
+    """Weekday attendances: one row per employee per day, ~3% absent, ~2% missing check-out"""
+    rng = np.random.default_rng(seed)
+    first = date.today() - timedelta(days=days)
+    weekdays = np.array([first + timedelta(days=i) for i in range(days)
+                         if (first + timedelta(days=i)).weekday() < 5], dtype='datetime64[D]')
+    employee_ids = np.repeat(np.arange(1, employees + 1), len(weekdays))
+    day = np.tile(weekdays, employees)
+    keep = rng.random(day.size) > 0.03
+    employee_ids, day = employee_ids[keep], day[keep]
+
+    # Each employee has their own habit around 08:45, a few are chronically later
+    habit = rng.normal(8 * 60 + 45, 6, employees + 1)
+    habit[rng.random(employees + 1) < 0.05] += 25
+    arrival = habit[employee_ids] + rng.normal(0, 10, day.size)
+    leave = WORK_END + rng.exponential(40, day.size) - 20
+    base = day.astype('datetime64[s]')
+    check_in = (base + (arrival * 60).astype('timedelta64[s]')).astype(str)
+    check_out = (base + (leave * 60).astype('timedelta64[s]')).astype(str).astype(object)
+    check_out[rng.random(day.size) < 0.02] = None
+    departments = np.array([f'Dept {i % 20}' for i in range(employees + 1)], dtype=object)[employee_ids]
+    return employee_ids.tolist(), departments.tolist(), day.astype(str).tolist(), check_in.tolist(), check_out.tolist()
+
+def seed_database(db_path: str, columns):
+    employee_ids, departments, days, check_ins, check_outs = columns
+    conn = sqlite3.connect(db_path)
+    conn.executescript('''
+        CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT, department TEXT, is_active BOOLEAN DEFAULT 1);
+        CREATE TABLE attendances (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            check_in_time TEXT,
+            check_out_time TEXT,
+            UNIQUE(employee_id, date)
+        );
+        CREATE INDEX idx_attendances_date ON attendances (date);
+    ''')
+    conn.executemany('INSERT OR IGNORE INTO employees (id, name, department) VALUES (?, ?, ?)',
+                     ((e, f'Employee {e}', d) for e, d in zip(employee_ids, departments)))
+    conn.executemany('INSERT INTO attendances (employee_id, date, check_in_time, check_out_time) VALUES (?, ?, ?, ?)',
+                     zip(employee_ids, days, check_ins, check_outs))
+    conn.commit()
+    conn.close()
+
+def _minutes(stamp: str, day: str) -> float:
+    """Minutes since the start of the attendance day (late check-outs can pass midnight)"""
+    return (datetime.fromisoformat(stamp) - datetime.fromisoformat(day)).total_seconds() / 60
+
+def python_analytics(columns) -> dict:
+    """Reference implementation: one Python iteration per attendance row"""
+    employee_ids, departments, days, check_ins, check_outs = columns
+    arrivals, overtime, cells = {}, {}, {}
+    bins = attendance_analytics.OVERTIME_BINS
+    for employee_id, department, day, check_in, check_out in zip(*columns):
+        if check_in:
+            minutes = _minutes(check_in, day)
+            arrivals.setdefault(department, []).append(minutes)
+            cell = cells.setdefault((employee_id, day[:7]), [0, 0])
+            cell[0] += 1
+            cell[1] += minutes > WORK_START + 5
+        if check_out:
+            extra = max(_minutes(check_out, day) - WORK_END, 0.0)
+            index = sum(1 for upper in bins[1:] if extra > upper)
+            histogram = overtime.setdefault(department, [0] * len(bins))
+            histogram[index] += 1
+    percentiles = {}
+    for department, values in arrivals.items():
+        values.sort()
+        n = len(values)
+        row = {}
+        for p in attendance_analytics.DEFAULT_PERCENTILES:
+            rank = p / 100 * (n - 1)
+            lower = int(rank)
+            upper = min(lower + 1, n - 1)
+            row[f'p{p:g}'] = round(values[lower] + (values[upper] - values[lower]) * (rank - lower), 2)
+        percentiles[department] = row
+    months = {}
+    for (employee_id, _), (total, late) in cells.items():
+        if total >= 8 and late / total >= 0.3:
+            months[employee_id] = months.get(employee_id, 0) + 1
+    chronic = sorted(e for e, count in months.items() if count >= 3)
+    return {'percentiles': percentiles, 'overtime': overtime, 'chronic': chronic}
+
+def timed(fn, repeat: int = 1):
+    """Average milliseconds per call and the last result"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) * 1000 / repeat, result
+
+def run_benchmark(employees: int, days: int, repeat: int, with_db: bool):
+    columns = synthetic_columns(employees, days)
+    print(f"📊 Synthetic attendances: {len(columns[0]):,} rows, {employees:,} employees, {days} days")
+
+    results = {}
+    results['python loops (reference)'], reference = timed(lambda: python_analytics(columns))
+    results['frame build from columns'], frame = timed(lambda: AttendanceFrame.from_columns(*columns))
+    results['arrival_percentiles'], percentiles = timed(
+        lambda: attendance_analytics.arrival_percentiles(frame), repeat)
+    results['overtime_histogram'], histogram = timed(
+        lambda: attendance_analytics.overtime_histogram(frame, WORK_END), repeat)
+    results['chronic_late'], chronic = timed(
+        lambda: attendance_analytics.chronic_late(frame, WORK_START), repeat)
+    results['analyze (all three)'], _ = timed(
+        lambda: attendance_analytics.analyze(frame, WORK_START, WORK_END), repeat)
+
+    if with_db:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'bench.db')
+            seed_database(db_path, columns)
+            conn = sqlite3.connect(db_path)
+            results['load_frame from SQLite'], _ = timed(
+                lambda: attendance_analytics.load_frame(conn, '0000-01-01', '9999-12-31'))
+            conn.close()
+
+    print(f"\n{'Operation':<40} {'ms':>10}")
+    print('-' * 51)
+    for name, ms in results.items():
+        print(f"{name:<40} {ms:>10.2f}")
+
+    # Sanity check: vectorized results must match the reference loops
+    percentile_ok = all(
+        all(abs(percentiles[d][k] - v) < 0.02 for k, v in row.items())
+        for d, row in reference['percentiles'].items())
+    overtime_ok = all(histogram['departments'][d] == row for d, row in reference['overtime'].items())
+    chronic_ok = sorted(row['employee_id'] for row in chronic) == reference['chronic']
+    print(f"\n✅ Matches reference: percentiles={percentile_ok} overtime={overtime_ok} "
+          f"chronic_late={chronic_ok} ({len(chronic)} employees flagged)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Attendance analytics benchmark')
+    parser.add_argument('--employees', type=int, default=10000, help='Number of employees to generate')
+    parser.add_argument('--days', type=int, default=365, help='Calendar days of history')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions of vectorized operations')
+    parser.add_argument('--with-db', action='store_true', help='Also time loading the frame from SQLite')
+    args = parser.parse_args()
+    run_benchmark(args.employees, args.days, args.repeat, args.with_db)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the attendance board
+Compares the legacy per-request GROUP_CONCAT query with the in-memory
+AttendanceBoard on a synthetic database (default: 10,000 employees)
+"""
+
+import os
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime
+
+from attendance_state import TodayAttendanceState
+from attendance_board import AttendanceBoard
+
+LEGACY_BOARD_SQL = '''
+    SELECT e.id, e.name,
+           (SELECT GROUP_CONCAT(et.rfid_uid, ', ') FROM employee_tags et WHERE et.employee_id = e.id AND et.is_active = 1) as rfid_uids,
+           a.check_in_time, a.check_out_time
+    FROM employees e
+    LEFT JOIN attendances a ON e.id = a.employee_id AND a.date = ?
+    WHERE e.is_active = 1
+    ORDER BY e.name
+'''
+
+def seed_database(db_path: str, employees: int, seed: int = 42):
+    """Create the board tables and fill them with synthetic data"""
+    rng = random.Random(seed)
+    today = datetime.now().strftime('%Y-%m-%d')
+    conn = sqlite3.connect(db_path)
+    conn.executescript('''
+        CREATE TABLE employees (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            employee_code TEXT UNIQUE,
+            department TEXT,
+            is_active BOOLEAN DEFAULT 1
+        );
+        CREATE TABLE employee_tags (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id INTEGER NOT NULL,
+            rfid_uid TEXT UNIQUE NOT NULL,
+            tag_name TEXT,
+            is_active BOOLEAN DEFAULT 1
+        );
+        CREATE TABLE attendances (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            check_in_time TEXT,
+            check_out_time TEXT,
+            note TEXT,
+            UNIQUE(employee_id, date)
+        );
+        CREATE INDEX idx_employee_tags_employee ON employee_tags (employee_id);
+    ''')
+    conn.executemany(
+        'INSERT INTO employees (id, name, employee_code, department) VALUES (?, ?, ?, ?)',
+        [(i, f'Employee {rng.randrange(10**6):06d}', f'EMP{i:06d}', f'Dept {i % 20}')
+         for i in range(1, employees + 1)]
+    )
+    tags = []
+    for i in range(1, employees + 1):
+        for j in range(rng.choice([1, 1, 1, 2])):
+            tags.append((i, f'E280{i:08X}{j:02X}', f'Tag {j}'))
+    conn.executemany('INSERT INTO employee_tags (employee_id, rfid_uid, tag_name) VALUES (?, ?, ?)', tags)
+    conn.executemany(
+        'INSERT INTO attendances (employee_id, date, check_in_time) VALUES (?, ?, ?)',
+        [(i, today, f'{today}T08:{rng.randrange(60):02d}:00') for i in range(1, employees + 1) if rng.random() < 0.8]
+    )
+    conn.commit()
+    conn.close()
+    return len(tags)
+
+def legacy_board(db_path: str) -> list:
+    today = datetime.now().strftime('%Y-%m-%d')
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(LEGACY_BOARD_SQL, (today,)).fetchall()
+    conn.close()
+    return [{
+        'id': emp_id,
+        'name': name,
+        'rfid_uids': rfid_uids or '',
+        'check_in_time': check_in,
+        'check_out_time': check_out,
+        'status': 'present' if check_in else 'absent'
+    } for emp_id, name, rfid_uids, check_in, check_out in rows]
+
+def timed(fn, repeat: int = 1) -> float:
+    """Average milliseconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+def run_benchmark(employees: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        tag_count = seed_database(db_path, employees)
+        print(f"📊 Seeded {employees} employees, {tag_count} tags")
+
+        state = TodayAttendanceState(db_path)
+        board = AttendanceBoard(state, db_path)
+        results = {
+            'legacy query + rows (per request)': timed(lambda: legacy_board(db_path), repeat),
+            'board.load (startup only)': timed(board.load),
+            'board.records (per request)': timed(board.records, repeat),
+        }
+
+        today = datetime.now().strftime('%Y-%m-%d')
+        ids = list(range(1, employees + 1))
+        stamp = f'{today}T17:30:00'
+        results['board.apply_attendance x1000'] = timed(
+            lambda: [board.apply_attendance(random.choice(ids), 'checkout', stamp) for _ in range(1000)])
+        conn = sqlite3.connect(db_path)
+        results['board.refresh_employee x100'] = timed(
+            lambda: [board.refresh_employee(random.choice(ids), conn) for _ in range(100)])
+        conn.close()
+
+        # Sanity check: the board must match the legacy query row for row
+        fresh = AttendanceBoard(TodayAttendanceState(db_path), db_path)
+        fresh.load()
+        legacy = {row['id']: row for row in legacy_board(db_path)}
+        mismatches = sum(1 for row in fresh.records()
+                         if legacy[row['id']]['check_in_time'] != row['check_in_time']
+                         or sorted(legacy[row['id']]['rfid_uids'].split(', ')) != sorted(row['rfid_uids'].split(', ')))
+
+        print(f"\n{'Operation':<40} {'ms':>10}")
+        print('-' * 51)
+        for name, ms in results.items():
+            print(f"{name:<40} {ms:>10.2f}")
+        print(f"\n✅ Board rows matching legacy query: {employees - mismatches}/{employees}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Attendance board benchmark')
+    parser.add_argument('--employees', type=int, default=10000, help='Number of employees to seed')
+    parser.add_argument('--repeat', type=int, default=5, help='Repetitions of per-request operations')
+    args = parser.parse_args()
+    run_benchmark(args.employees, args.repeat)
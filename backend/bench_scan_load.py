@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+End-to-end scan load benchmark
+Seeds a database with N employees/tags and M historical scan logs, then
+drives the scan decision (process_rfid_scan / process_rfid_scans) with
+synthetic arrival patterns from one or more concurrent producers and
+reports scans/sec, latency percentiles and database growth.
+
+Reads carry synthetic timestamps on today's date, so with a fixed seed the
+decisions (check-in, check-out, ignored...) are identical on every run and
+results can be compared across commits:
+
+    python bench_scan_load.py --json before.json
+    python bench_scan_load.py --json after.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import sqlite3
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import contextlib
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from tag_filter import EnrolledTagFilter
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Scan windows written to system_config before the app loads it
+BENCH_CONFIG = {
+    'checkin_start': '07:00', 'checkin_end': '10:30',
+    'checkout_start': '16:30', 'checkout_end': '20:00',
+    'work_start': '09:00', 'work_end': '18:00',
+    'scan_cooldown': '10', 'slow_scan_ms': '0',
+}
+
+# (seconds since midnight, epc) in arrival order
+Event = Tuple[float, str]
+
+SCENARIOS = ('rush_hour', 'badge_held', 'foreign_tags', 'full_day')
+
+
+def employee_epc(i: int) -> str:
+    return f'E2801160{i:016X}'
+
+
+def foreign_epc(i: int) -> str:
+    return f'300833B2DDD9{i:012X}'
+
+
+def at(hours: float) -> float:
+    return hours * 3600
+
+
+def taps(rng: random.Random, epc: str, start: float, max_reads: int = 4) -> List[Event]:
+    """One badge tap: the antenna sees the tag 1..max_reads times within ~2 s"""
+    reads = 1 + min(int(rng.expovariate(1.2)), max_reads - 1)
+    return [(start + rng.uniform(0, 2) * (i > 0), epc) for i in range(reads)]
+
+
+def arrivals(rng: random.Random, epcs: List[str], center: float, spread: float,
+             low: float, high: float) -> List[Event]:
+    """Each employee taps once around `center` (normal, clipped to the window)"""
+    events = []
+    for epc in epcs:
+        events += taps(rng, epc, min(max(rng.gauss(center, spread), low), high))
+    return events
+
+
+def generate(scenario: str, employees: int, seed: int) -> List[Event]:
+    rng = random.Random(seed)
+    epcs = [employee_epc(i) for i in range(1, employees + 1)]
+    if scenario == 'rush_hour':
+        # Everyone arrives around 08:45, most within a quarter of an hour
+        events = arrivals(rng, epcs, at(8.75), 600, at(7), at(10.4))
+    elif scenario == 'badge_held':
+        # A tenth of the staff keep the badge at the antenna for 5-20 s (4 reads/s)
+        events = arrivals(rng, epcs, at(8.75), 600, at(7), at(10.4))
+        for epc in rng.sample(epcs, max(1, employees // 10)):
+            start = rng.uniform(at(8.5), at(9))
+            events += [(start + i * 0.25, epc) for i in range(int(rng.uniform(5, 20) * 4))]
+    elif scenario == 'foreign_tags':
+        # Shared lobby: inventory labels and other companies' badges seen every few seconds
+        events = arrivals(rng, epcs, at(8.75), 600, at(7), at(10.4))
+        foreign = [foreign_epc(i) for i in range(max(10, employees // 5))]
+        for epc in foreign:
+            t = rng.uniform(at(8.75), at(8.85))
+            while t < at(9):
+                events.append((t, epc))
+                t += rng.uniform(5, 60)
+    elif scenario == 'full_day':
+        # Morning check-in, a few midday taps (ignored), evening check-out
+        events = arrivals(rng, epcs, at(8.75), 600, at(7), at(10.4))
+        events += arrivals(rng, rng.sample(epcs, employees // 5), at(12.5), 1800, at(11), at(14))
+        events += arrivals(rng, epcs, at(18), 900, at(16.6), at(19.9))
+    else:
+        raise ValueError(f'Unknown scenario: {scenario}')
+    events.sort()
+    return events
+
+
+def seed_template(path: str, employees: int, history: int, seed: int) -> None:
+    """Create the app schema in `path` and fill it with employees, tags and old scan logs"""
+    import reset_db
+    with contextlib.redirect_stdout(io.StringIO()):
+        reset_db.reset_database()
+    conn = sqlite3.connect('checkins.db')
+    conn.executemany('UPDATE system_config SET config_value = ? WHERE config_key = ?',
+                     [(value, key) for key, value in BENCH_CONFIG.items()])
+    conn.executemany('INSERT OR IGNORE INTO system_config (config_key, config_value) VALUES (?, ?)',
+                     list(BENCH_CONFIG.items()))
+    conn.commit()
+    conn.close()
+
+    import app
+    app.init_db()
+    rng = random.Random(seed)
+    conn = sqlite3.connect('checkins.db')
+    departments = [f'Dept {i}' for i in range(20)]
+    conn.executemany('INSERT INTO employees (id, name, employee_code, department) VALUES (?, ?, ?, ?)',
+                     ((1000 + i, f'Employee {i}', f'BENCH{i:06d}', rng.choice(departments))
+                      for i in range(1, employees + 1)))
+    conn.executemany('INSERT INTO employee_tags (employee_id, rfid_uid, tag_name) VALUES (?, ?, ?)',
+                     ((1000 + i, employee_epc(i), 'Bench tag') for i in range(1, employees + 1)))
+    # History: check-in/check-out rows over the previous days, newest day last
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    days = max(1, history // max(1, 2 * employees))
+    rows = []
+    for n in range(history):
+        i = rng.randint(1, employees)
+        day = today - timedelta(days=days - (n * days) // history)
+        checkout = rng.random() < 0.5
+        stamp = day + timedelta(seconds=rng.gauss(at(18) if checkout else at(8.75), 900))
+        rows.append((1000 + i, employee_epc(i), stamp.isoformat(), 'MAIN_ENTRANCE',
+                     'checkout' if checkout else 'checkin', None))
+    conn.executemany('''
+        INSERT INTO rfid_scan_logs (employee_id, rfid_uid, timestamp, reader_id, status, note)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+    shutil.copy('checkins.db', path)
+
+
+def db_bytes() -> int:
+    return sum(os.path.getsize(name) for name in ('checkins.db', 'checkins.db-journal', 'checkins.db-wal')
+               if os.path.exists(name))
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def partition(events: List[Event], producers: int) -> List[List[Event]]:
+    """Split by EPC so each tag's reads stay in order on one producer"""
+    streams: List[List[Event]] = [[] for _ in range(producers)]
+    for event in events:
+        streams[int(event[1][-6:], 16) % producers].append(event)
+    return streams
+
+
+def run_scenario(app, template: str, scenario: str, events: List[Event], producers: int,
+                 batch_size: int, use_filter: bool) -> Dict:
+    shutil.copy(template, 'checkins.db')
+    app.attendance_state.invalidate()
+    app.attendance_board.invalidate_attendance()
+    # Fresh filter per run so unknown-EPC sampling state does not carry over
+    enrolled_filter = EnrolledTagFilter('checkins.db') if use_filter else None
+    if enrolled_filter:
+        enrolled_filter.rebuild()
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    size_before = db_bytes()
+    latencies: List[float] = []
+    outcomes: Counter = Counter()
+    filtered = 0
+    errors = 0
+    lock = threading.Lock()
+
+    def produce(stream: List[Event]):
+        nonlocal filtered, errors
+        local_latencies, local_outcomes, local_filtered, local_errors = [], Counter(), 0, 0
+        for start in range(0, len(stream), batch_size):
+            chunk = stream[start:start + batch_size]
+            if enrolled_filter:
+                kept = [event for event in chunk if enrolled_filter.admit(event[1])]
+                local_filtered += len(chunk) - len(kept)
+                chunk = kept
+                if not chunk:
+                    continue
+            began = time.perf_counter()
+            try:
+                results = app.run_scan_transaction(lambda conn: [
+                    app._process_scan_in_transaction(conn, epc, today + timedelta(seconds=offset))
+                    for offset, epc in chunk])
+            except sqlite3.Error:
+                local_errors += len(chunk)
+                continue
+            elapsed = time.perf_counter() - began
+            local_latencies += [elapsed] * len(chunk)
+            local_outcomes.update(result.get('action') or result.get('reason') or result['status']
+                                  for result in results)
+        with lock:
+            latencies.extend(local_latencies)
+            outcomes.update(local_outcomes)
+            filtered += local_filtered
+            errors += local_errors
+
+    threads = [threading.Thread(target=produce, args=(stream,)) for stream in partition(events, producers)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - began
+
+    latencies.sort()
+    processed = len(latencies)
+    size_after = db_bytes()
+    return {
+        'scenario': scenario,
+        'producers': producers,
+        'batch_size': batch_size,
+        'filter': use_filter,
+        'reads': len(events),
+        'processed': processed,
+        'filtered': filtered,
+        'errors': errors,
+        'seconds': round(seconds, 3),
+        'scans_per_sec': round(processed / seconds, 1) if seconds else 0.0,
+        'latency_ms': {name: round(percentile(latencies, p) * 1000, 3)
+                       for name, p in (('p50', 50), ('p90', 90), ('p99', 99), ('max', 100))},
+        'outcomes': dict(sorted(outcomes.items())),
+        'db_bytes_before': size_before,
+        'db_bytes_after': size_after,
+        'db_growth_bytes': size_after - size_before,
+        'bytes_per_scan': round((size_after - size_before) / processed, 1) if processed else 0.0,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def run_benchmark(args) -> Dict:
+    scenarios = args.scenarios.split(',')
+    producer_counts = [int(n) for n in args.producers.split(',')]
+    workdir = tempfile.mkdtemp(prefix='bench_scan_load_')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    # The app opens checkins.db in the working directory and logs every scan
+    logging.disable(logging.CRITICAL)
+    try:
+        template = os.path.join(workdir, 'template.db')
+        started = time.perf_counter()
+        seed_template(template, args.employees, args.history, args.seed)
+        print(f"📊 Seeded {args.employees:,} employees and {args.history:,} historical scan logs "
+              f"({os.path.getsize(template) / 1e6:.1f} MB) in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        import app
+        app.load_config_from_db()
+        app.shift_schedule.load()
+
+        runs = []
+        for i, scenario in enumerate(scenarios):
+            events = generate(scenario, args.employees, args.seed + i)
+            for producers in producer_counts:
+                result = run_scenario(app, template, scenario, events, producers, args.batch_size, args.filter)
+                runs.append(result)
+                print(f"{scenario:<14} x{producers:<3} {result['processed']:>7} scans "
+                      f"{result['scans_per_sec']:>9.1f}/s  p50 {result['latency_ms']['p50']:>8.2f} ms  "
+                      f"p99 {result['latency_ms']['p99']:>8.2f} ms  +{result['db_growth_bytes'] / 1e3:>8.1f} kB",
+                      file=sys.stderr)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'benchmark': 'scan_load',
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'environment': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+        },
+        'params': {
+            'employees': args.employees,
+            'history': args.history,
+            'seed': args.seed,
+            'batch_size': args.batch_size,
+            'filter': args.filter,
+        },
+        'runs': runs,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='End-to-end scan load benchmark')
+    parser.add_argument('--employees', type=int, default=500, help='Employees (one tag each) to seed')
+    parser.add_argument('--history', type=int, default=100000, help='Historical scan logs to seed')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f'Comma-separated: {", ".join(SCENARIOS)}')
+    parser.add_argument('--producers', default='1,4', help='Comma-separated concurrent producer counts')
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='Reads per transaction (1 = process_rfid_scan, >1 = pipeline-style batches)')
+    parser.add_argument('--filter', action='store_true', help='Drop reads rejected by the enrolled-tag filter first')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for data and arrivals')
+    parser.add_argument('--json', help='Write results as JSON to this file (- for stdout)')
+    args = parser.parse_args()
+    report = run_benchmark(args)
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {args.json}", file=sys.stderr)
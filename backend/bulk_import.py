@@ -0,0 +1,213 @@
+import io
+import csv
+import json
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+EMPLOYEE_FIELDS = ['name', 'employee_code', 'department', 'position', 'email', 'phone']
+TAG_FIELDS = ['rfid_uid', 'employee_id', 'employee_code', 'tag_name']
+
+# Stay well below SQLite's host parameter limit
+IN_CHUNK_SIZE = 500
+
+
+class ImportFormatError(ValueError):
+    """The request body could not be read as CSV or a JSON array."""
+
+
+def read_rows(body: bytes, content_type: str = '') -> List[Dict[str, Any]]:
+    """Parse an import body into a list of dicts.
+
+    A JSON array of objects (or ``{"rows": [...]}``) is accepted for JSON
+    content types; anything else is read as CSV with a header row.
+    """
+    text = body.decode('utf-8-sig')
+    if 'json' in content_type or text.lstrip().startswith(('[', '{')):
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise ImportFormatError(f'Invalid JSON: {e}')
+        if isinstance(data, dict):
+            data = data.get('rows')
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise ImportFormatError('Expected a JSON array of objects')
+        return data
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames:
+        raise ImportFormatError('CSV header row is missing')
+    return [{(key or '').strip(): value for key, value in row.items()} for row in reader]
+
+
+def _clean(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def normalize_epc(value: Any) -> Optional[str]:
+    """EPCs are stored as uppercase hex, as the reader decodes them."""
+    value = _clean(value)
+    return value.replace(' ', '').upper() if value else None
+
+
+def _chunks(items: List[Any], size: int = IN_CHUNK_SIZE) -> Iterable[List[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _lookup(conn: sqlite3.Connection, sql: str, keys: List[Any]) -> Dict[Any, tuple]:
+    """Run `sql` (with one IN placeholder list `{}`) in chunks; key -> rest of row."""
+    found: Dict[Any, tuple] = {}
+    for chunk in _chunks(keys):
+        for row in conn.execute(sql.format(','.join('?' * len(chunk))), chunk):
+            found[row[0]] = row[1:]
+    return found
+
+
+def _report(results: List[dict]) -> Dict[str, Any]:
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    return {
+        'total': len(results),
+        'created': counts.get('created', 0),
+        'reactivated': counts.get('reactivated', 0),
+        'errors': counts.get('error', 0),
+        'results': results,
+    }
+
+
+def import_employees(conn: sqlite3.Connection, rows: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], Set[int]]:
+    """Validate and write employees inside the caller's transaction.
+
+    Rows whose employee_code belongs to an active employee are rejected, like
+    the single-row API; soft-deleted ones are reactivated with the new data.
+
+    Returns:
+        Tuple[Dict[str, Any], Set[int]]: Per-row report and the IDs written.
+    """
+    results: List[dict] = []
+    valid: List[Tuple[int, Dict[str, Optional[str]]]] = []
+    seen: Set[str] = set()
+    for index, raw in enumerate(rows, start=1):
+        row = {field: _clean(raw.get(field)) for field in EMPLOYEE_FIELDS}
+        if not row['name'] or not row['employee_code']:
+            results.append({'row': index, 'status': 'error', 'message': 'name and employee_code are required'})
+        elif row['employee_code'] in seen:
+            results.append({'row': index, 'status': 'error',
+                            'message': f'Duplicate employee_code "{row["employee_code"]}" in import'})
+        else:
+            seen.add(row['employee_code'])
+            results.append({'row': index, 'status': 'pending', 'employee_code': row['employee_code']})
+            valid.append((index, row))
+
+    existing = _lookup(conn, 'SELECT employee_code, id, is_active FROM employees WHERE employee_code IN ({})',
+                       [row['employee_code'] for _, row in valid])
+    inserts, reactivations = [], []
+    for index, row in valid:
+        result = results[index - 1]
+        match = existing.get(row['employee_code'])
+        if match and match[1] == 1:
+            result.update(status='error', message=f'Employee code "{row["employee_code"]}" already exists')
+        elif match:
+            result.update(status='reactivated', id=match[0])
+            reactivations.append((row['name'], row['department'], row['position'], row['email'], row['phone'], match[0]))
+        else:
+            result['status'] = 'created'
+            inserts.append(tuple(row[field] for field in EMPLOYEE_FIELDS))
+
+    conn.executemany('''
+        UPDATE employees
+        SET name = ?, department = ?, position = ?, email = ?, phone = ?, is_active = 1, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', reactivations)
+    conn.executemany('''
+        INSERT INTO employees (name, employee_code, department, position, email, phone, is_active)
+        VALUES (?, ?, ?, ?, ?, ?, 1)
+    ''', inserts)
+
+    created = _lookup(conn, 'SELECT employee_code, id FROM employees WHERE employee_code IN ({})',
+                      [row[1] for row in inserts])
+    for result in results:
+        if result['status'] == 'created':
+            result['id'] = created[result['employee_code']][0]
+    written = {result['id'] for result in results if 'id' in result}
+    return _report(results), written
+
+
+def import_tags(conn: sqlite3.Connection, rows: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], Set[int]]:
+    """Validate and write tags inside the caller's transaction.
+
+    Each row names its owner by ``employee_id`` or ``employee_code`` (which
+    must be an active employee). UIDs of active tags are rejected, like the
+    single-row API; soft-deleted ones are reactivated for the new owner.
+
+    Returns:
+        Tuple[Dict[str, Any], Set[int]]: Per-row report and the IDs of the
+            employees whose tags changed (previous and new owners).
+    """
+    employees_by_code: Dict[str, int] = {}
+    active_ids: Set[int] = set()
+    for employee_id, code in conn.execute('SELECT id, employee_code FROM employees WHERE is_active = 1'):
+        active_ids.add(employee_id)
+        if code:
+            employees_by_code[code] = employee_id
+
+    results: List[dict] = []
+    valid: List[Tuple[int, str, int, Optional[str]]] = []
+    seen: Set[str] = set()
+    for index, raw in enumerate(rows, start=1):
+        rfid_uid = normalize_epc(raw.get('rfid_uid'))
+        employee_id: Optional[int] = None
+        if _clean(raw.get('employee_id')):
+            try:
+                employee_id = int(_clean(raw.get('employee_id')))
+            except ValueError:
+                employee_id = None
+        elif _clean(raw.get('employee_code')):
+            employee_id = employees_by_code.get(_clean(raw.get('employee_code')))
+
+        if not rfid_uid:
+            results.append({'row': index, 'status': 'error', 'message': 'rfid_uid is required'})
+        elif employee_id not in active_ids:
+            results.append({'row': index, 'status': 'error', 'rfid_uid': rfid_uid,
+                            'message': 'employee_id or employee_code must name an active employee'})
+        elif rfid_uid in seen:
+            results.append({'row': index, 'status': 'error', 'rfid_uid': rfid_uid,
+                            'message': f'Duplicate RFID UID "{rfid_uid}" in import'})
+        else:
+            seen.add(rfid_uid)
+            results.append({'row': index, 'status': 'pending', 'rfid_uid': rfid_uid, 'employee_id': employee_id})
+            valid.append((index, rfid_uid, employee_id, _clean(raw.get('tag_name'))))
+
+    existing = _lookup(conn, 'SELECT rfid_uid, id, is_active, employee_id FROM employee_tags WHERE rfid_uid IN ({})',
+                       [rfid_uid for _, rfid_uid, _, _ in valid])
+    inserts, reactivations = [], []
+    touched: Set[int] = set()
+    for index, rfid_uid, employee_id, tag_name in valid:
+        result = results[index - 1]
+        match = existing.get(rfid_uid)
+        if match and match[1] == 1:
+            result.update(status='error', message=f'RFID UID "{rfid_uid}" already exists')
+            continue
+        if match:
+            result.update(status='reactivated', id=match[0])
+            reactivations.append((employee_id, tag_name, match[0]))
+            touched.add(match[2])
+        else:
+            result['status'] = 'created'
+            inserts.append((employee_id, rfid_uid, tag_name))
+        touched.add(employee_id)
+
+    conn.executemany('UPDATE employee_tags SET employee_id = ?, tag_name = ?, is_active = 1 WHERE id = ?',
+                     reactivations)
+    conn.executemany('INSERT INTO employee_tags (employee_id, rfid_uid, tag_name, is_active) VALUES (?, ?, ?, 1)',
+                     inserts)
+
+    created = _lookup(conn, 'SELECT rfid_uid, id FROM employee_tags WHERE rfid_uid IN ({})',
+                      [row[1] for row in inserts])
+    for result in results:
+        if result['status'] == 'created':
+            result['id'] = created[result['rfid_uid']][0]
+    return _report(results), touched
@@ -0,0 +1,192 @@
+import time
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, time as dt_time
+from types import MappingProxyType
+from typing import Callable, List, Mapping, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+def init_config_version(conn: sqlite3.Connection) -> None:
+    """Create the system_config change counter and the triggers moving it.
+
+    Every insert/update/delete on system_config, from any process, adds one
+    to ``config_version.version``, so ``ConfigStore`` can tell that the
+    table changed even within the same second.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS config_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO config_version (id, version) VALUES (1, 0)')
+    for action in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_config_version_{action.lower()} AFTER {action} ON system_config
+            BEGIN UPDATE config_version SET version = version + 1 WHERE id = 1; END
+        ''')
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Immutable view of the system_config table at one point in time."""
+    values: Mapping[str, str]
+    row_version: int
+    loaded_at: float
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        return self.values.get(key, default)
+
+    def as_dict(self) -> dict:
+        return dict(self.values)
+
+
+@dataclass(frozen=True)
+class ScanRules:
+    """Values derived from the config that the scan decision reads per scan."""
+    checkin_start: dt_time
+    checkin_end: dt_time
+    checkout_start: dt_time
+    checkout_end: dt_time
+    scan_cooldown_seconds: int
+    reader_id: str
+
+    @classmethod
+    def defaults(cls) -> 'ScanRules':
+        return cls(dt_time(8, 45), dt_time(9, 15), dt_time(17, 45), dt_time(18, 15), 10, 'MAIN_ENTRANCE')
+
+    @classmethod
+    def from_config(cls, config: ConfigSnapshot) -> 'ScanRules':
+        """Parse the time windows and cooldown; all defaults if any value is invalid."""
+        def parse_time(key: str, default: str) -> dt_time:
+            return datetime.strptime(config.get(key, default), '%H:%M').time()
+        try:
+            return cls(
+                parse_time('checkin_start', '08:45'),
+                parse_time('checkin_end', '09:15'),
+                parse_time('checkout_start', '17:45'),
+                parse_time('checkout_end', '18:15'),
+                int(config.get('scan_cooldown', '10')),
+                config.get('reader_id', 'MAIN_ENTRANCE'),
+            )
+        except Exception as e:
+            logger.error(f"Error loading config from database: {e}")
+            return cls.defaults()
+
+
+class ConfigStore:
+    """System configuration loaded once and served from memory.
+
+    The current ``ConfigSnapshot`` is replaced as a whole, so readers on any
+    thread see either the old or the new configuration, never a mix. The
+    store reloads when ``reload`` is called after a write, or when the
+    trigger-maintained change counter of system_config (``config_version``)
+    moved, which is checked at most every ``check_interval`` seconds. Subscribers
+    are called with the new snapshot after every reload that changed it.
+    """
+
+    def __init__(self, db_path: str = 'checkins.db', check_interval: float = 5.0):
+        self.db_path = db_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._checked_at = 0.0
+        self._listeners: List[Callable[[ConfigSnapshot], None]] = []
+        self.loads = 0
+        self.version_checks = 0
+
+    def subscribe(self, listener: Callable[[ConfigSnapshot], None], notify_now: bool = True) -> None:
+        """Register a callback receiving every new snapshot.
+
+        Parameters:
+            listener (Callable[[ConfigSnapshot], None]): Callback.
+            notify_now (bool, optional): Also call it with the current snapshot.
+        """
+        self._listeners.append(listener)
+        if notify_now:
+            listener(self.current())
+
+    @staticmethod
+    def _row_version(conn: sqlite3.Connection) -> int:
+        try:
+            return conn.execute('SELECT version FROM config_version WHERE id = 1').fetchone()[0]
+        except sqlite3.OperationalError:
+            # Counter not created yet (database from before init_config_version)
+            return -1
+
+    def reload(self, conn: Optional[sqlite3.Connection] = None) -> ConfigSnapshot:
+        """Read the table and swap in a new snapshot."""
+        own_conn = conn is None
+        if own_conn:
+            conn = sqlite3.connect(self.db_path)
+        try:
+            # Version first: a write in between makes the next check reload again
+            row_version = self._row_version(conn)
+            rows = conn.execute('SELECT config_key, config_value FROM system_config').fetchall()
+        except sqlite3.OperationalError as e:
+            # Table not created yet (first start before init_db)
+            logger.warning(f"System config not available: {e}")
+            rows, row_version = [], -1
+        finally:
+            if own_conn:
+                conn.close()
+
+        snapshot = ConfigSnapshot(MappingProxyType(dict(rows)), row_version, time.time())
+        with self._lock:
+            previous = self._snapshot
+            self._snapshot = snapshot
+            self._checked_at = time.monotonic()
+            self.loads += 1
+        if previous is None or previous.values != snapshot.values:
+            self._publish(snapshot)
+        return snapshot
+
+    def _publish(self, snapshot: ConfigSnapshot) -> None:
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"Error notifying config subscriber: {e}")
+
+    def _check_version(self) -> None:
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return
+            # Claim the check so concurrent callers do not all query
+            self._checked_at = time.monotonic()
+            current = self._snapshot
+            self.version_checks += 1
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                row_version = self._row_version(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not check system config version: {e}")
+            return
+        if current is None or row_version != current.row_version:
+            logger.info("System config changed in the database, reloading")
+            self.reload()
+
+    def current(self) -> ConfigSnapshot:
+        """The current snapshot (loads on first use)."""
+        if self._snapshot is None:
+            return self.reload()
+        self._check_version()
+        return self._snapshot
+
+    def stats(self) -> dict:
+        with self._lock:
+            snapshot = self._snapshot
+            return {
+                'loads': self.loads,
+                'version_checks': self.version_checks,
+                'row_version': snapshot.row_version if snapshot else None,
+                'loaded_at': datetime.fromtimestamp(snapshot.loaded_at).isoformat() if snapshot else None,
+            }
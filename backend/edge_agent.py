@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Edge agent for a door machine
+Runs the zk inventory loop next to the reader, keeps one read per tag per
+dedup window, spools accepted reads to an append-only local file and uploads
+them to the server's /api/edge/ingest in compressed batches. The spool is
+only trimmed after the server acknowledged a batch, so reads survive network
+outages and agent restarts.
+
+    python edge_agent.py run --server http://server:3000 --token <token> --serial /dev/ttyUSB0
+    python edge_agent.py run --server http://localhost:8765 --token test --simulate ABCD0114,ABCD0115
+    python edge_agent.py stand-in --port 8765 --fail-rate 0.3
+"""
+
+import os
+import gzip
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class LocalDedup:
+    """Keeps the first read of a tag and drops repeats within `window` seconds.
+
+    The reader reports a tag in its field many times per second; only one
+    read per tag and window is worth spooling.
+    """
+
+    def __init__(self, window: float = 10.0):
+        self.window = window
+        self._last: Dict[str, float] = {}
+        self.dropped = 0
+
+    def accept(self, epc: str, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        last = self._last.get(epc)
+        if last is not None and now - last < self.window:
+            self.dropped += 1
+            return False
+        self._last[epc] = now
+        if len(self._last) > 10000:
+            # Forget tags outside the window so the table stays small
+            self._last = {e: t for e, t in self._last.items() if now - t < self.window}
+        return True
+
+
+class Spool:
+    """Append-only JSON Lines file of reads plus the last acknowledged seq.
+
+    Every read gets the next sequence number and is fsync'ed before
+    ``append`` returns. ``ack`` records the highest seq the server confirmed
+    in a small side file (replaced atomically); once everything is
+    acknowledged and the spool is large, it is truncated. The seq counter
+    survives truncation and restarts, so the server never sees a seq twice
+    for different reads.
+    """
+
+    def __init__(self, path: str, compact_bytes: int = 1024 * 1024):
+        self.path = path
+        self.ack_path = path + '.ack'
+        self.compact_bytes = compact_bytes
+        self._lock = threading.Lock()
+        self.acked = 0
+        self.last_seq = 0
+        if os.path.exists(self.ack_path):
+            with open(self.ack_path) as f:
+                state = json.load(f)
+            self.acked = state.get('acked', 0)
+            self.last_seq = state.get('last_seq', self.acked)
+        self._pending: List[dict] = []
+        if os.path.exists(path):
+            complete = 0
+            with open(path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # Torn last line from a crash mid-write: append() never returned for it
+                        break
+                    complete += len(line)
+                    record = self._parse(line)
+                    if record is None:
+                        continue
+                    self.last_seq = max(self.last_seq, record['seq'])
+                    if record['seq'] > self.acked:
+                        self._pending.append(record)
+            if complete < os.path.getsize(path):
+                # Cut the fragment so the next record starts on its own line
+                logger.warning(f"Spool {path}: dropping torn last line ({os.path.getsize(path) - complete} bytes)")
+                os.truncate(path, complete)
+        self._file = open(path, 'a')
+        logger.info(f"Spool {path}: {len(self._pending)} read(s) pending, last seq {self.last_seq}")
+
+    @staticmethod
+    def _parse(line: bytes) -> Optional[dict]:
+        try:
+            return json.loads(line)
+        except ValueError:
+            # Spools written before torn lines were truncated may have a record
+            # appended right after the fragment; recover that record
+            start = line.rfind(b'{"seq": ', 1)
+            if start > 0:
+                try:
+                    return json.loads(line[start:])
+                except ValueError:
+                    pass
+            return None
+
+    def append(self, read: dict) -> dict:
+        with self._lock:
+            self.last_seq += 1
+            record = {'seq': self.last_seq, **read}
+            self._file.write(json.dumps(record) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending.append(record)
+            return record
+
+    def pending(self, limit: int) -> List[dict]:
+        with self._lock:
+            return self._pending[:limit]
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def ack(self, seq: int) -> None:
+        """Everything up to and including `seq` reached the server."""
+        with self._lock:
+            self.acked = max(self.acked, seq)
+            self._pending = [record for record in self._pending if record['seq'] > self.acked]
+            tmp = self.ack_path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump({'acked': self.acked, 'last_seq': self.last_seq}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.ack_path)
+            if not self._pending and self._file.tell() > self.compact_bytes:
+                self._file.close()
+                self._file = open(self.path, 'w')
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class Uploader:
+    """Sends spooled reads in gzip batches with exponential backoff.
+
+    A batch is acknowledged in the spool only after a 2xx answer; any other
+    outcome (no network, 5xx, bad token) keeps the reads and retries after
+    a delay that doubles up to `max_backoff`, with jitter so many doors do
+    not retry in step. Retried batches are safe: the server deduplicates
+    on (reader_id, seq).
+    """
+
+    def __init__(self, spool: Spool, server: str, token: str, reader_id: Optional[str] = None,
+                 batch_size: int = 500, interval: float = 2.0, timeout: float = 10.0,
+                 base_backoff: float = 1.0, max_backoff: float = 300.0):
+        self.spool = spool
+        self.url = server.rstrip('/') + '/api/edge/ingest'
+        self.token = token
+        self.reader_id = reader_id
+        self.batch_size = batch_size
+        self.interval = interval
+        self.timeout = timeout
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.failures = 0
+        self.batches_sent = 0
+        self.reads_sent = 0
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='edge-uploader', daemon=True)
+        self._thread.start()
+
+    def stop(self, flush_timeout: float = 5.0) -> None:
+        """Stop after one last upload attempt (bounded by `flush_timeout`)."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(flush_timeout + self.timeout)
+
+    def notify(self) -> None:
+        """A read was spooled; upload early once a full batch is waiting."""
+        if self.spool.pending_count() >= self.batch_size:
+            self._wake.set()
+
+    def upload_once(self) -> bool:
+        """Send one batch; True if the spool is now empty or the batch was acknowledged."""
+        batch = self.spool.pending(self.batch_size)
+        if not batch:
+            return True
+        items = [{**record, 'reader_id': self.reader_id} if self.reader_id else record for record in batch]
+        body = gzip.compress(json.dumps({'items': items}).encode('utf-8'))
+        request = urllib.request.Request(self.url, data=body, method='POST', headers={
+            'Authorization': f'Bearer {self.token}',
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'gzip',
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                answer = json.loads(response.read() or b'{}')
+        except urllib.error.HTTPError as e:
+            logger.error(f"Upload rejected: HTTP {e.code} {e.read()[:200]!r}")
+            return False
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            logger.warning(f"Server unreachable: {e}")
+            return False
+        self.spool.ack(batch[-1]['seq'])
+        self.batches_sent += 1
+        self.reads_sent += len(batch)
+        logger.info(f"Uploaded {len(batch)} read(s) up to seq {batch[-1]['seq']} "
+                    f"({answer.get('duplicates', 0)} duplicate(s), {len(body)} bytes)")
+        return True
+
+    def backoff(self) -> float:
+        delay = min(self.max_backoff, self.base_backoff * (2 ** min(self.failures - 1, 20)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self.upload_once():
+                self.failures = 0
+                # Keep draining a backlog; otherwise wait for the next interval
+                if self.spool.pending_count() == 0:
+                    self._wake.wait(self.interval)
+                    self._wake.clear()
+            else:
+                self.failures += 1
+                delay = self.backoff()
+                logger.info(f"Retrying in {delay:.1f}s ({self.spool.pending_count()} read(s) spooled)")
+                self._stop.wait(delay)
+        self.upload_once()
+
+
+def run_agent(args) -> None:
+    spool = Spool(args.spool)
+    dedup = LocalDedup(args.dedup_window)
+    uploader = Uploader(spool, args.server, args.token, args.reader_id,
+                        batch_size=args.batch_size, interval=args.interval, max_backoff=args.max_backoff)
+    running = threading.Event()
+    running.set()
+
+    def on_read(epc: str, rssi: Optional[int] = None, antenna: Optional[int] = None) -> None:
+        # Runs inside the read loop: dedup and one fsync'ed append, nothing else
+        epc = epc.replace(' ', '').upper()
+        if not dedup.accept(epc):
+            return
+        spool.append({'epc': epc, 'ts': datetime.now().isoformat(), 'rssi': rssi, 'antenna': antenna})
+        uploader.notify()
+
+    uploader.start()
+    try:
+        if args.simulate:
+            simulate_reads(args.simulate.split(','), args.rate, on_read, lambda: not running.is_set())
+        else:
+            # Imported here so the agent and stand-in run without pyserial
+            from zk import connect_reader, start_inventory
+            reader = connect_reader(args.serial, args.baudrate)
+            if reader is None:
+                raise SystemExit(f"Cannot open reader on {args.serial}")
+            start_inventory(reader, address=0x00,
+                            tag_callback=lambda tag: on_read(tag.epc, tag.rssi, tag.antenna),
+                            stop_flag=lambda: not running.is_set())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        running.clear()
+        uploader.stop()
+        logger.info(f"Agent stopped: {uploader.reads_sent} read(s) in {uploader.batches_sent} batch(es), "
+                    f"{dedup.dropped} repeat(s) dropped, {spool.pending_count()} still spooled")
+        spool.close()
+
+
+def simulate_reads(epcs: List[str], rate: float, on_read: Callable[..., None],
+                   stop: Callable[[], bool]) -> None:
+    """Stand-in for the serial loop: random tags at `rate` reads per second."""
+    while not stop():
+        on_read(random.choice(epcs), rssi=random.randint(-70, -40), antenna=random.randint(1, 4))
+        time.sleep(1.0 / rate)
+
+
+def run_stand_in(args) -> None:
+    """Minimal local server speaking the /api/edge/ingest protocol.
+
+    Deduplicates on (reader, seq) like the real server, accepts any bearer
+    token and fails a share of requests with 503 to exercise the agent's
+    retries.
+    """
+    seen: Dict[tuple, dict] = {}
+    lock = threading.Lock()
+    stats = {'requests': 0, 'failed': 0, 'items': 0, 'duplicates': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            with lock:
+                stats['requests'] += 1
+            if random.random() < args.fail_rate:
+                with lock:
+                    stats['failed'] += 1
+                self.send_error(503, 'Simulated outage')
+                return
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if self.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            token = (self.headers.get('Authorization') or '').replace('Bearer ', '')
+            reader_id = token.split('.')[0] or 'STAND_IN'
+            results = []
+            with lock:
+                for item in json.loads(body)['items']:
+                    key = (reader_id, item['seq'])
+                    duplicate = key in seen
+                    seen.setdefault(key, item)
+                    stats['items'] += 1
+                    stats['duplicates'] += duplicate
+                    results.append({'seq': item['seq'], 'duplicate': duplicate, 'status': 'accepted'})
+                unique = len(seen)
+            answer = json.dumps({'success': True, 'received': len(results),
+                                 'duplicates': sum(r['duplicate'] for r in results), 'results': results}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(answer)))
+            self.end_headers()
+            self.wfile.write(answer)
+            logger.info(f"Stand-in: {len(results)} item(s), {unique} unique so far, {stats}")
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('0.0.0.0', args.port), Handler)
+    logger.info(f"Stand-in ingest server on http://localhost:{args.port} (fail rate {args.fail_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Edge agent for remote RFID doors')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='Read tags, spool them and upload batches')
+    run.add_argument('--server', required=True, help='Server base URL, e.g. http://server:3000')
+    run.add_argument('--token', required=True, help='Reader token from POST /api/edge/readers')
+    run.add_argument('--reader-id', help='Reader ID sent with each item (defaults to the token\'s)')
+    run.add_argument('--spool', default='edge_spool.jsonl', help='Append-only spool file')
+    run.add_argument('--serial', default='/dev/ttyUSB0', help='Serial port of the reader')
+    run.add_argument('--baudrate', type=int, default=57600)
+    run.add_argument('--dedup-window', type=float, default=10.0, help='Seconds between reads of one tag')
+    run.add_argument('--batch-size', type=int, default=500, help='Reads per upload (server max 1000)')
+    run.add_argument('--interval', type=float, default=2.0, help='Seconds between uploads')
+    run.add_argument('--max-backoff', type=float, default=300.0, help='Longest retry delay in seconds')
+    run.add_argument('--simulate', help='Comma-separated EPCs to generate instead of reading the serial port')
+    run.add_argument('--rate', type=float, default=20.0, help='Simulated reads per second')
+
+    stand_in = commands.add_parser('stand-in', help='Local stand-in server for testing the agent')
+    stand_in.add_argument('--port', type=int, default=8765)
+    stand_in.add_argument('--fail-rate', type=float, default=0.0, help='Share of requests answered with 503')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run_agent(args)
+    else:
+        run_stand_in(args)
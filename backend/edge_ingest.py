@@ -0,0 +1,279 @@
+import json
+import math
+import zlib
+import hashlib
+import secrets
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bulk_import import IN_CHUNK_SIZE, normalize_epc
+
+# Largest batch accepted in one request
+MAX_BATCH_ITEMS = 1000
+# Items decided per write transaction (~6 ms each), so a large batch never
+# holds the write lock anywhere near the other writers' busy timeout
+ITEMS_PER_TRANSACTION = 100
+# Device clocks may run ahead of the server by at most this much
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+# Decompressed request bodies larger than this are rejected
+MAX_BODY_BYTES = 8 * 1024 * 1024
+# Outcomes are kept this long for retries to be answered from the log
+INGEST_LOG_DAYS = 14
+
+# (conn, epc, scanned_at, reader_id) -> scan result
+ProcessScan = Callable[[sqlite3.Connection, str, datetime, str], dict]
+
+
+class IngestError(ValueError):
+    """The batch as a whole is malformed (the request is rejected)."""
+
+
+def init_edge_tables(conn: sqlite3.Connection) -> None:
+    """Create the edge reader registry and the per-sequence ingest log."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS edge_readers (
+            reader_id TEXT PRIMARY KEY,
+            name TEXT,
+            token_hash TEXT UNIQUE NOT NULL,
+            is_active BOOLEAN DEFAULT 1,
+            last_seen_at TEXT,
+            last_seq INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS edge_ingest_log (
+            reader_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            epc TEXT,
+            device_ts TEXT,
+            rssi REAL,
+            antenna INTEGER,
+            status TEXT NOT NULL,
+            result TEXT NOT NULL,
+            received_at TEXT NOT NULL,
+            PRIMARY KEY (reader_id, seq)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_edge_ingest_received ON edge_ingest_log (received_at)')
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def issue_token(conn: sqlite3.Connection, reader_id: str, name: Optional[str] = None) -> str:
+    """Register a reader (or rotate its token) and return the new token.
+
+    Only the hash is stored, so the token can not be shown again.
+    """
+    token = f'{reader_id}.{secrets.token_urlsafe(32)}'
+    conn.execute('''
+        INSERT INTO edge_readers (reader_id, name, token_hash, is_active) VALUES (?, ?, ?, 1)
+        ON CONFLICT(reader_id) DO UPDATE SET
+            token_hash = excluded.token_hash, is_active = 1, name = COALESCE(excluded.name, edge_readers.name)
+    ''', (reader_id, name, hash_token(token)))
+    return token
+
+
+def authenticate(conn: sqlite3.Connection, authorization: Optional[str]) -> Optional[str]:
+    """Reader ID for an ``Authorization: Bearer <token>`` header, or None."""
+    if not authorization or not authorization.startswith('Bearer '):
+        return None
+    row = conn.execute('SELECT reader_id FROM edge_readers WHERE token_hash = ? AND is_active = 1',
+                       (hash_token(authorization[len('Bearer '):].strip()),)).fetchone()
+    return row[0] if row else None
+
+
+def list_readers(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    rows = conn.execute('''
+        SELECT reader_id, name, is_active, last_seen_at, last_seq, created_at
+        FROM edge_readers ORDER BY reader_id
+    ''').fetchall()
+    return [{'reader_id': r[0], 'name': r[1], 'is_active': bool(r[2]), 'last_seen_at': r[3],
+             'last_seq': r[4], 'created_at': r[5]} for r in rows]
+
+
+def _reject(reason: str, message: str) -> dict:
+    return {'status': 'rejected', 'reason': reason, 'message': message}
+
+
+def _finite_number(value: Any) -> Optional[float]:
+    """`value` as a float if it is a finite JSON number, else None."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    try:
+        value = float(value)
+    except OverflowError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _parse_item(raw: Any, reader_id: str, now: datetime) -> Tuple[Optional[dict], Optional[dict]]:
+    """Validate one item; returns (item, None) or (partial item, rejection)."""
+    if not isinstance(raw, dict):
+        raise IngestError('Every item must be an object')
+    try:
+        seq = int(raw.get('seq'))
+    except (TypeError, ValueError, OverflowError):
+        raise IngestError('Every item needs an integer seq')
+    if not 0 <= seq < 2 ** 63:
+        raise IngestError('seq must be a non-negative 64-bit integer')
+    rssi, antenna, ts = raw.get('rssi'), raw.get('antenna'), raw.get('ts')
+    item = {
+        'seq': seq,
+        'epc': normalize_epc(raw.get('epc')),
+        'device_ts': None if ts is None else str(ts),
+        # Only stored once validated below; anything else would fail the log insert
+        'rssi': None,
+        'antenna': None,
+    }
+    if raw.get('reader_id') not in (None, reader_id):
+        return item, _reject('reader_mismatch', 'Item reader_id does not match the token')
+    if rssi is not None:
+        item['rssi'] = _finite_number(rssi)
+        if item['rssi'] is None:
+            return item, _reject('invalid_rssi', 'rssi must be a number')
+    if antenna is not None:
+        if isinstance(antenna, bool) or not isinstance(antenna, int) or not 0 <= antenna <= 255:
+            return item, _reject('invalid_antenna', 'antenna must be an integer from 0 to 255')
+        item['antenna'] = antenna
+    if not item['epc']:
+        return item, _reject('invalid_epc', 'epc is required')
+    try:
+        scanned_at = datetime.fromisoformat(str(item['device_ts']))
+    except ValueError:
+        return item, _reject('invalid_timestamp', 'ts must be an ISO datetime')
+    if scanned_at.tzinfo is not None:
+        # Attendance times are naive local time
+        scanned_at = scanned_at.astimezone().replace(tzinfo=None)
+    if scanned_at > now + MAX_CLOCK_SKEW:
+        return item, _reject('invalid_timestamp', 'ts is in the future')
+    item['scanned_at'] = scanned_at
+    return item, None
+
+
+def decode_body(body: bytes, content_encoding: Optional[str] = None) -> Any:
+    """JSON value of a request body sent plain or with ``Content-Encoding: gzip``.
+
+    Raises:
+        IngestError: Unknown encoding, corrupt or oversized gzip data, or invalid JSON.
+    """
+    encoding = (content_encoding or 'identity').strip().lower()
+    if encoding == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = decompressor.decompress(body, MAX_BODY_BYTES)
+        except zlib.error:
+            raise IngestError('Corrupt gzip body')
+        if decompressor.unconsumed_tail:
+            raise IngestError(f'Decompressed body exceeds {MAX_BODY_BYTES} bytes')
+    elif encoding != 'identity':
+        raise IngestError(f'Unsupported Content-Encoding: {content_encoding}')
+    try:
+        return json.loads(body)
+    except ValueError:
+        raise IngestError('Body is not valid JSON')
+
+
+def parse_batch(data: Any, reader_id: str, now: Optional[datetime] = None) -> List[Tuple[dict, Optional[dict]]]:
+    """Validate a batch body ``{"items": [...]}`` or a bare array.
+
+    Raises:
+        IngestError: The body is not a batch, is too large or an item has no seq.
+    """
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        raise IngestError('Expected {"items": [...]}')
+    if len(items) > MAX_BATCH_ITEMS:
+        raise IngestError(f'At most {MAX_BATCH_ITEMS} items per batch')
+    now = now or datetime.now()
+    return [_parse_item(raw, reader_id, now) for raw in items]
+
+
+def transaction_chunks(parsed: List[Tuple[dict, Optional[dict]]],
+                       size: int = ITEMS_PER_TRANSACTION) -> List[List[int]]:
+    """Item indexes in sequence order, split into groups of at most `size`.
+
+    Each group is ingested in its own transaction. Committed groups are in
+    the ingest log, so if a later group fails the agent's retry of the whole
+    batch answers them as duplicates and only processes the rest.
+    """
+    order = sorted(range(len(parsed)), key=lambda i: parsed[i][0]['seq'])
+    return [order[i:i + size] for i in range(0, len(order), size)]
+
+
+def _stored_outcomes(conn: sqlite3.Connection, reader_id: str, seqs: List[int]) -> Dict[int, dict]:
+    stored: Dict[int, dict] = {}
+    seqs = sorted(set(seqs))
+    for i in range(0, len(seqs), IN_CHUNK_SIZE):
+        chunk = seqs[i:i + IN_CHUNK_SIZE]
+        rows = conn.execute(f'''
+            SELECT seq, result FROM edge_ingest_log WHERE reader_id = ? AND seq IN ({','.join('?' * len(chunk))})
+        ''', [reader_id, *chunk])
+        stored.update((seq, json.loads(result)) for seq, result in rows)
+    return stored
+
+
+def prune_ingest_log(conn: sqlite3.Connection, days: int = INGEST_LOG_DAYS) -> int:
+    """Forget outcomes older than `days`; agents never retry that late."""
+    cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+    return conn.execute('DELETE FROM edge_ingest_log WHERE received_at < ?', (cutoff,)).rowcount
+
+
+def ingest_batch(conn: sqlite3.Connection, reader_id: str, parsed: List[Tuple[dict, Optional[dict]]],
+                 process: ProcessScan, divert: Optional[Callable[[str], bool]] = None) -> List[dict]:
+    """Process a parsed batch inside the caller's transaction.
+
+    Items whose (reader_id, seq) is already in the ingest log are not
+    processed again: their stored outcome is returned with
+    ``duplicate: true``, so an agent can retry a batch safely. New items are
+    processed in sequence order and their outcome is logged.
+
+    Parameters:
+        process (ProcessScan): Scan decision for one read at its device time.
+        divert (Optional[Callable[[str], bool]]): Takes reads out of the scan
+            logic (e.g. unknown EPCs during enrollment).
+
+    Returns:
+        List[dict]: One outcome per item, in request order, each with ``seq``
+            and the scan result fields (``status``, ``reason``/``action``...).
+    """
+    stored = _stored_outcomes(conn, reader_id, [item['seq'] for item, _ in parsed])
+    received_at = datetime.now().isoformat()
+    outcomes: Dict[int, dict] = {}
+    log_rows = []
+    for item, rejection in sorted(parsed, key=lambda entry: entry[0]['seq']):
+        seq = item['seq']
+        if seq in stored or seq in outcomes:
+            continue
+        if rejection is not None:
+            result = rejection
+        elif divert is not None and divert(item['epc']):
+            result = {'status': 'diverted', 'reason': 'enrollment', 'message': 'Read taken by the enrollment session'}
+        else:
+            result = process(conn, item['epc'], item['scanned_at'], reader_id)
+        outcomes[seq] = result
+        log_rows.append((reader_id, seq, item['epc'], item['device_ts'], item['rssi'], item['antenna'],
+                         result['status'], json.dumps(result), received_at))
+    conn.executemany('''
+        INSERT INTO edge_ingest_log (reader_id, seq, epc, device_ts, rssi, antenna, status, result, received_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', log_rows)
+    if parsed:
+        conn.execute('''
+            UPDATE edge_readers SET last_seen_at = ?, last_seq = MAX(COALESCE(last_seq, 0), ?)
+            WHERE reader_id = ?
+        ''', (received_at, max(item['seq'] for item, _ in parsed), reader_id))
+
+    results = []
+    seen = set()
+    for item, _ in parsed:
+        seq = item['seq']
+        if seq in stored or seq in seen:
+            results.append({'seq': seq, 'duplicate': True, **(stored.get(seq) or outcomes[seq])})
+        else:
+            results.append({'seq': seq, 'duplicate': False, **outcomes[seq]})
+        seen.add(seq)
+    return results
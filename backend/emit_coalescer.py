@@ -0,0 +1,278 @@
+import time
+import logging
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import count
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set
+
+from metrics import REGISTRY
+
+
+logger = logging.getLogger(__name__)
+
+SOCKETIO_EMITS = REGISTRY.counter('socketio_emits_total', 'Socket.IO event batches sent to clients', ['result'])
+SOCKETIO_EMITS_OK = SOCKETIO_EMITS.labels('ok')
+SOCKETIO_EMITS_ERROR = SOCKETIO_EMITS.labels('error')
+SOCKETIO_EMIT_SECONDS = REGISTRY.histogram('socketio_emit_seconds', 'Time spent in one Socket.IO batch emit')
+
+# Upper bounds of the batch size histogram buckets (last bucket is +Inf)
+BATCH_SIZE_BUCKETS = [1, 2, 5, 10, 25, 50, 100]
+
+
+class _ClientQueue:
+    """Pending events and token bucket of one connected client."""
+
+    def __init__(self, rate: float, burst: float):
+        self.pending: 'OrderedDict[Hashable, dict]' = OrderedDict()
+        self.rooms: Set[str] = set()
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take_token(self, now: float) -> bool:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class EmitCoalescer:
+    """Batch Socket.IO events into one message per client per window.
+
+    Producers call ``emit`` from any thread; nothing is sent synchronously.
+    Every ``window`` seconds the flush thread fans the collected events out
+    to each client's queue and sends that queue as a single ``event_batch``
+    message, as long as the client's outbound rate allows it. Clients that
+    are rate limited keep accumulating until their next token.
+
+    Events emitted with a ``key`` supersede any unsent event with the same
+    event name and key (e.g. an older status of the same employee), so only
+    the latest state is delivered.
+
+    Events emitted with ``rooms`` only reach clients subscribed to one of
+    those rooms (e.g. ``reader:MAIN_ENTRANCE``, ``department:IT``), plus
+    clients with no subscription at all, which keep receiving everything.
+    """
+
+    def __init__(self, socketio, window: float = 0.15, max_messages_per_second: float = 4.0,
+                 batch_event: str = 'event_batch'):
+        """Create a coalescer.
+
+        Parameters:
+            socketio: Flask-SocketIO instance used to send batches.
+            window (float, optional): Flush interval in seconds. Defaults to 0.15.
+            max_messages_per_second (float, optional): Per-client outbound rate.
+            batch_event (str, optional): Event name of the batched message.
+        """
+        self.socketio = socketio
+        self.window = window
+        self.max_messages_per_second = max_messages_per_second
+        self.batch_event = batch_event
+        self._lock = threading.Lock()
+        self._pending: 'OrderedDict[Hashable, dict]' = OrderedDict()
+        self._clients: Dict[str, _ClientQueue] = {}
+        self._room_members: Dict[str, Set[str]] = {}
+        self._unsubscribed: Set[str] = set()
+        self._unique = count()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # Metrics
+        self.events_in = 0
+        self.events_sent = 0
+        self.batches_sent = 0
+        # Per event before fan-out, and per client queue after it
+        self.dropped_superseded = 0
+        self.dropped_no_clients = 0
+        self.client_superseded = 0
+        self.rate_limited = 0
+        self.batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self.batch_size_sum = 0
+
+    def start(self) -> None:
+        """Start the flush thread (idempotent)."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='emit-coalescer', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Flush what is pending and stop the flush thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(self.window * 4)
+        self.flush(force=True)
+
+    def add_client(self, sid: str) -> None:
+        burst = max(1.0, self.max_messages_per_second)
+        with self._lock:
+            self._clients[sid] = _ClientQueue(self.max_messages_per_second, burst)
+            self._unsubscribed.add(sid)
+        self.start()
+
+    def remove_client(self, sid: str) -> None:
+        with self._lock:
+            client = self._clients.pop(sid, None)
+            self._unsubscribed.discard(sid)
+            if client:
+                self._leave(sid, client, client.rooms)
+
+    def _leave(self, sid: str, client: _ClientQueue, rooms: Iterable[str]) -> None:
+        for room in list(rooms):
+            client.rooms.discard(room)
+            members = self._room_members.get(room)
+            if members:
+                members.discard(sid)
+                if not members:
+                    del self._room_members[room]
+
+    def subscribe(self, sid: str, rooms: Iterable[str]) -> Set[str]:
+        """Join rooms; the client then only receives events for its rooms.
+
+        Returns:
+            Set[str]: All rooms the client is subscribed to.
+        """
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is None:
+                return set()
+            for room in rooms:
+                client.rooms.add(room)
+                self._room_members.setdefault(room, set()).add(sid)
+            if client.rooms:
+                self._unsubscribed.discard(sid)
+            return set(client.rooms)
+
+    def unsubscribe(self, sid: str, rooms: Optional[Iterable[str]] = None) -> Set[str]:
+        """Leave the given rooms (all rooms if None).
+
+        Returns:
+            Set[str]: Rooms still subscribed; with none left the client is back
+                to receiving every event.
+        """
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is None:
+                return set()
+            self._leave(sid, client, client.rooms if rooms is None else rooms)
+            if not client.rooms:
+                self._unsubscribed.add(sid)
+            return set(client.rooms)
+
+    def _slot(self, event: str, key: Optional[Hashable]) -> Hashable:
+        return (event, key) if key is not None else ('', next(self._unique))
+
+    @staticmethod
+    def _put(queue: 'OrderedDict[Hashable, dict]', slot: Hashable, item: dict) -> bool:
+        """Insert as the newest item; True if an older item was superseded."""
+        superseded = queue.pop(slot, None) is not None
+        queue[slot] = item
+        return superseded
+
+    def emit(self, event: str, data: Any, key: Optional[Hashable] = None,
+             rooms: Optional[Iterable[str]] = None) -> None:
+        """Queue an event for connected clients.
+
+        Events emitted while no client is connected are dropped.
+
+        Parameters:
+            event (str): Event name inside the batch.
+            data (Any): Event payload.
+            key (Optional[Hashable]): Supersede key; a newer event with the same
+                name and key replaces an unsent older one.
+            rooms (Optional[Iterable[str]]): Rooms the event belongs to; None
+                broadcasts to every client.
+        """
+        with self._lock:
+            self.events_in += 1
+            if not self._clients:
+                # Nobody to deliver to, and no flush thread before the first client
+                self.dropped_no_clients += 1
+                return
+            slot = self._slot(event, key)
+            item = {'event': event, 'data': data}
+            if self._put(self._pending, slot, (item, frozenset(rooms) if rooms is not None else None)):
+                self.dropped_superseded += 1
+
+    def _targets(self, rooms: Optional[frozenset]) -> Set[str]:
+        if rooms is None:
+            return set(self._clients)
+        targets = set(self._unsubscribed)
+        for room in rooms:
+            targets |= self._room_members.get(room, set())
+        return targets
+
+    def _observe_batch(self, size: int) -> None:
+        self.batches_sent += 1
+        self.events_sent += size
+        self.batch_size_sum += size
+        self.batch_size_counts[bisect_left(BATCH_SIZE_BUCKETS, size)] += 1
+
+    def flush(self, force: bool = False) -> None:
+        """Fan pending events out to clients and send what the rate allows.
+
+        Parameters:
+            force (bool, optional): Ignore rate limits (used on stop).
+        """
+        now = time.monotonic()
+        outgoing: List[tuple] = []
+        with self._lock:
+            pending, self._pending = self._pending, OrderedDict()
+            # Fan out only to the clients each event is routed to
+            for slot, (item, rooms) in pending.items():
+                for sid in self._targets(rooms):
+                    if self._put(self._clients[sid].pending, slot, item):
+                        self.client_superseded += 1
+            for sid, client in self._clients.items():
+                if not client.pending:
+                    continue
+                if not force and not client.take_token(now):
+                    self.rate_limited += 1
+                    continue
+                events = list(client.pending.values())
+                client.pending.clear()
+                self._observe_batch(len(events))
+                outgoing.append((sid, events))
+
+        for sid, events in outgoing:
+            try:
+                with SOCKETIO_EMIT_SECONDS.time():
+                    self.socketio.emit(self.batch_event, {'events': events}, to=sid)
+                SOCKETIO_EMITS_OK.inc()
+            except Exception as e:
+                SOCKETIO_EMITS_ERROR.inc()
+                logger.error(f"Error sending event batch to {sid}: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.window):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing event batches: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Coalescing counters and the batch size histogram."""
+        with self._lock:
+            buckets = {str(bound): n for bound, n in zip(BATCH_SIZE_BUCKETS, self.batch_size_counts)}
+            buckets['+Inf'] = self.batch_size_counts[-1]
+            return {
+                'clients': len(self._clients),
+                'unsubscribed_clients': len(self._unsubscribed),
+                'rooms': {room: len(members) for room, members in self._room_members.items()},
+                'window_seconds': self.window,
+                'max_messages_per_second': self.max_messages_per_second,
+                'events_in': self.events_in,
+                'events_sent': self.events_sent,
+                'batches_sent': self.batches_sent,
+                'dropped_superseded': self.dropped_superseded,
+                'dropped_no_clients': self.dropped_no_clients,
+                'client_superseded': self.client_superseded,
+                'rate_limited': self.rate_limited,
+                'batch_size_sum': self.batch_size_sum,
+                'batch_size_buckets': buckets,
+            }
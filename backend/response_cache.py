@@ -0,0 +1,135 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import Response, request
+
+
+class DataVersions:
+    """Per-table data version counters.
+
+    Every write path bumps the tables it touched; cached responses are keyed
+    by the versions of the tables they were built from, so a bump makes
+    them unreachable without any explicit invalidation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        self._listeners: List[Callable[[Tuple[str, ...]], None]] = []
+
+    def subscribe(self, listener: Callable[[Tuple[str, ...]], None]) -> None:
+        """Register a callback receiving the tables of every bump (after the write)."""
+        self._listeners.append(listener)
+
+    def bump(self, *tables: str) -> None:
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+        for listener in self._listeners:
+            listener(tables)
+
+    def get(self, *tables: str) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._versions)
+
+
+class ResponseCache:
+    """Cache of rendered GET responses with strong ETags and 304 support."""
+
+    def __init__(self, versions: DataVersions, max_entries: int = 256):
+        self.versions = versions
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[tuple, Tuple[bytes, str, str]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def _lookup(self, key: tuple) -> Optional[Tuple[bytes, str, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key: tuple, entry: Tuple[bytes, str, str]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _etag_matches(etag: str) -> bool:
+        """True if If-None-Match lists this ETag (weak comparison) or is ``*``."""
+        for candidate in request.headers.get('If-None-Match', '').split(','):
+            candidate = candidate.strip()
+            if candidate == '*' or (candidate[2:] if candidate.startswith('W/') else candidate) == etag:
+                return True
+        return False
+
+    @classmethod
+    def _respond(cls, entry: Tuple[bytes, str, str]) -> Response:
+        body, mimetype, etag = entry
+        if cls._etag_matches(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype=mimetype)
+        response.headers['ETag'] = etag
+        # Clients may keep the body but must revalidate every time
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    def cached(self, *tables: str, vary: Optional[Callable[[], object]] = None):
+        """Decorator caching a GET view by the versions of the given tables.
+
+        Parameters:
+            *tables (str): Tables the response is built from.
+            vary (Optional[Callable[[], object]]): Extra key component that is
+                not a table write, e.g. today's date for day-scoped data.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = (
+                    request.path,
+                    tuple(sorted(request.args.items(multi=True))),
+                    self.versions.get(*tables),
+                    vary() if vary else None,
+                )
+                entry = self._lookup(key)
+                if entry is not None:
+                    with self._lock:
+                        self.hits += 1
+                        if self._etag_matches(entry[2]):
+                            self.not_modified += 1
+                    return self._respond(entry)
+
+                response = view(*args, **kwargs)
+                if not isinstance(response, Response) or response.status_code != 200:
+                    return response
+                body = response.get_data()
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                entry = (body, response.mimetype, etag)
+                self._store(key, entry)
+                with self._lock:
+                    self.misses += 1
+                return self._respond(entry)
+            return wrapper
+        return decorator
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+            }
@@ -0,0 +1,341 @@
+import time
+import logging
+import threading
+from collections import Counter, deque
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from metrics import REGISTRY
+
+
+logger = logging.getLogger(__name__)
+
+# Per-stage latency: queue wait, batch decision/persistence, notification, read to notified
+STAGE_SECONDS = REGISTRY.histogram('scan_stage_seconds', 'Latency of each scan pipeline stage', ['stage'])
+QUEUE_SECONDS = STAGE_SECONDS.labels('queue')
+PROCESS_SECONDS = STAGE_SECONDS.labels('process')
+NOTIFY_SECONDS = STAGE_SECONDS.labels('notify')
+TOTAL_SECONDS = STAGE_SECONDS.labels('total')
+
+
+class BoundedQueue:
+    """Bounded FIFO with a drop policy instead of blocking the producer.
+
+    When the queue is full, the oldest item whose key is queued more than once
+    (a duplicate read of the same tag) is dropped first; only if there are no
+    duplicates is the oldest item dropped. Producers never block, so a slow
+    consumer can not stall the serial read loop.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1000):
+        self.name = name
+        self.maxsize = maxsize
+        self._items: deque = deque()
+        self._keys: Counter = Counter()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.enqueued = 0
+        self.dequeued = 0
+        self.dropped_duplicate = 0
+        self.dropped_oldest = 0
+        self.high_watermark = 0
+
+    def _remove_at(self, index: int) -> None:
+        key, _ = self._items[index]
+        del self._items[index]
+        self._keys[key] -= 1
+        if self._keys[key] <= 0:
+            del self._keys[key]
+
+    def _make_room(self, incoming_key: Hashable) -> None:
+        # Oldest read of the same tag is superseded by the incoming one
+        if self._keys.get(incoming_key):
+            for i, (key, _) in enumerate(self._items):
+                if key == incoming_key:
+                    self._remove_at(i)
+                    self.dropped_duplicate += 1
+                    return
+        # Otherwise drop the oldest read that has a newer duplicate queued
+        for i, (key, _) in enumerate(self._items):
+            if self._keys[key] > 1:
+                self._remove_at(i)
+                self.dropped_duplicate += 1
+                return
+        self._remove_at(0)
+        self.dropped_oldest += 1
+
+    def put(self, key: Hashable, item: Any) -> bool:
+        """Add an item, dropping an older one if the queue is full.
+
+        Parameters:
+            key (Hashable): Deduplication key (e.g. EPC or employee ID).
+            item (Any): Payload.
+
+        Returns:
+            bool: False if the queue is closed and the item was rejected.
+        """
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._items) >= self.maxsize:
+                self._make_room(key)
+            self._items.append((key, item))
+            self._keys[key] += 1
+            self.enqueued += 1
+            self.high_watermark = max(self.high_watermark, len(self._items))
+            self._cond.notify()
+            return True
+
+    def get_batch(self, max_items: int, timeout: float = 0.5) -> Optional[List[Any]]:
+        """Take up to max_items items, waiting up to timeout for the first one.
+
+        Returns:
+            Optional[List[Any]]: Items (possibly empty on timeout), or None once
+                the queue is closed and fully drained.
+        """
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None if self._closed else []
+            batch = []
+            while self._items and len(batch) < max_items:
+                key, item = self._items.popleft()
+                self._keys[key] -= 1
+                if self._keys[key] <= 0:
+                    del self._keys[key]
+                batch.append(item)
+            self.dequeued += len(batch)
+            return batch
+
+    def close(self) -> None:
+        """Reject new items; consumers drain what is left and then get None."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'depth': len(self._items),
+                'maxsize': self.maxsize,
+                'high_watermark': self.high_watermark,
+                'enqueued': self.enqueued,
+                'dequeued': self.dequeued,
+                'dropped_duplicate': self.dropped_duplicate,
+                'dropped_oldest': self.dropped_oldest,
+            }
+
+
+class ScanPipeline:
+    """Staged scan processing decoupled from the serial read loop.
+
+    serial decode -> ``scan`` queue -> decision/persistence worker(s) ->
+    ``notify`` queue -> notification worker
+
+    The decision and persistence stages share one transaction per batch
+    (``process_batch``), so a burst of reads costs one commit.
+    """
+
+    def __init__(self, process_batch: Callable[[List[str], List[Any], List[float]], List[dict]],
+                 notify: Callable[[str, dict], None],
+                 scan_queue_size: int = 1000, notify_queue_size: int = 1000,
+                 batch_size: int = 50, workers: int = 1,
+                 trace_done: Optional[Callable[[Any, dict], None]] = None,
+                 retries: int = 2, retry_delay: float = 0.5):
+        """Create a pipeline.
+
+        Parameters:
+            process_batch (Callable[[List[str], List[Any], List[float]], List[dict]]):
+                Decides and persists a list of EPCs (with their traces and
+                read times as epoch seconds), returning one result per EPC.
+                Reads are decided at their read time, not when a (possibly
+                backlogged or retried) batch gets to them.
+            notify (Callable[[str, dict], None]): Called with (epc, result) for
+                every processed scan.
+            scan_queue_size (int, optional): Bound of the ingress queue.
+            notify_queue_size (int, optional): Bound of the notification queue.
+            batch_size (int, optional): Max reads per transaction.
+            workers (int, optional): Number of decision/persistence workers.
+            trace_done (Optional[Callable[[Any, dict], None]]): Called with
+                (trace, result) after notification for reads submitted with
+                a trace; traces are otherwise opaque (only ``mark`` is used).
+            retries (int, optional): Retries per read once a batch has failed
+                and its reads are processed one by one.
+            retry_delay (float, optional): Seconds before the first retry.
+        """
+        self.process_batch = process_batch
+        self.notify = notify
+        self.trace_done = trace_done
+        self.scan_queue_size = scan_queue_size
+        self.notify_queue_size = notify_queue_size
+        self.batch_size = batch_size
+        self.workers = workers
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.scan_queue = BoundedQueue('scan', scan_queue_size)
+        self.notify_queue = BoundedQueue('notify', notify_queue_size)
+        self._scan_threads: List[threading.Thread] = []
+        self._notify_thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self.running = False
+        self.processed = 0
+        self.batches = 0
+        self.errors = 0
+        self.dropped = 0
+        self.notified = 0
+
+    def start(self) -> None:
+        """Start the worker threads with fresh queues."""
+        if self.running:
+            return
+        self.scan_queue = BoundedQueue('scan', self.scan_queue_size)
+        self.notify_queue = BoundedQueue('notify', self.notify_queue_size)
+        self._scan_threads = [
+            threading.Thread(target=self._scan_worker, name=f'scan-worker-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        self._notify_thread = threading.Thread(target=self._notify_worker, name='notify-worker', daemon=True)
+        for thread in self._scan_threads:
+            thread.start()
+        self._notify_thread.start()
+        self.running = True
+        logger.info(f"Scan pipeline started ({self.workers} worker(s), batch size {self.batch_size})")
+
+    def submit(self, epc: str, trace: Any = None, read_at: Optional[float] = None) -> bool:
+        """Enqueue a decoded read. Never blocks the caller.
+
+        Parameters:
+            epc (str): EPC of the read.
+            trace (Any, optional): Trace of the read, if traced.
+            read_at (Optional[float]): Epoch seconds the read was taken; now if None.
+
+        Returns:
+            bool: False if the pipeline is not accepting reads.
+        """
+        return self.scan_queue.put(epc, (epc, read_at or time.time(), trace))
+
+    def stop(self, timeout: float = 10.0) -> bool:
+        """Stop accepting reads and drain every stage.
+
+        Parameters:
+            timeout (float, optional): Max seconds to wait for the drain.
+
+        Returns:
+            bool: True if all queued reads were processed and notified.
+        """
+        if not self.running:
+            return True
+        deadline = time.time() + timeout
+        self.scan_queue.close()
+        for thread in self._scan_threads:
+            thread.join(max(0.0, deadline - time.time()))
+        self.notify_queue.close()
+        if self._notify_thread:
+            self._notify_thread.join(max(0.0, deadline - time.time()))
+        drained = not any(t.is_alive() for t in self._scan_threads) and \
+            not (self._notify_thread and self._notify_thread.is_alive())
+        self.running = False
+        if drained:
+            logger.info("Scan pipeline drained and stopped")
+        else:
+            logger.warning("Scan pipeline stop timed out before fully draining")
+        return drained
+
+    def _scan_worker(self) -> None:
+        while True:
+            batch: Optional[List[Tuple[str, float, Any]]] = self.scan_queue.get_batch(self.batch_size)
+            if batch is None:
+                return
+            if not batch:
+                continue
+            epcs = [epc for epc, _, _ in batch]
+            traces = [trace for _, _, trace in batch]
+            read_times = [read_at for _, read_at, _ in batch]
+            started = time.time()
+            for _, enqueued_at, trace in batch:
+                QUEUE_SECONDS.observe(started - enqueued_at)
+                if trace is not None:
+                    trace.mark('dequeued')
+            try:
+                results = self.process_batch(epcs, traces, read_times)
+                PROCESS_SECONDS.observe(time.time() - started)
+                processed = batch
+            except Exception as e:
+                logger.error(f"Error processing scan batch of {len(epcs)}: {e}")
+                with self._stats_lock:
+                    self.errors += 1
+                # Retry read by read so one bad read or a lock timeout does not cost the batch
+                processed, results = self._process_each(batch)
+            with self._stats_lock:
+                self.processed += len(processed)
+                self.batches += 1
+            for (epc, enqueued_at, trace), result in zip(processed, results):
+                # Key by employee so a stale status for the same person goes first
+                self.notify_queue.put(result.get('employee_id', epc), (epc, result, enqueued_at, trace))
+
+    def _process_each(self, batch: List[Tuple[str, float, Any]]) -> Tuple[List[Tuple[str, float, Any]], List[dict]]:
+        """Process reads one transaction each after a failed batch.
+
+        A read that fails is retried after ``retry_delay`` seconds (doubling
+        each time) up to ``retries`` times, then dropped and counted.
+        """
+        processed, results = [], []
+        for item in batch:
+            epc, read_at, trace = item
+            delay = self.retry_delay
+            for attempt in range(self.retries + 1):
+                try:
+                    result = self.process_batch([epc], [trace], [read_at])[0]
+                except Exception as e:
+                    if attempt < self.retries:
+                        time.sleep(delay)
+                        delay *= 2
+                        continue
+                    logger.error(f"Dropping scan {epc} after {attempt + 1} attempt(s): {e}")
+                    with self._stats_lock:
+                        self.dropped += 1
+                    break
+                processed.append(item)
+                results.append(result)
+                break
+        return processed, results
+
+    def _notify_worker(self) -> None:
+        while True:
+            batch = self.notify_queue.get_batch(self.batch_size)
+            if batch is None:
+                return
+            for epc, result, enqueued_at, trace in batch:
+                started = time.time()
+                if trace is not None:
+                    trace.mark('notify')
+                try:
+                    self.notify(epc, result)
+                except Exception as e:
+                    logger.error(f"Error notifying scan result for {epc}: {e}")
+                finished = time.time()
+                NOTIFY_SECONDS.observe(finished - started)
+                TOTAL_SECONDS.observe(finished - enqueued_at)
+                if trace is not None and self.trace_done is not None:
+                    self.trace_done(trace, result)
+                with self._stats_lock:
+                    self.notified += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth gauges and per-stage counters."""
+        with self._stats_lock:
+            counters = {
+                'processed': self.processed,
+                'batches': self.batches,
+                'errors': self.errors,
+                'dropped': self.dropped,
+                'notified': self.notified,
+            }
+        return {
+            'running': self.running,
+            'stages': {
+                'scan': self.scan_queue.stats(),
+                'notify': self.notify_queue.stats(),
+            },
+            **counters,
+        }
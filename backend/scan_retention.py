@@ -0,0 +1,261 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLUMNS = 'id, employee_id, rfid_uid, timestamp, reader_id, status, note'
+
+
+def init_retention_tables(conn: sqlite3.Connection) -> None:
+    """Create the rollup and archive registry tables in the main database."""
+    # One row per day/reader/status of archived scans; stays in the main DB
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scan_log_daily_rollup (
+            day TEXT NOT NULL,
+            reader_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            scan_count INTEGER NOT NULL DEFAULT 0,
+            first_scan TEXT,
+            last_scan TEXT,
+            archive TEXT NOT NULL,
+            PRIMARY KEY (day, reader_id, status)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scan_log_archives (
+            month TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def month_start(day: datetime) -> datetime:
+    return day.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(day: datetime) -> datetime:
+    start = month_start(day)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+class ScanLogRetention:
+    """Moves scan logs older than the retention horizon into monthly archives.
+
+    Logs of month ``YYYY-MM`` go to ``<archive_dir>/scan_logs_YYYY_MM.db``,
+    which is attached to the main connection with ``ATTACH``. Rows are moved
+    in small batches, each in its own short transaction (copy into the
+    archive, add to ``scan_log_daily_rollup``, delete from the main table),
+    with a pause between batches so the scan pipeline is never locked out for
+    long. An interrupted run simply continues from the oldest remaining row.
+    """
+
+    def __init__(self, db_path: str = 'checkins.db', archive_dir: str = 'archive',
+                 retention_days: int = 90, batch_size: int = 2000,
+                 pause: float = 0.05, interval: float = 3600.0,
+                 on_archived: Optional[Callable[[Dict[str, int]], None]] = None):
+        """Create a retention job.
+
+        Parameters:
+            db_path (str, optional): Main database.
+            archive_dir (str, optional): Directory of the monthly archive DBs.
+            retention_days (int, optional): Days of logs kept in the main table.
+            batch_size (int, optional): Rows moved per transaction.
+            pause (float, optional): Seconds to sleep between batches.
+            interval (float, optional): Seconds between background runs.
+            on_archived (Optional[Callable[[Dict[str, int]], None]]): Called
+                with the rows moved per month after a run that moved any.
+        """
+        self.db_path = db_path
+        self.archive_dir = archive_dir
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.pause = pause
+        self.interval = interval
+        self.on_archived = on_archived
+        self._run_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.runs = 0
+        self.rows_archived = 0
+        self.batches = 0
+        self.last_run: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    def archive_path(self, month: str) -> str:
+        return os.path.join(self.archive_dir, f"scan_logs_{month.replace('-', '_')}.db")
+
+    def cutoff(self, now: Optional[datetime] = None) -> str:
+        """Timestamps below this bound are archived (start of the horizon day)."""
+        now = now or datetime.now()
+        horizon = (now - timedelta(days=self.retention_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return horizon.isoformat()
+
+    def _oldest_timestamp(self, conn: sqlite3.Connection) -> Optional[str]:
+        row = conn.execute('SELECT MIN(timestamp) FROM rfid_scan_logs').fetchone()
+        return row[0] if row else None
+
+    def _attach(self, conn: sqlite3.Connection, month: str) -> str:
+        path = self.archive_path(month)
+        os.makedirs(self.archive_dir, exist_ok=True)
+        conn.execute('ATTACH DATABASE ? AS archive', (path,))
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS archive.rfid_scan_logs (
+                id INTEGER PRIMARY KEY,
+                employee_id INTEGER,
+                rfid_uid TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                reader_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                note TEXT
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS archive.idx_archive_scan_logs_ts ON rfid_scan_logs (timestamp, id)')
+        return path
+
+    def _move_batch(self, conn: sqlite3.Connection, month: str, upper: str) -> int:
+        """Move one batch of the month's rows below `upper`; returns rows moved."""
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            ids = [row[0] for row in conn.execute('''
+                SELECT id FROM rfid_scan_logs
+                WHERE timestamp < ?
+                ORDER BY timestamp, id
+                LIMIT ?
+            ''', (upper, self.batch_size))]
+            if not ids:
+                conn.execute('COMMIT')
+                return 0
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS retention_batch (id INTEGER PRIMARY KEY)')
+            conn.execute('DELETE FROM retention_batch')
+            conn.executemany('INSERT INTO retention_batch (id) VALUES (?)', [(i,) for i in ids])
+            conn.execute(f'''
+                INSERT OR IGNORE INTO archive.rfid_scan_logs ({ARCHIVE_COLUMNS})
+                SELECT {ARCHIVE_COLUMNS} FROM main.rfid_scan_logs
+                WHERE id IN (SELECT id FROM retention_batch)
+            ''')
+            conn.execute('''
+                INSERT INTO scan_log_daily_rollup (day, reader_id, status, scan_count, first_scan, last_scan, archive)
+                SELECT substr(timestamp, 1, 10), reader_id, status, COUNT(*), MIN(timestamp), MAX(timestamp), ?
+                FROM main.rfid_scan_logs
+                WHERE id IN (SELECT id FROM retention_batch)
+                GROUP BY substr(timestamp, 1, 10), reader_id, status
+                ON CONFLICT(day, reader_id, status) DO UPDATE SET
+                    scan_count = scan_count + excluded.scan_count,
+                    first_scan = MIN(first_scan, excluded.first_scan),
+                    last_scan = MAX(last_scan, excluded.last_scan)
+            ''', (os.path.basename(self.archive_path(month)),))
+            conn.execute('DELETE FROM main.rfid_scan_logs WHERE id IN (SELECT id FROM retention_batch)')
+            conn.execute('''
+                INSERT INTO scan_log_archives (month, path, row_count) VALUES (?, ?, ?)
+                ON CONFLICT(month) DO UPDATE SET
+                    row_count = row_count + excluded.row_count,
+                    updated_at = CURRENT_TIMESTAMP
+            ''', (month, self.archive_path(month), len(ids)))
+            conn.execute('COMMIT')
+            return len(ids)
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Archive everything older than the horizon, month by month.
+
+        Returns:
+            Dict[str, int]: Rows moved per month.
+        """
+        moved: Dict[str, int] = {}
+        if not self._run_lock.acquire(blocking=False):
+            return moved
+        try:
+            cutoff = self.cutoff(now)
+            conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=30)
+            try:
+                init_retention_tables(conn)
+                while not self._stop.is_set():
+                    oldest = self._oldest_timestamp(conn)
+                    if oldest is None or oldest >= cutoff:
+                        break
+                    first_day = datetime.fromisoformat(oldest[:10])
+                    month = first_day.strftime('%Y-%m')
+                    upper = min(cutoff, next_month(first_day).isoformat())
+                    self._attach(conn, month)
+                    try:
+                        while not self._stop.is_set():
+                            count = self._move_batch(conn, month, upper)
+                            if not count:
+                                break
+                            moved[month] = moved.get(month, 0) + count
+                            with self._stats_lock:
+                                self.rows_archived += count
+                                self.batches += 1
+                            # Let the scan writer take the lock between batches
+                            time.sleep(self.pause)
+                    finally:
+                        conn.execute('DETACH DATABASE archive')
+            finally:
+                conn.close()
+            with self._stats_lock:
+                self.runs += 1
+                self.last_run = datetime.now().isoformat()
+                self.last_error = None
+            if moved:
+                logger.info(f"Archived scan logs: {moved}")
+                if self.on_archived:
+                    self.on_archived(moved)
+            return moved
+        except Exception as e:
+            with self._stats_lock:
+                self.last_error = str(e)
+            logger.error(f"Error archiving scan logs: {e}")
+            return moved
+        finally:
+            self._run_lock.release()
+
+    def start(self) -> None:
+        """Run in a background thread every `interval` seconds (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='scan-retention', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def archives(self) -> List[Dict[str, Any]]:
+        """Registered monthly archives with their row counts."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            init_retention_tables(conn)
+            rows = conn.execute('SELECT month, path, row_count, updated_at FROM scan_log_archives ORDER BY month').fetchall()
+        finally:
+            conn.close()
+        return [{'month': m, 'path': p, 'row_count': n, 'updated_at': u} for m, p, n, u in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                'retention_days': self.retention_days,
+                'cutoff': self.cutoff(),
+                'runs': self.runs,
+                'batches': self.batches,
+                'rows_archived': self.rows_archived,
+                'last_run': self.last_run,
+                'last_error': self.last_error,
+            }
@@ -0,0 +1,134 @@
+import sqlite3
+from typing import Any, Dict, Optional
+
+# Status groups used by the log and admin dashboards
+SUCCESS_STATUSES = ('checkin', 'checkout')
+IGNORED_STATUSES = ('ignored', 'outside_hours', 'recent_scan', 'already_checked_in',
+                    'already_checked_out', 'no_checkin')
+
+
+def init_scan_stats(conn: sqlite3.Connection) -> None:
+    """Create the per-day counters and the triggers that maintain them.
+
+    ``scan_stats_daily`` mirrors the rows currently in rfid_scan_logs; the
+    triggers keep it exact on insert, delete (clear today, retention) and
+    update. On first creation it is backfilled from the existing logs.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'scan_stats_daily'"
+    ).fetchone()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scan_stats_daily (
+            day TEXT NOT NULL,
+            reader_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            scan_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, reader_id, status)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_scan_stats_insert AFTER INSERT ON rfid_scan_logs
+        BEGIN
+            INSERT INTO scan_stats_daily (day, reader_id, status, scan_count)
+            VALUES (substr(NEW.timestamp, 1, 10), NEW.reader_id, NEW.status, 1)
+            ON CONFLICT(day, reader_id, status) DO UPDATE SET scan_count = scan_count + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_scan_stats_delete AFTER DELETE ON rfid_scan_logs
+        BEGIN
+            UPDATE scan_stats_daily SET scan_count = scan_count - 1
+            WHERE day = substr(OLD.timestamp, 1, 10) AND reader_id = OLD.reader_id AND status = OLD.status;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_scan_stats_update
+        AFTER UPDATE OF timestamp, reader_id, status ON rfid_scan_logs
+        BEGIN
+            UPDATE scan_stats_daily SET scan_count = scan_count - 1
+            WHERE day = substr(OLD.timestamp, 1, 10) AND reader_id = OLD.reader_id AND status = OLD.status;
+            INSERT INTO scan_stats_daily (day, reader_id, status, scan_count)
+            VALUES (substr(NEW.timestamp, 1, 10), NEW.reader_id, NEW.status, 1)
+            ON CONFLICT(day, reader_id, status) DO UPDATE SET scan_count = scan_count + 1;
+        END
+    ''')
+    if not exists:
+        conn.execute('''
+            INSERT INTO scan_stats_daily (day, reader_id, status, scan_count)
+            SELECT substr(timestamp, 1, 10), reader_id, status, COUNT(*)
+            FROM rfid_scan_logs
+            WHERE true
+            GROUP BY substr(timestamp, 1, 10), reader_id, status
+            ON CONFLICT(day, reader_id, status) DO UPDATE SET scan_count = excluded.scan_count
+        ''')
+
+
+def status_group(status: str) -> str:
+    if status in SUCCESS_STATUSES:
+        return 'success'
+    if status in IGNORED_STATUSES:
+        return 'ignored'
+    return 'other'
+
+
+def query_scan_stats(conn: sqlite3.Connection, date_from: Optional[str] = None,
+                     date_to: Optional[str] = None, reader_id: Optional[str] = None) -> Dict[str, Any]:
+    """Scan counts for a day range, from the counters and the archive rollups.
+
+    Cost depends on the number of days x readers x statuses, not on the
+    number of scans.
+
+    Parameters:
+        date_from (Optional[str]): First day (YYYY-MM-DD), inclusive.
+        date_to (Optional[str]): Last day (YYYY-MM-DD), inclusive.
+        reader_id (Optional[str]): Only this reader.
+
+    Returns:
+        Dict[str, Any]: Totals by status group plus breakdowns by day, reader
+            and status.
+    """
+    conditions, params = [], []
+    if date_from:
+        conditions.append('day >= ?')
+        params.append(date_from[:10])
+    if date_to:
+        conditions.append('day <= ?')
+        params.append(date_to[:10])
+    if reader_id:
+        conditions.append('reader_id = ?')
+        params.append(reader_id)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    # Live logs and archived logs never overlap: retention moves rows between them
+    rows = conn.execute(f'''
+        SELECT day, reader_id, status, SUM(scan_count) FROM (
+            SELECT day, reader_id, status, scan_count FROM scan_stats_daily {where}
+            UNION ALL
+            SELECT day, reader_id, status, scan_count FROM scan_log_daily_rollup {where}
+        )
+        GROUP BY day, reader_id, status
+        HAVING SUM(scan_count) > 0
+        ORDER BY day
+    ''', params * 2).fetchall()
+
+    totals = {'total': 0, 'success': 0, 'ignored': 0, 'other': 0}
+    by_day: Dict[str, Dict[str, int]] = {}
+    by_reader: Dict[str, int] = {}
+    by_status: Dict[str, int] = {}
+    for day, reader, status, count in rows:
+        group = status_group(status)
+        totals['total'] += count
+        totals[group] += count
+        day_totals = by_day.setdefault(day, {'total': 0, 'success': 0, 'ignored': 0, 'other': 0})
+        day_totals['total'] += count
+        day_totals[group] += count
+        by_reader[reader] = by_reader.get(reader, 0) + count
+        by_status[status] = by_status.get(status, 0) + count
+    return {
+        'from': date_from,
+        'to': date_to,
+        'reader_id': reader_id,
+        **totals,
+        'by_day': [{'day': day, **counts} for day, counts in by_day.items()],
+        'by_reader': by_reader,
+        'by_status': by_status,
+    }
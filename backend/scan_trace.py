@@ -0,0 +1,146 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class ScanTrace:
+    """Timestamped stages of one read, from serial receipt to emit.
+
+    Stages are (name, perf_counter) pairs appended by whichever thread owns
+    the read at that moment; a read is only ever owned by one thread.
+    """
+
+    __slots__ = ('epc', 'wall_start', 'marks', 'status', 'reason')
+
+    def __init__(self, epc: str, started: Optional[float] = None):
+        self.epc = epc
+        started = time.perf_counter() if started is None else started
+        # Wall-clock time of the first stage, for display
+        self.wall_start = time.time() - (time.perf_counter() - started)
+        self.marks: List[Tuple[str, float]] = []
+        self.status: Optional[str] = None
+        self.reason: Optional[str] = None
+
+    def mark(self, stage: str, at: Optional[float] = None) -> None:
+        self.marks.append((stage, time.perf_counter() if at is None else at))
+
+    @property
+    def duration(self) -> float:
+        return self.marks[-1][1] - self.marks[0][1] if self.marks else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        first = self.marks[0][1] if self.marks else 0.0
+        stages = []
+        previous = first
+        for stage, at in self.marks:
+            stages.append({'stage': stage, 'at_ms': round((at - first) * 1000, 3),
+                           'delta_ms': round((at - previous) * 1000, 3)})
+            previous = at
+        return {
+            'epc': self.epc,
+            'started_at': datetime.fromtimestamp(self.wall_start).isoformat(timespec='milliseconds'),
+            'total_ms': round(self.duration * 1000, 3),
+            'status': self.status,
+            'reason': self.reason,
+            'stages': stages,
+        }
+
+
+class ScanTracer:
+    """Creates scan traces and keeps the slow ones in a ring buffer.
+
+    The scan decision runs with the read's trace activated on the worker
+    thread; ``sql`` (installed as the connection's trace callback) then
+    marks every statement the decision executes. Traces whose total time
+    is at least ``threshold_ms`` are kept, the newest ``capacity`` of them.
+    """
+
+    def __init__(self, threshold_ms: float = 1000.0, capacity: int = 100, enabled: bool = True):
+        self.threshold_ms = threshold_ms
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._slow: deque = deque(maxlen=capacity)
+        self._local = threading.local()
+        self.traced = 0
+        self.slow_total = 0
+
+    def start(self, epc: str, received_at: Optional[float] = None,
+              decoded_at: Optional[float] = None) -> Optional[ScanTrace]:
+        """Trace for a read entering the callback; None when tracing is off."""
+        if not self.enabled:
+            return None
+        now = time.perf_counter()
+        trace = ScanTrace(epc, received_at if received_at is not None else now)
+        if received_at is not None:
+            trace.mark('serial_receipt', received_at)
+        if decoded_at is not None:
+            trace.mark('frame_decode', decoded_at)
+        trace.mark('callback', now)
+        return trace
+
+    @staticmethod
+    def mark_all(traces: Iterable[Optional[ScanTrace]], stage: str) -> None:
+        """Mark a stage shared by a batch (lock wait, commit) on every trace."""
+        now = time.perf_counter()
+        for trace in traces:
+            if trace is not None:
+                trace.mark(stage, now)
+
+    @contextmanager
+    def activate(self, trace: Optional[ScanTrace]):
+        """Make `trace` the current trace of this thread for the block."""
+        previous = getattr(self._local, 'trace', None)
+        self._local.trace = trace
+        try:
+            yield trace
+        finally:
+            self._local.trace = previous
+
+    def sql(self, statement: str) -> None:
+        """sqlite3 trace callback: mark the statement on the current trace."""
+        trace = getattr(self._local, 'trace', None)
+        if trace is None:
+            return
+        stage = 'sql: ' + ' '.join(statement.split())[:80]
+        # Trigger programs are reported again with their parent statement's text
+        if trace.marks and trace.marks[-1][0] == stage:
+            return
+        trace.mark(stage)
+
+    def finish(self, trace: Optional[ScanTrace], result: Optional[dict] = None) -> None:
+        if trace is None:
+            return
+        trace.mark('emitted')
+        if result is not None:
+            trace.status = result.get('status')
+            trace.reason = result.get('reason') or result.get('action')
+        with self._lock:
+            self.traced += 1
+            if trace.duration * 1000 >= self.threshold_ms:
+                self.slow_total += 1
+                self._slow.append(trace)
+
+    def slow(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Captured slow scans, newest first."""
+        with self._lock:
+            traces = list(self._slow)
+        traces.reverse()
+        return [trace.as_dict() for trace in traces[:limit]]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slow.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'threshold_ms': self.threshold_ms,
+                'capacity': self._slow.maxlen,
+                'captured': len(self._slow),
+                'traced': self.traced,
+                'slow_total': self.slow_total,
+            }
@@ -0,0 +1,407 @@
+import sqlite3
+import logging
+import threading
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from attendance_summary import ExpectedHours
+
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 24 * 3600
+WEEK_SECONDS = 7 * DAY_SECONDS
+ALL_DAYS = frozenset(range(7))
+# Windows default to +/- 15 minutes around the shift start/end, like the
+# built-in 08:45-09:15 / 17:45-18:15 windows around 09:00-18:00
+DEFAULT_WINDOW_MINUTES = 15
+
+
+def init_shift_tables(conn: sqlite3.Connection) -> None:
+    """Create the shift definitions and their employee/department assignments."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS shifts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            work_start TEXT NOT NULL,
+            work_end TEXT NOT NULL,
+            checkin_start TEXT NOT NULL,
+            checkin_end TEXT NOT NULL,
+            checkout_start TEXT NOT NULL,
+            checkout_end TEXT NOT NULL,
+            days TEXT NOT NULL DEFAULT '0,1,2,3,4',
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS shift_assignments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            shift_id INTEGER NOT NULL,
+            employee_id INTEGER,
+            department TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (shift_id) REFERENCES shifts (id),
+            FOREIGN KEY (employee_id) REFERENCES employees (id),
+            CHECK ((employee_id IS NULL) != (department IS NULL))
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_shift_assignments_shift ON shift_assignments (shift_id)')
+
+
+def parse_days(value: Any) -> FrozenSet[int]:
+    """Weekday numbers (Monday = 0) from '0,1,2' or a list; ValueError if invalid."""
+    if isinstance(value, str):
+        value = [part for part in value.replace(' ', '').split(',') if part]
+    days = frozenset(int(day) for day in value)
+    if not days or not days <= ALL_DAYS:
+        raise ValueError('days must be weekday numbers 0 (Monday) to 6 (Sunday)')
+    return days
+
+
+def _parse_time(value: Any) -> dt_time:
+    return datetime.strptime(str(value), '%H:%M').time()
+
+
+def _shift_time(value: dt_time, minutes: int) -> dt_time:
+    total = (value.hour * 60 + value.minute + minutes) % (24 * 60)
+    return dt_time(total // 60, total % 60)
+
+
+@dataclass(frozen=True)
+class Shift:
+    """One shift: working hours, scan windows and the weekdays it runs on.
+
+    Windows may cross midnight; a checkout window earlier in the day than the
+    shift start belongs to the next calendar day (night shift).
+    """
+    id: Optional[int]
+    name: str
+    work_start: dt_time
+    work_end: dt_time
+    checkin_start: dt_time
+    checkin_end: dt_time
+    checkout_start: dt_time
+    checkout_end: dt_time
+    days: FrozenSet[int] = ALL_DAYS
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], shift_id: Optional[int] = None) -> 'Shift':
+        """Validate API/DB values; windows default to +/-15 minutes around work_start/work_end.
+
+        Raises:
+            ValueError: Missing name or an invalid time/day value.
+        """
+        name = (data.get('name') or '').strip()
+        if not name:
+            raise ValueError('name is required')
+        try:
+            work_start = _parse_time(data.get('work_start'))
+            work_end = _parse_time(data.get('work_end'))
+
+            def window_time(key: str, around: dt_time, minutes: int) -> dt_time:
+                return _parse_time(data[key]) if data.get(key) else _shift_time(around, minutes)
+
+            return cls(
+                shift_id, name, work_start, work_end,
+                window_time('checkin_start', work_start, -DEFAULT_WINDOW_MINUTES),
+                window_time('checkin_end', work_start, DEFAULT_WINDOW_MINUTES),
+                window_time('checkout_start', work_end, -DEFAULT_WINDOW_MINUTES),
+                window_time('checkout_end', work_end, DEFAULT_WINDOW_MINUTES),
+                parse_days(data.get('days', '0,1,2,3,4')),
+            )
+        except (TypeError, ValueError) as e:
+            raise ValueError(f'Invalid shift "{name}": {e}. Times are HH:MM')
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'work_start': self.work_start.strftime('%H:%M'),
+            'work_end': self.work_end.strftime('%H:%M'),
+            'checkin_start': self.checkin_start.strftime('%H:%M'),
+            'checkin_end': self.checkin_end.strftime('%H:%M'),
+            'checkout_start': self.checkout_start.strftime('%H:%M'),
+            'checkout_end': self.checkout_end.strftime('%H:%M'),
+            'days': sorted(self.days),
+        }
+
+    def windows(self) -> List[Tuple[int, int, str, int]]:
+        """Scan windows on the week timeline as (start, end, window, shift weekday).
+
+        Seconds since Monday 00:00, end exclusive. Check-in times are placed
+        nearest to the shift start and check-out times nearest to the shift
+        end, so windows crossing midnight land on the right calendar day.
+        """
+        def seconds(t: dt_time) -> int:
+            return t.hour * 3600 + t.minute * 60 + t.second
+
+        def nearest(t: dt_time, reference: int) -> int:
+            delta = (seconds(t) - reference) % DAY_SECONDS
+            return reference + (delta - DAY_SECONDS if delta > DAY_SECONDS // 2 else delta)
+
+        start = seconds(self.work_start)
+        end = start + (seconds(self.work_end) - start) % DAY_SECONDS
+        result = []
+        for day in sorted(self.days):
+            base = day * DAY_SECONDS
+            for window, first, last, reference in (('checkin', self.checkin_start, self.checkin_end, start),
+                                                  ('checkout', self.checkout_start, self.checkout_end, end)):
+                opens = base + nearest(first, reference)
+                length = (seconds(last) - seconds(first)) % DAY_SECONDS
+                # +1: the end time itself is still inside the window (inclusive, as before)
+                result.append((opens, opens + length + 1, window, day))
+        return result
+
+
+@dataclass(frozen=True)
+class TimeWindow:
+    """The window a scan falls in, and the work date it counts for."""
+    window: str
+    work_date: date
+    shift_id: Optional[int]
+    shift_name: str
+
+
+class Timetable:
+    """Non-overlapping scan windows of one set of shifts on a weekly timeline.
+
+    Built once per distinct shift set; a lookup is one ``bisect`` over the
+    window start offsets. Where windows of different shifts overlap, the
+    shift listed first wins.
+    """
+
+    def __init__(self, shifts: Sequence[Shift]):
+        self.shifts = tuple(shifts)
+        pieces: List[Tuple[int, int, int, Tuple[str, int, Shift]]] = []
+        for priority, shift in enumerate(self.shifts):
+            for start, end, window, day in shift.windows():
+                entry = (window, day, shift)
+                # Split windows that wrap past Sunday midnight
+                opens = start % WEEK_SECONDS
+                closes = opens + end - start
+                if closes <= WEEK_SECONDS:
+                    pieces.append((opens, closes, priority, entry))
+                else:
+                    pieces.append((opens, WEEK_SECONDS, priority, entry))
+                    pieces.append((0, closes - WEEK_SECONDS, priority, entry))
+
+        bounds = sorted({p[0] for p in pieces} | {p[1] for p in pieces})
+        starts: List[int] = []
+        ends: List[int] = []
+        entries: List[Tuple[str, int, Shift]] = []
+        for lo, hi in zip(bounds, bounds[1:]):
+            covering = [p for p in pieces if p[0] <= lo and hi <= p[1]]
+            if not covering:
+                continue
+            entry = min(covering, key=lambda p: p[2])[3]
+            if ends and ends[-1] == lo and entries[-1] is entry:
+                ends[-1] = hi
+            else:
+                starts.append(lo)
+                ends.append(hi)
+                entries.append(entry)
+        self.starts = starts
+        self.ends = ends
+        self.entries = entries
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def lookup(self, now: datetime) -> Optional[TimeWindow]:
+        offset = now.weekday() * DAY_SECONDS + now.hour * 3600 + now.minute * 60 + now.second
+        i = bisect_right(self.starts, offset) - 1
+        if i < 0 or offset >= self.ends[i]:
+            return None
+        window, day, shift = self.entries[i]
+        work_date = now.date() - timedelta(days=(now.weekday() - day) % 7)
+        return TimeWindow(window, work_date, shift.id, shift.name)
+
+    def spill_over(self) -> timedelta:
+        """How long after midnight the last window of a work day stays open."""
+        latest = max((end - (day + 1) * DAY_SECONDS for shift in self.shifts
+                      for _, end, _, day in shift.windows()), default=0)
+        return timedelta(seconds=max(latest, 0))
+
+    def expected(self, day: date) -> Optional[Tuple[dt_time, dt_time]]:
+        for shift in self.shifts:
+            if day.weekday() in shift.days:
+                return shift.work_start, shift.work_end
+        return None
+
+
+@dataclass(frozen=True)
+class _Compiled:
+    default: Timetable
+    employees: Dict[int, Timetable]
+    departments: Dict[str, Timetable]
+    shifts: Dict[int, Shift]
+    assignments: List[Dict[str, Any]]
+    spill_over: timedelta
+
+
+class ShiftSchedule:
+    """Shift assignments compiled into per-employee timetables.
+
+    An employee uses the shifts assigned to them, else those of their
+    department, else the default shift built from the system config. Every
+    distinct shift set is compiled once into a ``Timetable``; the compiled
+    state is replaced as a whole on ``load`` (after a schedule write) or
+    ``set_default`` (after a config change), so a scan only does dict
+    lookups and one binary search.
+    """
+
+    def __init__(self, db_path: str = 'checkins.db', default: Optional[Shift] = None):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._default_shift = default
+        self._rows: Tuple[List[Shift], List[Tuple[int, Optional[int], Optional[str]]]] = ([], [])
+        self._compiled = self._compile()
+        self.compilations = 1
+
+    def load(self, conn: Optional[sqlite3.Connection] = None) -> None:
+        """Re-read shifts and assignments and recompile."""
+        own_conn = conn is None
+        if own_conn:
+            conn = sqlite3.connect(self.db_path)
+        try:
+            shift_rows = conn.execute('''
+                SELECT id, name, work_start, work_end, checkin_start, checkin_end, checkout_start, checkout_end, days
+                FROM shifts WHERE is_active = 1 ORDER BY id
+            ''').fetchall()
+            assignment_rows = conn.execute('''
+                SELECT sa.shift_id, sa.employee_id, sa.department
+                FROM shift_assignments sa
+                JOIN shifts s ON s.id = sa.shift_id AND s.is_active = 1
+                ORDER BY sa.id
+            ''').fetchall()
+        finally:
+            if own_conn:
+                conn.close()
+
+        shifts = []
+        keys = ('name', 'work_start', 'work_end', 'checkin_start', 'checkin_end', 'checkout_start', 'checkout_end', 'days')
+        for row in shift_rows:
+            try:
+                shifts.append(Shift.from_dict(dict(zip(keys, row[1:])), row[0]))
+            except ValueError as e:
+                logger.error(f"Skipping shift {row[0]}: {e}")
+        with self._lock:
+            self._rows = (shifts, assignment_rows)
+            self._compiled = self._compile()
+            self.compilations += 1
+        logger.info(f"Shift schedule compiled: {len(shifts)} shift(s), {len(assignment_rows)} assignment(s)")
+
+    def set_default(self, shift: Shift) -> None:
+        """Replace the shift used by employees without assignments."""
+        with self._lock:
+            if shift == self._default_shift:
+                return
+            self._default_shift = shift
+            self._compiled = self._compile()
+            self.compilations += 1
+
+    def _compile(self) -> _Compiled:
+        shifts, assignments = self._rows
+        by_id = {shift.id: shift for shift in shifts}
+        employee_shifts: Dict[int, List[Shift]] = {}
+        department_shifts: Dict[str, List[Shift]] = {}
+        listed = []
+        for shift_id, employee_id, department in assignments:
+            shift = by_id.get(shift_id)
+            if shift is None:
+                continue
+            if employee_id is not None:
+                employee_shifts.setdefault(employee_id, []).append(shift)
+            else:
+                department_shifts.setdefault(department, []).append(shift)
+            listed.append({'shift_id': shift_id, 'employee_id': employee_id, 'department': department})
+
+        # Employees/departments with the same shift set share one timetable
+        timetables: Dict[Tuple[Optional[int], ...], Timetable] = {}
+
+        def timetable(shift_list: List[Shift]) -> Timetable:
+            key = tuple(shift.id for shift in shift_list)
+            if key not in timetables:
+                timetables[key] = Timetable(shift_list)
+            return timetables[key]
+
+        default = Timetable([self._default_shift] if self._default_shift else [])
+        employees = {e: timetable(s) for e, s in employee_shifts.items()}
+        departments = {d: timetable(s) for d, s in department_shifts.items()}
+        return _Compiled(
+            default=default,
+            employees=employees,
+            departments=departments,
+            shifts=by_id,
+            assignments=listed,
+            spill_over=max([t.spill_over() for t in [default, *timetables.values()]]),
+        )
+
+    def timetable_for(self, employee_id: Optional[int], department: Optional[str]) -> Timetable:
+        compiled = self._compiled
+        if employee_id is not None and employee_id in compiled.employees:
+            return compiled.employees[employee_id]
+        if department is not None and department in compiled.departments:
+            return compiled.departments[department]
+        return compiled.default
+
+    def resolve(self, employee_id: Optional[int], department: Optional[str],
+                now: Optional[datetime] = None) -> Optional[TimeWindow]:
+        """Window the scan falls in for this employee, or None if outside all windows."""
+        return self.timetable_for(employee_id, department).lookup(now or datetime.now())
+
+    def outside_reason(self, employee_id: Optional[int], department: Optional[str],
+                       now: Optional[datetime] = None) -> str:
+        """Why ``resolve`` found no window: no shift runs that day, or the scan is between windows."""
+        now = now or datetime.now()
+        if self.timetable_for(employee_id, department).expected(now.date()) is None:
+            return 'no shift today'
+        return 'between scan windows'
+
+    def expected_hours(self, fallback: ExpectedHours) -> ExpectedHours:
+        """ExpectedHours hook for the attendance summary.
+
+        Employees with assigned (or department) shifts get the hours of the
+        shift that runs on that weekday, and a day off otherwise; everybody
+        else gets ``fallback``.
+        """
+        def expected(employee_id: int, department: Optional[str], day: date) -> Optional[Tuple[dt_time, dt_time]]:
+            compiled = self._compiled
+            timetable = compiled.employees.get(employee_id) or compiled.departments.get(department)
+            if timetable is None:
+                return fallback(employee_id, department, day)
+            return timetable.expected(day)
+        return expected
+
+    def spill_over(self) -> timedelta:
+        """Longest time any shift's windows stay open past the end of its work day.
+
+        The attendance summary waits this long before closing a day, so night
+        shift check-outs are in before the day is summarised.
+        """
+        return self._compiled.spill_over
+
+    def shifts(self) -> List[Dict[str, Any]]:
+        return [shift.as_dict() for shift in self._compiled.shifts.values()]
+
+    def assignments(self) -> List[Dict[str, Any]]:
+        return list(self._compiled.assignments)
+
+    def stats(self) -> Dict[str, Any]:
+        compiled = self._compiled
+        timetables = {id(t): t for t in [compiled.default, *compiled.employees.values(), *compiled.departments.values()]}
+        return {
+            'shifts': len(compiled.shifts),
+            'assignments': len(compiled.assignments),
+            'employees_assigned': len(compiled.employees),
+            'departments_assigned': len(compiled.departments),
+            'timetables': len(timetables),
+            'windows': sum(len(t) for t in timetables.values()),
+            'compilations': self.compilations,
+            'spill_over_minutes': int(compiled.spill_over.total_seconds() // 60),
+            'default': self._default_shift.as_dict() if self._default_shift else None,
+        }
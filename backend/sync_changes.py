@@ -0,0 +1,138 @@
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+from bulk_import import IN_CHUNK_SIZE
+
+# Tables tracked for delta sync -> name used in /api/sync responses
+SYNC_TABLES = {'employees': 'employees', 'employee_tags': 'tags'}
+
+SYNC_DEFAULT_LIMIT = 1000
+SYNC_MAX_LIMIT = 5000
+
+EMPLOYEE_COLUMNS = ('id', 'name', 'employee_code', 'department', 'position', 'email', 'phone',
+                    'is_active', 'created_at', 'updated_at')
+TAG_COLUMNS = ('id', 'employee_id', 'rfid_uid', 'tag_name', 'is_active', 'created_at')
+
+
+def _version_triggers(table: str) -> List[str]:
+    """Triggers giving every insert/update/delete on `table` the next version."""
+    bump = "UPDATE sync_clock SET version = version + 1 WHERE id = 1;"
+    record = f'''
+        INSERT INTO sync_rows (table_name, row_id, version, deleted)
+        VALUES ('{table}', {{row}}.id, (SELECT version FROM sync_clock WHERE id = 1), {{deleted}})
+        ON CONFLICT(table_name, row_id) DO UPDATE SET version = excluded.version, deleted = excluded.deleted;
+    '''
+    return [
+        f'''CREATE TRIGGER IF NOT EXISTS trg_sync_{table}_insert AFTER INSERT ON {table}
+            BEGIN {bump} {record.format(row='NEW', deleted=0)} END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_sync_{table}_update AFTER UPDATE ON {table}
+            BEGIN {bump} {record.format(row='NEW', deleted=0)} END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_sync_{table}_delete AFTER DELETE ON {table}
+            BEGIN {bump} {record.format(row='OLD', deleted=1)} END''',
+    ]
+
+
+def init_sync_tables(conn: sqlite3.Connection) -> None:
+    """Create the change clock, the per-row versions and their triggers.
+
+    ``sync_clock`` is a single counter; every write to a tracked table
+    takes its next value and stores it as the row's version in
+    ``sync_rows``. Hard deletes keep their entry with ``deleted = 1`` (a
+    tombstone); soft deletes are ordinary updates of ``is_active``. On first
+    creation the existing rows are backfilled, so ``since=0`` is a full
+    snapshot.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sync_rows'"
+    ).fetchone()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sync_clock (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO sync_clock (id, version) VALUES (1, 0)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sync_rows (
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            deleted INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (table_name, row_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_sync_rows_version ON sync_rows (version)')
+    for table in SYNC_TABLES:
+        for trigger in _version_triggers(table):
+            conn.execute(trigger)
+    if not exists:
+        version = 0
+        for table in SYNC_TABLES:
+            ids = [row[0] for row in conn.execute(f'SELECT id FROM {table} ORDER BY id')]
+            conn.executemany('INSERT INTO sync_rows (table_name, row_id, version) VALUES (?, ?, ?)',
+                             ((table, row_id, version + i) for i, row_id in enumerate(ids, 1)))
+            version += len(ids)
+        conn.execute('UPDATE sync_clock SET version = ? WHERE id = 1', (version,))
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return conn.execute('SELECT version FROM sync_clock WHERE id = 1').fetchone()[0]
+
+
+def _fetch_rows(conn: sqlite3.Connection, table: str, columns: tuple, ids: List[int]) -> Dict[int, dict]:
+    rows: Dict[int, dict] = {}
+    for i in range(0, len(ids), IN_CHUNK_SIZE):
+        chunk = ids[i:i + IN_CHUNK_SIZE]
+        for values in conn.execute(f'''
+            SELECT {', '.join(columns)} FROM {table} WHERE id IN ({','.join('?' * len(chunk))})
+        ''', chunk):
+            row = dict(zip(columns, values))
+            row['is_active'] = bool(row['is_active'])
+            rows[row['id']] = row
+    return rows
+
+
+def changes_since(conn: sqlite3.Connection, since: int, limit: int = SYNC_DEFAULT_LIMIT) -> Dict[str, Any]:
+    """Rows of employees and employee_tags written after version `since`.
+
+    Changes are returned in version order, at most `limit` per call. Each
+    table section has ``upserts`` (current active rows) and ``deleted`` (IDs
+    of soft or hard deleted rows, to drop from the cache). Clients store
+    ``version`` and pass it as the next ``since``; while ``has_more`` is
+    true they should ask again right away.
+
+    A client whose `since` is ahead of the server (the database was reset)
+    gets a full snapshot with ``reset: true`` and must drop its cache.
+    """
+    clock = current_version(conn)
+    reset = since > clock
+    if reset:
+        since = 0
+    changed = conn.execute('''
+        SELECT table_name, row_id, version, deleted FROM sync_rows
+        WHERE version > ? ORDER BY version LIMIT ?
+    ''', (since, limit + 1)).fetchall()
+    has_more = len(changed) > limit
+    changed = changed[:limit]
+
+    result: Dict[str, Any] = {
+        'since': since,
+        # A write may land between the clock read and the query; never go backwards
+        'version': changed[-1][2] if has_more else max(clock, changed[-1][2] if changed else 0),
+        'has_more': has_more,
+        'reset': reset,
+    }
+    columns = {'employees': EMPLOYEE_COLUMNS, 'employee_tags': TAG_COLUMNS}
+    for table, name in SYNC_TABLES.items():
+        entries = [(row_id, version, deleted) for t, row_id, version, deleted in changed if t == table]
+        rows = _fetch_rows(conn, table, columns[table], [row_id for row_id, _, deleted in entries if not deleted])
+        upserts, deleted_ids = [], []
+        for row_id, version, deleted in entries:
+            row: Optional[dict] = rows.get(row_id)
+            if row is None or not row['is_active']:
+                # Tombstone: hard deleted, or soft deleted with is_active = 0
+                deleted_ids.append(row_id)
+            else:
+                upserts.append({**row, 'version': version})
+        result[name] = {'upserts': upserts, 'deleted': deleted_ids}
+    return result
@@ -0,0 +1,145 @@
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class TagEnrollment:
+    """Live enrollment session fed by the running inventory.
+
+    While a session is active, reads of EPCs that are not enrolled are taken
+    out of the scan pipeline and collected here, deduplicated, in the order
+    they were first seen. Newly seen EPCs are published in batches every
+    ``window`` seconds, so the serial read loop only does a set lookup and
+    an append. Bound EPCs are removed from the session with ``remove``.
+    """
+
+    def __init__(self, is_known: Callable[[str], bool],
+                 publish: Callable[[List[dict], int], None],
+                 window: float = 0.2, max_pending: int = 5000):
+        """Create the enrollment manager.
+
+        Parameters:
+            is_known (Callable[[str], bool]): True if an EPC is already enrolled.
+            publish (Callable[[List[dict], int], None]): Called with the newly
+                seen tags and the number of pending tags.
+            window (float, optional): Publish interval in seconds.
+            max_pending (int, optional): Cap on unbound EPCs kept per session.
+        """
+        self.is_known = is_known
+        self.publish = publish
+        self.window = window
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending: 'OrderedDict[str, dict]' = OrderedDict()
+        self._new: List[str] = []
+        self._active = False
+        self._started_at: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.bound = 0
+        self.dropped = 0
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    def start(self) -> bool:
+        """Open a session; False if one is already active."""
+        with self._lock:
+            if self._active:
+                return False
+            self._active = True
+            self._pending = OrderedDict()
+            self._new = []
+            self._started_at = datetime.now().isoformat()
+            self.bound = 0
+            self.dropped = 0
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='tag-enrollment', daemon=True)
+            self._thread.start()
+        logger.info("Tag enrollment session started")
+        return True
+
+    def stop(self) -> List[dict]:
+        """Close the session and return the EPCs left unbound."""
+        with self._lock:
+            if not self._active:
+                return []
+            self._active = False
+            left = [dict(tag) for tag in self._pending.values()]
+        self._stop.set()
+        if self._thread:
+            self._thread.join(self.window * 4)
+        logger.info(f"Tag enrollment session stopped ({len(left)} unbound)")
+        return left
+
+    def observe(self, epc: str) -> bool:
+        """Offer a read from the inventory loop.
+
+        Returns:
+            bool: True if the read belongs to the session (unknown EPC while
+                active) and must not go to the scan pipeline.
+        """
+        if not self._active or self.is_known(epc):
+            return False
+        now = datetime.now().isoformat()
+        with self._lock:
+            if not self._active:
+                return False
+            tag = self._pending.get(epc)
+            if tag is not None:
+                tag['reads'] += 1
+                tag['last_seen'] = now
+            elif len(self._pending) >= self.max_pending:
+                self.dropped += 1
+            else:
+                self._pending[epc] = {'epc': epc, 'first_seen': now, 'last_seen': now, 'reads': 1}
+                self._new.append(epc)
+        return True
+
+    def pending(self) -> List[dict]:
+        """Unbound EPCs in the order they were first seen."""
+        with self._lock:
+            return [dict(tag) for tag in self._pending.values()]
+
+    def remove(self, epcs: Iterable[str], bound: bool = True) -> None:
+        """Drop EPCs that were bound, or dismissed by the admin (bound=False)."""
+        with self._lock:
+            for epc in epcs:
+                if self._pending.pop(epc, None) is not None and bound:
+                    self.bound += 1
+
+    def _flush(self) -> None:
+        with self._lock:
+            if not self._new:
+                return
+            new = [dict(self._pending[epc]) for epc in self._new if epc in self._pending]
+            self._new = []
+            pending_count = len(self._pending)
+        if new:
+            self.publish(new, pending_count)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.window):
+            try:
+                self._flush()
+            except Exception as e:
+                logger.error(f"Error publishing enrolled tags: {e}")
+        self._flush()
+
+    def state(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'active': self._active,
+                'started_at': self._started_at,
+                'pending': [dict(tag) for tag in self._pending.values()],
+                'pending_count': len(self._pending),
+                'bound': self.bound,
+                'dropped': self.dropped,
+                'max_pending': self.max_pending,
+            }
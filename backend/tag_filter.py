@@ -0,0 +1,179 @@
+import math
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no deletes, no false negatives)."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(64, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        # Double hashing: k positions from one 128-bit digest
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class EnrolledTagFilter:
+    """Membership filter of active EPCs applied inside the inventory loop.
+
+    Reads of EPCs that are certainly not enrolled are dropped before they
+    reach the scan pipeline, except one sampled read per unknown EPC every
+    ``sample_interval`` seconds, so foreign tags still show up in the scan
+    log without writing a row per read. False positives only cost a normal
+    ``unknown_employee`` decision.
+
+    The filter follows the ``sync_rows`` versions of employee_tags: ``sync``
+    adds newly written EPCs in place. Bloom filters can not remove keys, so
+    deleted tags stay in until more than ``stale_ratio`` of the entries are
+    stale (or capacity is reached) and the filter is rebuilt. ``check``
+    runs ``sync`` at most every ``check_interval`` seconds, which picks up
+    tags written by other processes as well.
+    """
+
+    def __init__(self, db_path: str = 'checkins.db', error_rate: float = 0.01,
+                 sample_interval: float = 60.0, max_sampled: int = 4096, stale_ratio: float = 0.25,
+                 check_interval: float = 5.0):
+        self.db_path = db_path
+        self.check_interval = check_interval
+        self._checked_at = 0.0
+        self.error_rate = error_rate
+        self.sample_interval = sample_interval
+        self.max_sampled = max_sampled
+        self.stale_ratio = stale_ratio
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(1, error_rate)
+        self._version = -1
+        self._stale = 0
+        self._sampled: 'OrderedDict[str, float]' = OrderedDict()
+        self.rebuilds = 0
+        self.passed = 0
+        self.dropped = 0
+        self.sampled = 0
+
+    def rebuild(self, conn: Optional[sqlite3.Connection] = None) -> None:
+        """Build a new filter from all active tags and swap it in."""
+        own_conn = conn is None
+        if own_conn:
+            conn = sqlite3.connect(self.db_path)
+        try:
+            version = conn.execute('SELECT version FROM sync_clock WHERE id = 1').fetchone()[0]
+            epcs = [row[0] for row in conn.execute('SELECT rfid_uid FROM employee_tags WHERE is_active = 1')]
+        finally:
+            if own_conn:
+                conn.close()
+        # Headroom so enrollments add in place for a while before the next rebuild
+        bloom = BloomFilter(max(1024, 2 * len(epcs)), self.error_rate)
+        for epc in epcs:
+            bloom.add(epc)
+        with self._lock:
+            self._bloom = bloom
+            self._version = version
+            self._stale = 0
+            self.rebuilds += 1
+        logger.info(f"Tag filter built: {len(epcs)} EPCs, {len(bloom.bits)} bytes, {bloom.hashes} hashes")
+
+    def sync(self, conn: Optional[sqlite3.Connection] = None) -> None:
+        """Apply tag writes made since the last sync or rebuild (no-op before the first build)."""
+        if self._version < 0:
+            return
+        own_conn = conn is None
+        if own_conn:
+            conn = sqlite3.connect(self.db_path)
+        try:
+            with self._lock:
+                rows = conn.execute('''
+                    SELECT sr.version, et.rfid_uid, et.is_active
+                    FROM sync_rows sr LEFT JOIN employee_tags et ON et.id = sr.row_id
+                    WHERE sr.table_name = 'employee_tags' AND sr.version > ?
+                    ORDER BY sr.version
+                ''', (self._version,)).fetchall()
+                if not rows:
+                    return
+                bloom = self._bloom
+                for _, epc, is_active in rows:
+                    if epc is not None and is_active:
+                        bloom.add(epc)
+                    else:
+                        self._stale += 1
+                self._version = rows[-1][0]
+                rebuild = bloom.count >= bloom.capacity or self._stale > self.stale_ratio * max(bloom.count, 1)
+            if rebuild:
+                self.rebuild(conn)
+        finally:
+            if own_conn:
+                conn.close()
+
+    def check(self) -> None:
+        """``sync`` if the last one was more than ``check_interval`` seconds ago."""
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return
+            # Claim the check so concurrent callers do not all query
+            self._checked_at = time.monotonic()
+        try:
+            self.sync()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not check tag filter version: {e}")
+
+    def admit(self, epc: str) -> bool:
+        """Hot path, called from the serial read loop for every decoded read."""
+        if epc in self._bloom:
+            self.passed += 1
+            return True
+        now = time.monotonic()
+        with self._lock:
+            last = self._sampled.get(epc)
+            if last is not None and now - last < self.sample_interval:
+                self.dropped += 1
+                return False
+            self._sampled[epc] = now
+            self._sampled.move_to_end(epc)
+            while len(self._sampled) > self.max_sampled:
+                self._sampled.popitem(last=False)
+            self.sampled += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            bloom = self._bloom
+            return {
+                'entries': bloom.count,
+                'capacity': bloom.capacity,
+                'bytes': len(bloom.bits),
+                'hashes': bloom.hashes,
+                'error_rate': bloom.error_rate,
+                'stale': self._stale,
+                'version': self._version,
+                'rebuilds': self.rebuilds,
+                'passed': self.passed,
+                'dropped': self.dropped,
+                'sampled': self.sampled,
+                'unknown_tracked': len(self._sampled),
+            }
@@ -4,11 +4,41 @@ import logging
 from typing import Union, Dict, List, Tuple, Optional, Callable
 from dataclasses import dataclass
 
+try:
+    from metrics import REGISTRY
+except ImportError:  # Optional: the driver also runs standalone (test_reader, edge agent machines)
+    REGISTRY = None
+
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+class _NoopCounter:
+    """Stands in for a metrics counter when metrics.py is not available."""
+
+    def labels(self, *values, **kwargs) -> '_NoopCounter':
+        return self
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+
+def _counter(name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+    if REGISTRY is None:
+        return _NoopCounter()
+    return REGISTRY.counter(name, help_text, labelnames)
+
+# Serial/frame health counters (exposed at /metrics)
+SERIAL_BYTES = _counter('rfid_serial_bytes_total', 'Bytes consumed by the frame parser')
+FRAMES = _counter('rfid_frames_total', 'Complete frames parsed from the serial stream')
+FRAME_RESYNCS = _counter('rfid_frame_resyncs_total', 'Bytes skipped to resynchronise on an invalid length byte')
+CRC_FAILURES = _counter('rfid_crc_failures_total', 'Frames whose CRC16 did not match')
+TAG_READS = _counter('rfid_tag_reads_total', 'Tag reads decoded in the inventory loop', ('result',))
+TAG_READS_PASSED = TAG_READS.labels('passed')
+TAG_READS_FILTERED = TAG_READS.labels('filtered')
+
+
 @dataclass
 class RFIDTag:
     """Represents an RFID tag with its properties."""
@@ -18,6 +48,9 @@ class RFIDTag:
     phase: Optional[int] = None
     frequency: Optional[int] = None
     antenna: Optional[int] = None
+    # time.perf_counter() when the bytes were read and when the frame was decoded
+    received_at: Optional[float] = None
+    decoded_at: Optional[float] = None
     
     def __str__(self):
         result = f"EPC: {self.epc}"
@@ -88,6 +121,7 @@ def parse_frames(data: bytes) -> Tuple[List[bytes], bytes]:
     """
     frames = []
     offset = 0
+    skipped = 0
     
     while offset < len(data):
         if offset >= len(data):
@@ -102,6 +136,7 @@ def parse_frames(data: bytes) -> Tuple[List[bytes], bytes]:
         if len_byte < 4 or len_byte > 100:
             logger.error(f"Warning: Invalid Len byte {len_byte} at offset {offset}")
             offset += 1  # Skip this byte and try next
+            skipped += 1
             continue
             
         # Total frame size = Len + 1 (include the Len byte itself)
@@ -119,6 +154,10 @@ def parse_frames(data: bytes) -> Tuple[List[bytes], bytes]:
         # Move to next frame
         offset += total_frame_size
     
+    SERIAL_BYTES.inc(offset)
+    FRAMES.inc(len(frames))
+    if skipped:
+        FRAME_RESYNCS.inc(skipped)
     return frames, data[offset:]  # Return frames and remaining unparsed data
 
 def verify_crc16(frame: bytes) -> bool:
@@ -131,6 +170,7 @@ def verify_crc16(frame: bytes) -> bool:
         bool: True if CRC is valid, False otherwise.
     """
     if len(frame) < 5:  # Minimum frame: Len + Adr + reCmd + Status + CRC(2)
+        CRC_FAILURES.inc()
         return False
     
     # CRC is calculated from Len byte to end of Data[] (excluding CRC itself)
@@ -141,7 +181,10 @@ def verify_crc16(frame: bytes) -> bool:
     # Calculate expected CRC
     calculated_crc = calculate_crc16(data_for_crc)
     
-    return calculated_crc == received_crc
+    if calculated_crc != received_crc:
+        CRC_FAILURES.inc()
+        return False
+    return True
 
 def decode_antenna_mask(ant_byte: int) -> List[int]:
     """Decode antenna mask byte to list of active antennas.
@@ -542,7 +585,8 @@ def stop_inventory(serial_port: serial.Serial, address: int = 0x00) -> bool:
 def start_inventory(serial_port: serial.Serial, address: int = 0x00, target: int = 0,
                    tag_callback: Optional[Callable[[RFIDTag], None]] = None,
                    stats_callback: Optional[Callable[[int, int], None]] = None,
-                   stop_flag: Optional[Callable[[], bool]] = None) -> bool:
+                   stop_flag: Optional[Callable[[], bool]] = None,
+                   tag_filter: Optional[Callable[[str], bool]] = None) -> bool:
     """Start inventory operation and collect tag data.
 
     Parameters:
@@ -552,6 +596,8 @@ def start_inventory(serial_port: serial.Serial, address: int = 0x00, target: int
         tag_callback (Optional[Callable[[RFIDTag], None]], optional): Callback function for tag data.
         stats_callback (Optional[Callable[[int, int], None]], optional): Callback function for statistics.
         stop_flag (Optional[Callable[[], bool]], optional): Function to check if should stop.
+        tag_filter (Optional[Callable[[str], bool]], optional): Called with the EPC hex of each read;
+            reads it rejects are dropped before the tag callback.
 
     Returns:
         bool: True if operation completed successfully, False otherwise.
@@ -599,6 +645,7 @@ def start_inventory(serial_port: serial.Serial, address: int = 0x00, target: int
             if serial_port.in_waiting > 0:
                 # Read available data and add to buffer
                 new_data = serial_port.read(serial_port.in_waiting)
+                received_at = time.perf_counter()
                 buffer += new_data
                 
                 logger.info(f"📨 Raw data: {' '.join(f'{b:02X}' for b in new_data)}")
@@ -631,12 +678,21 @@ def start_inventory(serial_port: serial.Serial, address: int = 0x00, target: int
                                     if len(frame) >= 6 + epc_length + 1:  # Ant + Len + EPC + RSSI
                                         epc_data = frame[6:6+epc_length]
                                         rssi = frame[6+epc_length]
+                                        epc = epc_data.hex().upper()
+                                        
+                                        # Drop reads of tags the filter rejects (e.g. foreign tags)
+                                        if tag_filter and not tag_filter(epc):
+                                            TAG_READS_FILTERED.inc()
+                                            continue
+                                        TAG_READS_PASSED.inc()
                                         
                                         # Create RFIDTag object
                                         tag = RFIDTag(
-                                            epc=''.join(f'{b:02X}' for b in epc_data),
+                                            epc=epc,
                                             rssi=rssi,
-                                            antenna=ant_byte
+                                            antenna=ant_byte,
+                                            received_at=received_at,
+                                            decoded_at=time.perf_counter()
                                         )
                                         
                                         # Call tag callback if available
@@ -12,6 +12,9 @@ interface SystemConfig {
   checkout_start: string;
   checkout_end: string;
   scan_cooldown: string;
+  log_retention_days: string;
+  work_start: string;
+  work_end: string;
   reader_id: string;
 }
 
@@ -26,6 +29,9 @@ export default function Config() {
     checkout_start: "17:45",
     checkout_end: "18:15",
     scan_cooldown: "10",
+    log_retention_days: "90",
+    work_start: "09:00",
+    work_end: "18:00",
     reader_id: "MAIN_ENTRANCE",
   });
   const [readerStatus, setReaderStatus] = useState<ReaderStatus>({
@@ -171,6 +177,28 @@ export default function Config() {
                   }
                 />
               </div>
+              <div>
+                <Label htmlFor="work_start">Work Start (late after)</Label>
+                <Input
+                  id="work_start"
+                  type="time"
+                  value={config.work_start}
+                  onChange={(e) =>
+                    setConfig({ ...config, work_start: e.target.value })
+                  }
+                />
+              </div>
+              <div>
+                <Label htmlFor="work_end">Work End (early before)</Label>
+                <Input
+                  id="work_end"
+                  type="time"
+                  value={config.work_end}
+                  onChange={(e) =>
+                    setConfig({ ...config, work_end: e.target.value })
+                  }
+                />
+              </div>
             </div>
             <div>
               <Label htmlFor="scan_cooldown">Scan Cooldown (seconds)</Label>
@@ -185,6 +213,18 @@ export default function Config() {
                 }
               />
             </div>
+            <div>
+              <Label htmlFor="log_retention_days">Scan Log Retention (days)</Label>
+              <Input
+                id="log_retention_days"
+                type="number"
+                min="1"
+                value={config.log_retention_days}
+                onChange={(e) =>
+                  setConfig({ ...config, log_retention_days: e.target.value })
+                }
+              />
+            </div>
           </CardContent>
         </Card>
 
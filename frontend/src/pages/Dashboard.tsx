@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { toast } from "react-hot-toast";
 import { io, Socket } from "socket.io-client";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
@@ -24,6 +24,35 @@ interface AttendanceRecord {
   status: string;
 }
 
+type BoardDelta =
+  | { seq: number; op: "upsert"; row: AttendanceRecord }
+  | { seq: number; op: "patch"; id: number; changes: Partial<AttendanceRecord> }
+  | { seq: number; op: "remove"; id: number }
+  | { seq: number; op: "reset" };
+
+const byName = (a: AttendanceRecord, b: AttendanceRecord) =>
+  a.name < b.name ? -1 : a.name > b.name ? 1 : a.id - b.id;
+
+const applyDelta = (
+  records: AttendanceRecord[],
+  delta: BoardDelta
+): AttendanceRecord[] => {
+  switch (delta.op) {
+    case "upsert":
+      return [...records.filter((r) => r.id !== delta.row.id), delta.row].sort(
+        byName
+      );
+    case "patch":
+      return records.map((r) =>
+        r.id === delta.id ? { ...r, ...delta.changes } : r
+      );
+    case "remove":
+      return records.filter((r) => r.id !== delta.id);
+    default:
+      return records;
+  }
+};
+
 interface SystemConfig {
   checkin_start: string;
   checkin_end: string;
@@ -48,6 +77,8 @@ export default function Dashboard() {
   const [currentTime, setCurrentTime] = useState(new Date());
   const [showClearDialog, setShowClearDialog] = useState(false);
   const [socket, setSocket] = useState<Socket | null>(null);
+  // Last board sequence applied; sent on (re)connect to replay missed deltas
+  const lastSeq = useRef<number | null>(null);
 
   const fetchData = async () => {
     try {
@@ -79,9 +110,35 @@ export default function Dashboard() {
     // Setup socket.io connection for real-time updates
     const s = io(SOCKET_URL);
     setSocket(s);
-    s.on("employee_status_update", (data) => {
-      toast.success(data.message || `${data.name} ${data.action}`);
-      fetchData();
+    const handleDelta = (delta: BoardDelta) => {
+      if (lastSeq.current === null || delta.seq <= lastSeq.current) return;
+      if (delta.op === "reset" || delta.seq !== lastSeq.current + 1) {
+        // Gap or server-side reset: ask for what we missed (or a snapshot)
+        s.emit("board_sync", { since: lastSeq.current });
+        return;
+      }
+      lastSeq.current = delta.seq;
+      setRecords((prev) => applyDelta(prev, delta));
+    };
+    s.on("connect", () => {
+      s.emit("board_sync", { since: lastSeq.current });
+    });
+    s.on("board_snapshot", (data: { seq: number; records: AttendanceRecord[] }) => {
+      lastSeq.current = data.seq;
+      setRecords(data.records);
+    });
+    s.on("board_deltas", (data: { seq: number; deltas: BoardDelta[] }) => {
+      data.deltas.forEach((delta) => handleDelta(delta));
+    });
+    // Broadcast events arrive coalesced, one message per flush window
+    s.on("event_batch", (batch: { events: { event: string; data: any }[] }) => {
+      batch.events.forEach(({ event, data }) => {
+        if (event === "board_delta") {
+          handleDelta(data);
+        } else if (event === "employee_status_update") {
+          toast.success(data.message || `${data.name} ${data.action}`);
+        }
+      });
     });
 
     return () => {
@@ -106,6 +106,7 @@ export default function Logs() {
       case "recent_scan":
         return "bg-blue-100 text-blue-800";
       case "already_checked_in":
+      case "already_checked_out":
         return "bg-indigo-100 text-indigo-800";
       case "no_checkin":
         return "bg-gray-100 text-gray-800";
@@ -132,6 +133,8 @@ export default function Logs() {
         return "Recent Scan";
       case "already_checked_in":
         return "Already Checked-in";
+      case "already_checked_out":
+        return "Already Checked-out";
       case "no_checkin":
         return "No Check-in";
       default:
@@ -299,6 +302,9 @@ export default function Logs() {
                   <SelectItem value="already_checked_in">
                     Already Checked-in
                   </SelectItem>
+                  <SelectItem value="already_checked_out">
+                    Already Checked-out
+                  </SelectItem>
                   <SelectItem value="no_checkin">No Check-in</SelectItem>
                 </SelectContent>
               </Select>
@@ -37,12 +37,20 @@ export const attendanceAPI = {
   getAll: () => api.get("/api/attendance"),
   getToday: () => api.get("/api/attendance/today"),
   clearToday: () => api.post("/api/attendance/clear_today"),
+  export: (params: { from?: string; to?: string; format?: "csv" | "ndjson" }) =>
+    api.get("/api/attendance/export", { params, responseType: "blob" }),
 };
 
 export const employeesAPI = {
   getAll: () => api.get("/api/employees"),
   getById: (id: number) => api.get(`/api/employees/${id}`),
   create: (data: any) => api.post("/api/employees", data),
+  // Bulk import: JSON array of rows or a CSV file; dryRun only validates
+  import: (rows: any[] | File, dryRun: boolean = false) =>
+    api.post("/api/employees/import", rows, {
+      params: dryRun ? { dry_run: 1 } : {},
+      headers: rows instanceof File ? { "Content-Type": "text/csv" } : {},
+    }),
   update: (id: number, data: any) => api.put(`/api/employees/${id}`, data),
   delete: (id: number) => api.delete(`/api/employees/${id}`),
 };
@@ -51,6 +59,11 @@ export const tagsAPI = {
   getAll: () => api.get("/api/tags"),
   getById: (id: number) => api.get(`/api/tags/${id}`),
   create: (data: any) => api.post("/api/tags", data),
+  import: (rows: any[] | File, dryRun: boolean = false) =>
+    api.post("/api/tags/import", rows, {
+      params: dryRun ? { dry_run: 1 } : {},
+      headers: rows instanceof File ? { "Content-Type": "text/csv" } : {},
+    }),
   update: (id: number, data: any) => api.put(`/api/tags/${id}`, data),
   delete: (id: number) => api.delete(`/api/tags/${id}`),
 };
@@ -58,10 +71,64 @@ export const tagsAPI = {
 export const logsAPI = {
   getAll: () => api.get("/api/logs"),
   getRecent: (limit: number = 100) => api.get(`/api/logs?limit=${limit}`),
+  // Keyset pagination: pass the X-Next-Cursor header of the previous page as `cursor`
+  getPage: (params: {
+    limit?: number;
+    cursor?: string;
+    from?: string;
+    to?: string;
+    employee_id?: number;
+    reader_id?: string;
+    event_type?: string;
+  }) => api.get("/api/logs", { params }),
   clear: () => api.delete("/api/logs"),
   export: () => api.get("/api/logs/export"),
 };
 
+export const reportsAPI = {
+  // Period reports, read from the closed-day attendance rollup
+  employee: (params: { employee_id: number; from: string; to: string }) =>
+    api.get("/api/reports/attendance", { params }),
+  departments: (params: { month?: string; department?: string } = {}) =>
+    api.get("/api/reports/departments", { params }),
+};
+
+export const shiftsAPI = {
+  // Shift definitions and who works them (employees or whole departments)
+  getAll: () => api.get("/api/shifts"),
+  create: (shift: any) => api.post("/api/shifts", shift),
+  update: (id: number, shift: any) => api.put(`/api/shifts/${id}`, shift),
+  delete: (id: number) => api.delete(`/api/shifts/${id}`),
+  assign: (id: number, data: { employee_ids?: number[]; departments?: string[] }) =>
+    api.put(`/api/shifts/${id}/assignments`, data),
+  resolve: (params: { employee_id?: number; at?: string }) =>
+    api.get("/api/shifts/resolve", { params }),
+};
+
+export const edgeAPI = {
+  // Remote readers pushing scan batches; the token is only returned on register
+  readers: () => api.get("/api/edge/readers"),
+  register: (data: { reader_id: string; name?: string }) => api.post("/api/edge/readers", data),
+  revoke: (readerId: string) => api.delete(`/api/edge/readers/${readerId}`),
+};
+
+export const syncAPI = {
+  // Employees and tags changed since a version; start at 0, then pass the returned version
+  changes: (since: number, limit?: number) => api.get("/api/sync", { params: { since, limit } }),
+};
+
+export const traceAPI = {
+  // Scans slower than the slow_scan_ms setting, with per-stage timings
+  slow: (limit?: number) => api.get("/api/trace/slow", { params: { limit } }),
+  clear: () => api.delete("/api/trace/slow"),
+};
+
+export const statsAPI = {
+  // Pre-aggregated scan counts by day, reader and status
+  get: (params: { from?: string; to?: string; reader_id?: string } = {}) =>
+    api.get("/api/stats", { params }),
+};
+
 export const configAPI = {
   get: () => api.get("/api/config"),
   update: (data: any) => api.post("/admin/config/update", data),